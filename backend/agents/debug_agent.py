@@ -1,10 +1,13 @@
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from utils.gemini_client import get_gemini_model
+from utils.llm_providers import get_chat_model
+from utils.single_flight import single_flight, flight_key
+from utils.prompt_budget import prompt_budget
+from typing import AsyncIterator
 
 class DebugAgent:
     def __init__(self):
-        self.model = get_gemini_model(temperature=0.3)
+        self.model = get_chat_model(temperature=0.3)
         self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", """You are an expert debugging assistant for competitive programming. Your job is to identify bugs, logical errors, and implementation issues.
 
@@ -31,6 +34,7 @@ Discuss any time/space complexity issues if relevant.
 Be precise and actionable."""),
             ("user", """Platform: {site}
 Problem: {problem}
+{digest}
 Language: {language}
 
 User's Code:
@@ -44,12 +48,70 @@ Please help debug this code.""")
         ])
         
         self.chain = self.prompt_template | self.model | StrOutputParser()
+        
+        self.followup_prompt_template = ChatPromptTemplate.from_messages([
+            ("system", """You are an expert debugging assistant for competitive programming. You already reviewed an earlier version of the user's code; your previous findings are below. The user has since edited the code, and you are given only the changed hunks (unified diff, with a few lines of context).
+
+Format your response using markdown with clear structure:
+- Use **bold** for critical issues
+- Use `code` for code snippets and variable names
+- Use code blocks with ```language for multi-line code examples
+
+Structure your analysis:
+## What Changed
+Say briefly which of the previous findings the edit fixes, and whether it introduces new problems.
+
+## Remaining Issues
+List bugs from the previous findings that are still present, plus any new ones in the changed lines.
+
+## Suggested Fixes
+Provide specific, actionable fixes with code examples.
+
+Only reason about code you can see in the diff or that the previous findings describe. Be precise and actionable."""),
+            ("user", """Platform: {site}
+Problem: {problem}
+{digest}
+Language: {language}
+
+**Previous Findings:**
+{previous_findings}
+
+**Code Changes Since Then:**
+```diff
+{diff}
+```
+
+User's Question: {question}
+
+Please review the changes and update the debugging analysis.""")
+        ])
+        
+        self.followup_chain = self.followup_prompt_template | self.model | StrOutputParser()
     
-    def run(self, site: str, problem: str, code: str, language: str, question: str) -> str:
-        return self.chain.invoke({
+    def _build_inputs(self, site: str, problem: str, code: str, language: str, question: str, digest: str = "") -> dict:
+        return prompt_budget.fit("debug", {
             "site": site,
             "problem": problem,
+            "digest": digest,
             "code": code,
             "language": language,
             "question": question
         })
+    
+    def astream(self, site: str, problem: str, code: str, language: str, question: str, digest: str = "") -> AsyncIterator[str]:
+        inputs = self._build_inputs(site, problem, code, language, question, digest)
+        return single_flight.stream(flight_key(type(self).__name__, inputs), lambda: self.chain.astream(inputs))
+    
+    def astream_followup(self, site: str, problem: str, diff: str, previous_findings: str,
+                         language: str, question: str, digest: str = "") -> AsyncIterator[str]:
+        """Stream an incremental analysis that only covers the lines changed since the last review."""
+        inputs = prompt_budget.fit("debug_followup", {
+            "site": site,
+            "problem": problem,
+            "digest": digest,
+            "diff": diff,
+            "previous_findings": previous_findings,
+            "language": language,
+            "question": question
+        })
+        return single_flight.stream(flight_key("DebugAgent.followup", inputs), lambda: self.followup_chain.astream(inputs))
@@ -0,0 +1,55 @@
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from utils.llm_providers import get_chat_model
+from utils.prompt_budget import prompt_budget
+from utils.problem_digest import ProblemDigest
+import json
+import re
+
+class DigestAgent:
+    """Agent that condenses a problem statement into a digest shared by the other agents."""
+
+    def __init__(self):
+        self.model = get_chat_model(temperature=0.1, max_tokens=512)
+        self.prompt_template = ChatPromptTemplate.from_messages([
+            ("system", """You analyze competitive programming problems. Reply with a single JSON object and nothing else:
+
+{{"restatement": "<the task in one or two plain sentences, no story>",
+  "target_complexity": "<expected time complexity, e.g. O(n log n)>",
+  "tags": ["<3 to 5 likely topics, e.g. binary search, dp on trees>"]}}
+
+Base the target complexity on the constraints. Do not describe the solution."""),
+            ("user", """Problem Title: {title}
+Problem Statement:
+{problem}
+
+Constraints found: {constraints}
+Complexity suggested by constraints: {target_complexity}""")
+        ])
+
+        self.chain = self.prompt_template | self.model | StrOutputParser()
+
+    def _parse(self, result: str) -> dict:
+        match = re.search(r"\{.*\}", result, re.DOTALL)
+        if not match:
+            return {}
+        try:
+            fields = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return {}
+        return fields if isinstance(fields, dict) else {}
+
+    async def adigest(self, title: str, problem: str, base: ProblemDigest) -> dict:
+        """
+        Refine the local digest of a problem.
+
+        Returns:
+            Dict with any of "restatement", "target_complexity" and "tags"
+        """
+        result = await self.chain.ainvoke(prompt_budget.fit("digest", {
+            "title": title,
+            "problem": problem,
+            "constraints": "; ".join(base.constraints) or "none found",
+            "target_complexity": base.target_complexity or "unknown"
+        }))
+        return self._parse(result)
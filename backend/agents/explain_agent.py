@@ -1,10 +1,13 @@
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from utils.gemini_client import get_gemini_model
+from utils.llm_providers import get_chat_model
+from utils.single_flight import single_flight, flight_key
+from utils.prompt_budget import prompt_budget
+from typing import AsyncIterator
 
 class ExplainAgent:
     def __init__(self):
-        self.model = get_gemini_model(temperature=0.5)
+        self.model = get_chat_model(temperature=0.5)
         self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", """You are an expert competitive programming tutor. Your job is to explain coding problems in simple, clear terms.
 
@@ -33,6 +36,8 @@ Problem Title: {title}
 Problem Statement:
 {problem}
 
+{digest}
+
 User's Question: {question}
 
 Please explain this problem clearly.""")
@@ -40,10 +45,15 @@ Please explain this problem clearly.""")
         
         self.chain = self.prompt_template | self.model | StrOutputParser()
     
-    def run(self, site: str, title: str, problem: str, question: str) -> str:
-        return self.chain.invoke({
+    def _build_inputs(self, site: str, title: str, problem: str, question: str, digest: str = "") -> dict:
+        return prompt_budget.fit("explain", {
             "site": site,
             "title": title,
             "problem": problem,
+            "digest": digest,
             "question": question
         })
+    
+    def astream(self, site: str, title: str, problem: str, question: str, digest: str = "") -> AsyncIterator[str]:
+        inputs = self._build_inputs(site, title, problem, question, digest)
+        return single_flight.stream(flight_key(type(self).__name__, inputs), lambda: self.chain.astream(inputs))
@@ -0,0 +1,178 @@
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+INTENTS = ["explain", "debug", "suggest", "solve", "hint", "query"]
+
+# Keyword rules mirroring the cues in the LLM classifier prompt. Each weight is a
+# likelihood ratio: a match multiplies that intent's naive Bayes probability by it, so a
+# rule the model strongly disagrees with does not clear the threshold on its own.
+RULES: List[Tuple[str, "re.Pattern[str]", float]] = [
+    ("query", re.compile(
+        r"\b(you said|what did you mean|explain that again|what was|earlier|previous(ly)?|before that|"
+        r"can i use|could i use|would (it|this|that|\w+) work|is (it|this|that|my|the) approach|"
+        r"what about|should i|why not|how about|instead of)\b"
+    ), 20.0),
+    ("hint", re.compile(
+        r"\b(hints?|clues?|nudge|help me figure|guide me|right direction|another hint|next hint)\b"
+    ), 40.0),
+    ("debug", re.compile(
+        r"\b(bugs?|debug|errors?|wrong answer|wa|tle|mle|time limit exceeded|runtime error|segfault|"
+        r"fails?|failing|not working|doesn'?t work|what'?s wrong|fix (my|this|the) code)\b"
+    ), 20.0),
+    ("solve", re.compile(
+        r"\b(solve|solution|code for|write (the |a )?code|complete code|full code|give (me )?(the )?code|implement (it|this))\b"
+    ), 20.0),
+    ("suggest", re.compile(
+        r"\b(similar|related problems?|practice|more problems|recommend|suggest)\b"
+    ), 20.0),
+    ("explain", re.compile(
+        r"\b(explain|what does (this|the) problem|understand the problem|what is (this|the) problem|"
+        r"break (it )?down|what is being asked|meaning of)\b"
+    ), 15.0),
+]
+
+# Questions about something already answered ("explain hint 2 again", "that hint") are
+# follow-ups: they must not reserve a new hint.
+FOLLOW_UP = re.compile(
+    r"\b(again|once more|re-?explain|hint\s*#?\d+|(that|this|the|your|last|previous|earlier|first|second|third) hints?)\b"
+)
+# Debug cues without any code attached are ambiguous ("I get WA, why?").
+DEBUG_WITHOUT_CODE_WEIGHT = 3.0
+# Several rules pointing at different intents: leave the decision to the LLM.
+AMBIGUOUS_CONFIDENCE = 0.5
+
+# Seed corpus for the n-gram model; it covers phrasings the rules do not.
+TRAINING_EXAMPLES: List[Tuple[str, str]] = [
+    ("what is this problem asking", "explain"),
+    ("i don't get the problem statement", "explain"),
+    ("can you describe the problem in simple terms", "explain"),
+    ("what do the constraints mean", "explain"),
+    ("walk me through the problem", "explain"),
+    ("i am confused about the input format", "explain"),
+    ("my code gives the wrong output", "debug"),
+    ("why does my code crash on the second test", "debug"),
+    ("my submission is failing on test 3", "debug"),
+    ("check my code", "debug"),
+    ("look at my code please", "debug"),
+    ("where is the mistake in my code", "debug"),
+    ("my program gets stuck on large input", "debug"),
+    ("give me similar problems", "suggest"),
+    ("what should i practice next", "suggest"),
+    ("problems like this one", "suggest"),
+    ("what topics should i study for this", "suggest"),
+    ("list some problems on the same topic", "suggest"),
+    ("give me the answer", "solve"),
+    ("write the program for this", "solve"),
+    ("show me the code", "solve"),
+    ("i give up just show me how to do it", "solve"),
+    ("code it in python", "solve"),
+    ("give me the full implementation", "solve"),
+    ("i am stuck", "hint"),
+    ("give me a small push", "hint"),
+    ("point me in the right direction", "hint"),
+    ("don't tell me the answer just help a bit", "hint"),
+    ("what should i think about first", "hint"),
+    ("can i use binary search here", "query"),
+    ("why is the complexity n log n", "query"),
+    ("is greedy correct for this", "query"),
+    ("what is a segment tree", "query"),
+    ("does dp work here", "query"),
+    ("why does that approach work", "query"),
+    ("how does the two pointer trick work", "query"),
+]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#']+")
+
+@dataclass
+class IntentPrediction:
+    """Result of the local classifier with the tier that produced it."""
+    intent: str
+    confidence: float
+    source: str  # 'rules' or 'model'
+    scores: Dict[str, float] = field(default_factory=dict)
+
+    def ranked_intents(self) -> List[str]:
+        """Intents ordered from most to least probable."""
+        return sorted(self.scores, key=self.scores.get, reverse=True)
+
+class FastIntentClassifier:
+    """
+    Local intent classifier that resolves obvious questions without an LLM call.
+
+    Combines compiled keyword rules with a multinomial naive Bayes model over
+    word unigrams and bigrams (a linear model in log space) plus a has_code feature.
+    """
+    def __init__(self, examples: List[Tuple[str, str]] = TRAINING_EXAMPLES, alpha: float = 1.0):
+        self.alpha = alpha
+        self._feature_counts: Dict[str, Counter] = defaultdict(Counter)
+        self._class_totals: Counter = Counter()
+        self._class_docs: Counter = Counter()
+        self._vocabulary: set = set()
+        self.fit(examples)
+
+    def _features(self, question: str, has_code: bool) -> List[str]:
+        tokens = TOKEN_PATTERN.findall(question.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        if has_code:
+            features.append("__has_code__")
+        return features
+
+    def fit(self, examples: List[Tuple[str, str]]) -> None:
+        for text, intent in examples:
+            has_code = intent == "debug"
+            features = self._features(text, has_code)
+            self._feature_counts[intent].update(features)
+            self._class_totals[intent] += len(features)
+            self._class_docs[intent] += 1
+            self._vocabulary.update(features)
+
+    def _model_scores(self, question: str, has_code: bool) -> Dict[str, float]:
+        features = [f for f in self._features(question, has_code) if f in self._vocabulary]
+        total_docs = sum(self._class_docs.values())
+        vocab_size = len(self._vocabulary)
+
+        log_scores = {}
+        for intent in INTENTS:
+            log_prob = math.log((self._class_docs[intent] + self.alpha) / (total_docs + self.alpha * len(INTENTS)))
+            denominator = self._class_totals[intent] + self.alpha * vocab_size
+            counts = self._feature_counts[intent]
+            for feature in features:
+                log_prob += math.log((counts[feature] + self.alpha) / denominator)
+            log_scores[intent] = log_prob
+
+        peak = max(log_scores.values())
+        exp_scores = {intent: math.exp(score - peak) for intent, score in log_scores.items()}
+        norm = sum(exp_scores.values())
+        return {intent: score / norm for intent, score in exp_scores.items()}
+
+    def _rule_weights(self, text: str, has_code: bool) -> Dict[str, float]:
+        weights = {}
+        for intent, pattern, weight in RULES:
+            if pattern.search(text):
+                if intent == "debug" and not has_code:
+                    weight = DEBUG_WITHOUT_CODE_WEIGHT
+                weights[intent] = weight
+        if FOLLOW_UP.search(text):
+            weights.pop("hint", None)
+            weights["query"] = max(weights.get("query", 1.0), RULES[0][2])
+        return weights
+
+    def predict(self, question: str, has_code: bool) -> IntentPrediction:
+        """Classify a question locally, returning the intent and a confidence in [0, 1]."""
+        scores = self._model_scores(question, has_code)
+        weights = self._rule_weights(question.lower(), has_code)
+        if not weights:
+            intent = max(scores, key=scores.get)
+            return IntentPrediction(intent=intent, confidence=scores[intent], source="model", scores=scores)
+
+        combined = {intent: score * weights.get(intent, 1.0) for intent, score in scores.items()}
+        norm = sum(combined.values())
+        combined = {intent: score / norm for intent, score in combined.items()}
+        intent = max(combined, key=combined.get)
+        confidence = combined[intent]
+        if len(weights) > 1:
+            confidence = min(confidence, AMBIGUOUS_CONFIDENCE)
+        return IntentPrediction(intent=intent, confidence=confidence, source="rules", scores=combined)
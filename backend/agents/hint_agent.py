@@ -1,12 +1,18 @@
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from utils.gemini_client import get_gemini_model
+from utils.llm_providers import get_chat_model
+from utils.single_flight import single_flight, flight_key
+from utils.prompt_budget import prompt_budget, estimate_tokens, fit_items
 from utils.hint_storage import HintEntry
-from typing import List
+from typing import AsyncIterator, List
+
+# The whole ladder comes from one call, so it gets room for every hint rather than one answer's worth.
+LADDER_MAX_TOKENS = 6144
 
 class HintAgent:
     def __init__(self):
-        self.model = get_gemini_model(temperature=0.4)
+        self.model = get_chat_model(temperature=0.4)
+        self.ladder_model = get_chat_model(temperature=0.4, max_tokens=LADDER_MAX_TOKENS)
         self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", """You are an expert competitive programming tutor who provides progressive hints. Your job is to guide students step-by-step without giving away the complete solution.
 
@@ -42,6 +48,8 @@ Problem Title: {title}
 Problem Statement:
 {problem}
 
+{digest}
+
 {previous_hints_content}
 
 User's Question: {question}
@@ -50,24 +58,90 @@ Please provide Hint #{hint_number} that builds on the previous hints without rep
         ])
         
         self.chain = self.prompt_template | self.model | StrOutputParser()
-    
-    def run(self, site: str, title: str, problem: str, hint_number: int, 
-            previous_hints: List[HintEntry], question: str, max_hints: int = 7) -> str:
         
+        self.ladder_prompt_template = ChatPromptTemplate.from_messages([
+            ("system", """You are an expert competitive programming tutor who provides progressive hints. Your job is to guide students step-by-step without giving away the complete solution.
+
+Write the COMPLETE ladder of {max_hints} progressive hints for this problem in one response. Each hint will be shown to the student on its own, one at a time, only when they ask for the next one.
+
+CRITICAL: You MUST format every hint using STRICT markdown structure:
+- Use **bold** for key concepts and important terms
+- Use numbered lists for sequential steps
+- Use `code` for algorithm names, patterns, and technical terms
+- Use proper spacing and line breaks between sections
+- Be encouraging and supportive
+
+IMPORTANT RULES:
+1. Start each hint with its own heading line: ## Hint #1, ## Hint #2, ... up to ## Hint #{max_hints}
+2. Write nothing before ## Hint #1 and nothing after the last hint
+3. Each hint should reveal ONE new insight or step and must not repeat earlier hints
+4. Later hints build on earlier ones and become progressively more specific
+5. Hint {max_hints} should nearly reveal the solution approach but still require implementation
+6. End every hint with: "Need more help? Ask for another hint!"
+
+Structure of each hint:
+## Hint #N
+
+[Provide ONE specific, actionable insight that builds on previous hints]
+
+**Think about**: [A guiding question to help them apply this hint]
+
+Need more help? Ask for another hint!
+
+Be patient, encouraging, and pedagogical. Help them learn, don't just solve it for them."""),
+            ("user", """Platform: {site}
+Problem Title: {title}
+Problem Statement:
+{problem}
+
+{digest}
+
+Please write all {max_hints} hints, from the gentlest nudge to a near-complete approach.""")
+        ])
+        
+        self.ladder_chain = self.ladder_prompt_template | self.ladder_model | StrOutputParser()
+    
+    def _build_inputs(self, site: str, title: str, problem: str, hint_number: int,
+                      previous_hints: List[HintEntry], question: str, max_hints: int = 7, digest: str = "") -> dict:
+        dropped_tokens = 0
         if not previous_hints:
             previous_hints_content = "Hint Number: 1 (First hint)\nNo previous hints have been given yet."
         else:
             hints_text = []
             for entry in previous_hints:
                 hints_text.append(f"=== Previous Hint #{entry.hint_number} ===\n{entry.hint_text}\n")
+            budget = prompt_budget.budget_for("hint", "previous_hints")
+            if prompt_budget.enabled and budget:
+                kept = fit_items(hints_text, budget)
+                dropped_tokens = sum(estimate_tokens(text) for text in hints_text[:len(hints_text) - len(kept)])
+                hints_text = kept
             previous_hints_content = f"Hint Number: {hint_number}\n\nPREVIOUS HINTS (DO NOT REPEAT):\n" + "\n".join(hints_text)
         
-        return self.chain.invoke({
+        return prompt_budget.fit("hint", {
             "site": site,
             "title": title,
             "problem": problem,
+            "digest": digest,
             "hint_number": hint_number,
             "max_hints": max_hints,
             "previous_hints_content": previous_hints_content,
             "question": question
+        }, already_saved=dropped_tokens)
+    
+    def astream(self, site: str, title: str, problem: str, hint_number: int,
+                previous_hints: List[HintEntry], question: str, max_hints: int = 7, digest: str = "") -> AsyncIterator[str]:
+        inputs = self._build_inputs(
+            site, title, problem, hint_number, previous_hints, question, max_hints, digest
+        )
+        return single_flight.stream(flight_key(type(self).__name__, inputs), lambda: self.chain.astream(inputs))
+    
+    def astream_ladder(self, site: str, title: str, problem: str, max_hints: int = 7, digest: str = "") -> AsyncIterator[str]:
+        """Stream every hint of the progressive ladder from a single generation."""
+        inputs = prompt_budget.fit("hint", {
+            "site": site,
+            "title": title,
+            "problem": problem,
+            "digest": digest,
+            "max_hints": max_hints
         })
+        return single_flight.stream(flight_key("HintAgent.ladder", inputs), lambda: self.ladder_chain.astream(inputs))
@@ -1,10 +1,12 @@
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from utils.gemini_client import get_gemini_model
+from utils.llm_providers import get_chat_model
+from utils.single_flight import single_flight, flight_key
+from utils.prompt_budget import prompt_budget
 
 class IntentClassifier:
     def __init__(self):
-        self.model = get_gemini_model(temperature=0.1)
+        self.model = get_chat_model(temperature=0.1)
         self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", """You are an intent classifier for a competitive programming assistant.
 
@@ -28,11 +30,13 @@ Intent:""")
         
         self.chain = self.prompt_template | self.model | StrOutputParser()
     
-    def classify(self, question: str, has_code: bool) -> str:
-        result = self.chain.invoke({
+    def _build_inputs(self, question: str, has_code: bool) -> dict:
+        return prompt_budget.fit("classify", {
             "question": question,
             "has_code": "yes" if has_code else "no"
         })
+    
+    def _parse_intent(self, result: str) -> str:
         intent = result.strip().lower()
         
         valid_intents = ["explain", "debug", "suggest", "solve", "hint", "query"]
@@ -40,3 +44,8 @@ Intent:""")
             return "query"
         
         return intent
+    
+    async def aclassify(self, question: str, has_code: bool) -> str:
+        inputs = self._build_inputs(question, has_code)
+        result = await single_flight.do(flight_key("IntentClassifier", inputs), lambda: self.chain.ainvoke(inputs))
+        return self._parse_intent(result)
@@ -1,12 +1,15 @@
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from utils.gemini_client import get_gemini_model
+from utils.llm_providers import get_chat_model
+from utils.single_flight import single_flight, flight_key
+from utils.prompt_budget import prompt_budget
+from typing import AsyncIterator
 
 class QueryAgent:
     """Agent that answers questions about previous conversation and general doubts."""
     
     def __init__(self):
-        self.model = get_gemini_model(temperature=0.5)
+        self.model = get_chat_model(temperature=0.5)
         self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", """You are QueryAgent, a helpful assistant that clarifies doubts and answers follow-up questions.
 
@@ -30,6 +33,8 @@ Problem Title: {title}
 Problem Statement:
 {problem}
 
+{digest}
+
 **Previous Conversation:**
 {chat_history}
 
@@ -41,24 +46,28 @@ Please answer the user's question based on the context and conversation history
         
         self.chain = self.prompt_template | self.model | StrOutputParser()
     
-    def run(self, site: str, title: str, problem: str, question: str, chat_history: str) -> str:
+    def _build_inputs(self, site: str, title: str, problem: str, question: str, chat_history: str, digest: str = "") -> dict:
+        return prompt_budget.fit("query", {
+            "site": site,
+            "title": title,
+            "problem": problem,
+            "digest": digest,
+            "question": question,
+            "chat_history": chat_history
+        })
+    
+    def astream(self, site: str, title: str, problem: str, question: str, chat_history: str, digest: str = "") -> AsyncIterator[str]:
         """
-        Answer user's doubts based on previous conversation or general questions about the problem.
+        Stream the answer to the user's doubt, based on the previous conversation or
+        general questions about the problem, chunk by chunk as the model produces it.
         
         Args:
             site: The coding platform (leetcode, codeforces, codechef)
             title: Problem title
             problem: Problem statement
             question: User's question
-            chat_history: Formatted chat history (last 15 messages)
-        
-        Returns:
-            Answer to the user's doubt
+            chat_history: Formatted chat history (rolling summary plus the latest messages)
+            digest: Formatted problem digest (constraints, target complexity, topics), if known
         """
-        return self.chain.invoke({
-            "site": site,
-            "title": title,
-            "problem": problem,
-            "question": question,
-            "chat_history": chat_history
-        })
+        inputs = self._build_inputs(site, title, problem, question, chat_history, digest)
+        return single_flight.stream(flight_key(type(self).__name__, inputs), lambda: self.chain.astream(inputs))
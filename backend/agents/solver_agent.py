@@ -1,10 +1,13 @@
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from utils.gemini_client import get_gemini_model
+from utils.llm_providers import get_chat_model
+from utils.single_flight import single_flight, flight_key
+from utils.prompt_budget import prompt_budget
+from typing import AsyncIterator
 
 class SolverAgent:
     def __init__(self):
-        self.model = get_gemini_model(temperature=0.3)
+        self.model = get_chat_model(temperature=0.3)
         self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", """You are an expert competitive programming solver. Your job is to provide complete, working code solutions.
 
@@ -36,6 +39,8 @@ Problem Title: {title}
 Problem Statement:
 {problem}
 
+{digest}
+
 Programming Language: {language}
 User's Question: {question}
 
@@ -44,11 +49,16 @@ Please provide a complete working solution in {language}.""")
         
         self.chain = self.prompt_template | self.model | StrOutputParser()
     
-    def run(self, site: str, title: str, problem: str, language: str, question: str) -> str:
-        return self.chain.invoke({
+    def _build_inputs(self, site: str, title: str, problem: str, language: str, question: str, digest: str = "") -> dict:
+        return prompt_budget.fit("solve", {
             "site": site,
             "title": title,
             "problem": problem,
+            "digest": digest,
             "language": language,
             "question": question
         })
+    
+    def astream(self, site: str, title: str, problem: str, language: str, question: str, digest: str = "") -> AsyncIterator[str]:
+        inputs = self._build_inputs(site, title, problem, language, question, digest)
+        return single_flight.stream(flight_key(type(self).__name__, inputs), lambda: self.chain.astream(inputs))
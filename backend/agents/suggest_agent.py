@@ -1,10 +1,13 @@
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from utils.gemini_client import get_gemini_model
+from utils.llm_providers import get_chat_model
+from utils.single_flight import single_flight, flight_key
+from utils.prompt_budget import prompt_budget
+from typing import AsyncIterator
 
 class SuggestAgent:
     def __init__(self):
-        self.model = get_gemini_model(temperature=0.6)
+        self.model = get_chat_model(temperature=0.6)
         self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", """You are an expert competitive programming mentor. Your job is to suggest related problems and practice recommendations.
 
@@ -35,17 +38,27 @@ Current Problem: {title}
 Problem Statement:
 {problem}
 
+{digest}
+
+Likely Topics: {tags}
+
 User's Question: {question}
 
-Please suggest similar problems or next steps for practice.""")
+Please suggest similar problems or next steps for practice. Base the recommendations on the likely topics when they are given.""")
         ])
         
         self.chain = self.prompt_template | self.model | StrOutputParser()
     
-    def run(self, site: str, title: str, problem: str, question: str) -> str:
-        return self.chain.invoke({
+    def _build_inputs(self, site: str, title: str, problem: str, question: str, digest: str = "", tags: str = "") -> dict:
+        return prompt_budget.fit("suggest", {
             "site": site,
             "title": title,
             "problem": problem,
-            "question": question
+            "digest": digest,
+            "question": question,
+            "tags": tags or "unknown"
         })
+    
+    def astream(self, site: str, title: str, problem: str, question: str, digest: str = "", tags: str = "") -> AsyncIterator[str]:
+        inputs = self._build_inputs(site, title, problem, question, digest, tags)
+        return single_flight.stream(flight_key(type(self).__name__, inputs), lambda: self.chain.astream(inputs))
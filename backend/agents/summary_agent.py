@@ -0,0 +1,43 @@
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from utils.llm_providers import get_chat_model
+from utils.prompt_budget import prompt_budget
+
+class SummaryAgent:
+    """Agent that folds older chat turns into a running conversation summary."""
+
+    def __init__(self):
+        self.model = get_chat_model(temperature=0.2, max_tokens=512)
+        self.prompt_template = ChatPromptTemplate.from_messages([
+            ("system", """You maintain a compact running summary of a tutoring conversation about a competitive programming problem.
+
+Update the existing summary with the new messages. Keep:
+- what the user asked and what they are stuck on
+- which explanations, hints, approaches or solutions were already given (name the algorithm/idea, not the full text)
+- key facts the user shared about their own code or attempts
+
+Drop greetings, repeated markdown, and full code listings. Write at most 8 short bullet points. Output only the updated summary."""),
+            ("user", """**Existing Summary:**
+{summary}
+
+**New Messages:**
+{messages}""")
+        ])
+
+        self.chain = self.prompt_template | self.model | StrOutputParser()
+
+    async def afold(self, summary: str, messages: str) -> str:
+        """
+        Fold new messages into the summary.
+
+        Args:
+            summary: The current running summary ("" if none yet)
+            messages: Formatted messages that are leaving the verbatim window
+
+        Returns:
+            The updated summary
+        """
+        return await self.chain.ainvoke(prompt_budget.fit("summary", {
+            "summary": summary or "None yet.",
+            "messages": messages
+        }))
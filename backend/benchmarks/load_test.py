@@ -0,0 +1,77 @@
+"""
+Concurrent load test for a running CP Assistant backend.
+
+Fires batches of /ask requests at increasing concurrency while probing /health,
+so you can see whether throughput scales and whether the event loop stays responsive.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --url http://localhost:8000 --levels 1 4 16 32
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+from benchmarks.suite import percentile
+
+SAMPLE_REQUEST = {
+    "site": "leetcode",
+    "problem_title": "Two Sum",
+    "problem_statement": "Given an array of integers nums and an integer target, return indices of the two numbers such that they add up to target.",
+    "user_code": "",
+    "language": "python",
+    "question": "Can you explain this problem?"
+}
+
+async def timed_post(client: httpx.AsyncClient, path: str, payload: dict) -> float:
+    start = time.perf_counter()
+    response = await client.post(path, json=payload)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event, samples: List[float]) -> None:
+    """Measure /health latency while the load batch is running."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.1)
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, path: str) -> dict:
+    health_samples: List[float] = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe_health(client, stop, health_samples))
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(
+        *(timed_post(client, path, SAMPLE_REQUEST) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await prober
+
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(concurrency / elapsed, 2),
+        "p50_s": round(statistics.median(latencies), 3),
+        "p95_s": round(percentile(latencies, 95), 3),
+        "health_max_s": round(max(health_samples), 3) if health_samples else None
+    }
+
+async def main(url: str, levels: List[int], path: str) -> None:
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        for level in levels:
+            result = await run_level(client, level, path)
+            print(result)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load test for the CP Assistant backend")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/ask")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 32])
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.levels, args.path))
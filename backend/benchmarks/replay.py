@@ -0,0 +1,185 @@
+"""
+Replay captured /ask and /ask/stream traffic against a running backend.
+
+Reads the JSONL written by the capture middleware (CAPTURE_ENABLED=true), including
+rotated files, registers every captured problem statement, then sends every request at
+its original offset from the first one, divided by --speed. Requests about the same
+problem are sent one after another, so hint ladders and follow-up chains reach the
+server in their recorded order even when the previous answer takes longer than the
+recorded gap. Run from the backend directory:
+
+    python -m benchmarks.replay captures/requests.jsonl --url http://localhost:8000 --speed 4
+"""
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict
+from dataclasses import dataclass
+import argparse
+import asyncio
+import glob
+import json
+import time
+import httpx
+from benchmarks.suite import percentile
+
+PATHS = {"ask": "/ask", "stream": "/ask/stream", "problems": "/problems"}
+
+@dataclass
+class Result:
+    endpoint: str
+    intent: str
+    status: int
+    latency: float
+    first_byte: Optional[float]
+    lag: float
+
+def capture_files(path: str) -> List[str]:
+    """The capture file and its rotated backups, oldest first."""
+    rotated = [name for name in glob.glob(f"{glob.escape(path)}.*") if name.rsplit(".", 1)[1].isdigit()]
+    rotated.sort(key=lambda name: int(name.rsplit(".", 1)[1]), reverse=True)
+    return rotated + glob.glob(glob.escape(path))
+
+def load_records(paths: List[str], limit: int = 0) -> List[dict]:
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and "ts" in record and isinstance(record.get("request"), dict):
+                    records.append(record)
+    records.sort(key=lambda record: record["ts"])
+    if not limit:
+        return records
+    # --limit counts questions; every statement is kept so the questions still resolve.
+    kept, questions = [], 0
+    for record in records:
+        if record.get("endpoint") != "problems":
+            if questions == limit:
+                continue
+            questions += 1
+        kept.append(record)
+    return kept
+
+def problem_key(record: dict) -> Tuple[str, str]:
+    request = record["request"]
+    if record.get("endpoint") == "problems":
+        return "", request["problem_statement"]
+    return request.get("site", ""), request.get("problem_hash") or request.get("problem_title", "")
+
+async def register_problems(client: httpx.AsyncClient, records: List[dict]) -> int:
+    """Upload every captured statement up front, so hash-only questions resolve on a fresh backend."""
+    statements = {record["request"]["problem_statement"] for record in records if record.get("endpoint") == "problems"}
+    for statement in statements:
+        response = await client.post("/problems", json={"problem_statement": statement})
+        response.raise_for_status()
+    return len(statements)
+
+async def send(client: httpx.AsyncClient, record: dict) -> Tuple[int, float, Optional[float]]:
+    path = PATHS.get(record.get("endpoint"), "/ask")
+    started = time.perf_counter()
+    first_byte: Optional[float] = None
+    try:
+        async with client.stream("POST", path, json=record["request"]) as response:
+            # Read streams to the end so the server does the full amount of work.
+            async for chunk in response.aiter_bytes():
+                if chunk and first_byte is None:
+                    first_byte = time.perf_counter() - started
+            status = response.status_code
+    except httpx.HTTPError:
+        status = 0
+    return status, time.perf_counter() - started, first_byte
+
+async def replay(records: List[dict], url: str, speed: float, timeout: float) -> List[Result]:
+    if not records:
+        return []
+    first_ts = records[0]["ts"]
+    chains: Dict[Tuple[str, str], List[dict]] = defaultdict(list)
+    for record in records:
+        # Statements recorded for hash-only questions were not uploads; they are only registered.
+        if not record.get("resolved"):
+            chains[problem_key(record)].append(record)
+
+    results: List[Result] = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        await register_problems(client, records)
+        started = time.perf_counter()
+
+        async def run_chain(chain: List[dict]) -> None:
+            for record in chain:
+                due = started + (record["ts"] - first_ts) / speed
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                lag = time.perf_counter() - due
+                status, latency, first_byte = await send(client, record)
+                results.append(Result(
+                    endpoint=record.get("endpoint", "ask"),
+                    intent=record.get("intent", ""),
+                    status=status,
+                    latency=latency,
+                    first_byte=first_byte,
+                    lag=lag
+                ))
+
+        await asyncio.gather(*(run_chain(chain) for chain in chains.values()))
+    return results
+
+def summarize(results: List[Result], elapsed: float) -> dict:
+    ok = [result for result in results if result.status == 200]
+    summary = {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "by_endpoint": {},
+        "by_intent": {}
+    }
+    series = (
+        ("latency_ms", [result.latency * 1000 for result in ok]),
+        ("ttfb_ms", [result.first_byte * 1000 for result in ok if result.endpoint == "stream" and result.first_byte is not None]),
+        # How far behind schedule requests went out: time spent waiting on the previous request of the chain.
+        ("schedule_lag_ms", [result.lag * 1000 for result in results])
+    )
+    for name, values in series:
+        for q in (50, 95, 99):
+            value = percentile(values, q)
+            summary[f"{name}_p{q}"] = round(value, 1) if value is not None else None
+    for group, attribute in (("by_endpoint", "endpoint"), ("by_intent", "intent")):
+        for result in results:
+            counts = summary[group].setdefault(getattr(result, attribute) or "unknown", {"requests": 0, "errors": 0})
+            counts["requests"] += 1
+            counts["errors"] += result.status != 200
+    return summary
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("capture", nargs="?", default="captures/requests.jsonl", help="capture file (rotated backups are included)")
+    parser.add_argument("--url", default="http://localhost:8000", help="backend to replay against")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression: 2 replays twice as fast")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N questions")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--out", default="", help="write the JSON summary to this file")
+    args = parser.parse_args()
+
+    records = load_records(capture_files(args.capture), args.limit)
+    started = time.perf_counter()
+    results = asyncio.run(replay(records, args.url, args.speed, args.timeout))
+    report = {
+        "meta": {
+            "capture": args.capture,
+            "url": args.url,
+            "speed": args.speed,
+            "recorded_span_s": round(records[-1]["ts"] - records[0]["ts"], 2) if records else 0.0,
+            "problems": len({problem_key(record) for record in records if record.get("endpoint") != "problems"})
+        },
+        "summary": summarize(results, time.perf_counter() - started)
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compare per-token SSE framing with coalesced compact framing for one long answer.
+
+Reports frames per answer, bytes on the wire (plain and gzip) and how often the
+extension re-renders the message. Run from the backend directory:
+
+    python -m benchmarks.sse_framing --words 2000 --token-delay-ms 1
+"""
+from typing import AsyncIterator, Dict, List, Tuple
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from utils.sse import GzipStream, coalesce_tokens, format_event
+
+# The extension renders at most once per animation frame.
+FRAME_INTERVAL = 1 / 60
+TOKEN_SPLIT = re.compile(r"\S+|\s+")
+VOCABULARY = [
+    "the", "array", "prefix", "sum", "we", "iterate", "over", "each", "index", "and", "keep",
+    "a", "running", "minimum", "`dp[i]`", "**answer**", "so", "total", "complexity", "is", "O(n)"
+]
+
+def synthetic_answer(words: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for start in range(0, words, 12):
+        line = " ".join(rng.choice(VOCABULARY) for _ in range(min(12, words - start)))
+        lines.append(line if start % 96 else f"\n## Step {start // 96 + 1}\n\n{line}")
+    return "\n".join(lines)
+
+async def model_tokens(answer: str, token_delay: float) -> AsyncIterator[Tuple[str, str]]:
+    for token in TOKEN_SPLIT.findall(answer):
+        await asyncio.sleep(token_delay)
+        yield "token", token
+
+def legacy_frame(token: str) -> str:
+    return f"data: {json.dumps({'token': token, 'done': False})}\n\n"
+
+def client_renders(arrivals: List[float], tokens: List[str], per_animation_frame: bool) -> Tuple[int, int]:
+    """Number of re-renders, and total answer characters re-parsed across them (the quadratic part)."""
+    renders = 0
+    parsed = 0
+    text = 0
+    next_render = 0.0
+    for arrival, token in zip(arrivals, tokens):
+        text += len(token)
+        if not per_animation_frame or arrival >= next_render:
+            renders += 1
+            parsed += text
+            next_render = arrival + FRAME_INTERVAL
+    return renders, parsed
+
+async def measure(answer: str, token_delay: float, coalesced: bool, window_ms: float, max_bytes: int) -> Dict[str, int]:
+    events = model_tokens(answer, token_delay)
+    if coalesced:
+        events = coalesce_tokens(events, window_ms / 1000, max_bytes)
+    tokens, frames, arrivals = [], [], []
+    started = time.monotonic()
+    async for _, token in events:
+        tokens.append(token)
+        frames.append(format_event({"token": token}) if coalesced else legacy_frame(token))
+        arrivals.append(time.monotonic() - started)
+
+    gzip = GzipStream()
+    gzip_bytes = sum(len(gzip.compress(frame)) for frame in frames) + len(gzip.finish())
+    renders, parsed = client_renders(arrivals, tokens, per_animation_frame=coalesced)
+    return {
+        "frames": len(frames),
+        "bytes": sum(len(frame.encode()) for frame in frames),
+        "gzip_bytes": gzip_bytes,
+        "client_renders": renders,
+        "chars_reparsed": parsed,
+        "last_frame_ms": round(arrivals[-1] * 1000) if arrivals else 0
+    }
+
+async def run(args) -> Dict[str, Dict[str, int]]:
+    answer = synthetic_answer(args.words)
+    delay = args.token_delay_ms / 1000
+    return {
+        "per_token": await measure(answer, delay, False, 0, 0),
+        "coalesced": await measure(answer, delay, True, args.window_ms, args.max_bytes)
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--token-delay-ms", type=float, default=1.0)
+    parser.add_argument("--window-ms", type=float, default=40)
+    parser.add_argument("--max-bytes", type=int, default=2048)
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    metrics = list(results["per_token"])
+    print(f"{'metric':<16}{'per_token':>12}{'coalesced':>12}")
+    for metric in metrics:
+        print(f"{metric:<16}{results['per_token'][metric]:>12}{results['coalesced'][metric]:>12}")
+
+if __name__ == "__main__":
+    main()
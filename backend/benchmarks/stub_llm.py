@@ -0,0 +1,94 @@
+"""
+Deterministic local chat model for offline benchmarks.
+
+Replies are markdown built from a hash of the prompt, so the same prompt always gets the
+same answer, and are paced by a fixed latency to the first token plus a token rate.
+"""
+from typing import Any, AsyncIterator, Iterator, List, Optional
+import asyncio
+import hashlib
+import random
+import time
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from utils.gemini_client import gemini_registry
+from utils.llm_providers import provider_registry
+
+VOCABULARY = [
+    "array", "prefix", "sum", "iterate", "index", "keep", "running", "minimum", "maximum", "window",
+    "sort", "binary", "search", "greedy", "state", "transition", "`dp[i]`", "**answer**", "modulo",
+    "graph", "edge", "visit", "queue", "O(n)", "O(n log n)", "so", "the", "we", "each", "then"
+]
+
+class StubChatModel(BaseChatModel):
+    """Chat model that answers locally with a configurable latency, speed and length."""
+    latency_seconds: float = 0.3
+    tokens_per_second: float = 200.0
+    output_tokens: int = 300
+    model: str = "stub"
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "\n".join(str(message.content) for message in messages)
+        if "intent classifier" in prompt:
+            return ["query"]
+        rng = random.Random(hashlib.sha256(prompt.encode()).digest())
+        tokens = []
+        for i in range(self.output_tokens):
+            if i % 60 == 0:
+                tokens.append(f"{chr(10) * 2 if i else ''}## Step {i // 60 + 1}\n\n")
+            tokens.append(rng.choice(VOCABULARY) + " ")
+        return tokens
+
+    def _duration(self, tokens: List[str]) -> float:
+        return self.latency_seconds + len(tokens) / self.tokens_per_second
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self._duration(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self._duration(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _due(self, started: float, index: int) -> float:
+        """Seconds until token `index` is due; paced against the start so sleep overshoot does not add up."""
+        return max(0.0, started + self.latency_seconds + (index + 1) / self.tokens_per_second - time.perf_counter())
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        started = time.perf_counter()
+        for index, token in enumerate(self._tokens(messages)):
+            time.sleep(self._due(started, index))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        started = time.perf_counter()
+        for index, token in enumerate(self._tokens(messages)):
+            await asyncio.sleep(self._due(started, index))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+def install_stub(latency_seconds: float, tokens_per_second: float, output_tokens: int) -> None:
+    """
+    Serve every model handle from a StubChatModel, and make it available to
+    LLM_PROVIDERS as "stub". Call before importing `main`.
+    """
+    def factory(model: str, temperature: float, max_tokens: int) -> StubChatModel:
+        return StubChatModel(
+            latency_seconds=latency_seconds,
+            tokens_per_second=tokens_per_second,
+            output_tokens=output_tokens,
+            model=model
+        )
+
+    gemini_registry.set_model_factory(factory)
+    provider_registry.register("stub", factory)
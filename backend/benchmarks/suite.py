@@ -0,0 +1,220 @@
+"""
+Offline benchmark of /ask and /ask/stream against a deterministic stub model.
+
+Every intent route is driven through the real FastAPI app in-process at increasing
+concurrency. The suite reports throughput, latency and time-to-first-token percentiles
+and RSS growth, and writes them as JSON for comparison between commits. Run from the
+backend directory:
+
+    python -m benchmarks.suite --concurrency 1,4,16 --requests 32 --out bench.json
+"""
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+import uuid
+
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+os.environ.setdefault("LLM_WARMUP", "false")
+os.environ.setdefault("PREFETCH_ENABLED", "false")
+
+ROUTES: Dict[str, Tuple[str, str]] = {
+    "explain": ("Explain this problem", ""),
+    "debug": (
+        "Why does my code give wrong answer on test 2?",
+        "#include <bits/stdc++.h>\nint main() {\n    int n;\n    std::cin >> n;\n    std::cout << n * 2;\n}\n"
+    ),
+    "suggest": ("Suggest an approach for this problem", ""),
+    "solve": ("Give me the full solution code", ""),
+    "hint": ("Give me a hint", ""),
+    "query": ("What is the time complexity of a segment tree?", ""),
+}
+
+STATEMENT = (
+    "Given an array of n integers, find the maximum sum of a contiguous subarray.\n"
+    "Input: the first line contains n (1 <= n <= 2 * 10^5), the second line the array.\n"
+    "Output: print the maximum subarray sum."
+)
+
+@dataclass
+class Sample:
+    status: int
+    latency: float
+    first_byte: Optional[float]
+
+async def call_app(app, path: str, body: dict) -> Sample:
+    """
+    Drive one request through the ASGI app in-process. Unlike httpx's ASGITransport this
+    sees body chunks as they are sent, so time to first byte is measurable.
+    """
+    payload = json.dumps(body).encode()
+    request_sent = False
+    never = asyncio.Event()
+    status = 0
+    first_byte: Optional[float] = None
+    started = time.perf_counter()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await never.wait()
+
+    async def send(message):
+        nonlocal status, first_byte
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body") and first_byte is None:
+            first_byte = time.perf_counter() - started
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+    await app(scope, receive, send)
+    return Sample(status=status, latency=time.perf_counter() - started, first_byte=first_byte)
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+def rss_kb() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def request_body(route: str, stream_mode: str) -> dict:
+    question, code = ROUTES[route]
+    # A fresh problem per request, so every request runs the model instead of hitting a cache.
+    problem_id = uuid.uuid4().hex[:12]
+    return {
+        "site": "benchmark",
+        "problem_title": f"{route}-{problem_id}",
+        "problem_statement": f"{STATEMENT}\nCase {problem_id}.",
+        "user_code": code,
+        "language": "cpp" if code else None,
+        "question": question,
+        "stream_mode": stream_mode
+    }
+
+async def run_level(app, endpoint: str, route: str, concurrency: int, requests: int, stream_mode: str) -> dict:
+    path = "/ask/stream" if endpoint == "stream" else "/ask"
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one() -> Sample:
+        async with limit:
+            return await call_app(app, path, request_body(route, stream_mode))
+
+    rss_before = rss_kb()
+    started = time.perf_counter()
+    samples = await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    ok = [sample for sample in samples if sample.status == 200]
+    latencies = [sample.latency * 1000 for sample in ok]
+    first_tokens = [sample.first_byte * 1000 for sample in ok if endpoint == "stream" and sample.first_byte is not None]
+    result = {
+        "endpoint": endpoint,
+        "route": route,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": requests - len(ok),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "rss_growth_kb": rss_kb() - rss_before
+    }
+    for name, values in (("latency_ms", latencies), ("ttft_ms", first_tokens)):
+        for q in (50, 95, 99):
+            value = percentile(values, q)
+            result[f"{name}_p{q}"] = round(value, 1) if value is not None else None
+    return result
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+async def run(args) -> dict:
+    from benchmarks.stub_llm import install_stub
+    install_stub(args.latency_ms / 1000, args.tokens_per_second, args.output_tokens)
+    import main
+
+    results = []
+    for endpoint in args.endpoints:
+        for route in args.routes:
+            for concurrency in args.concurrency:
+                result = await run_level(main.app, endpoint, route, concurrency, args.requests, args.stream_mode)
+                results.append(result)
+                if not args.quiet:
+                    ttft = f" ttft_p50={result['ttft_ms_p50']}ms" if result["ttft_ms_p50"] is not None else ""
+                    print(
+                        f"{endpoint:<7}{route:<8} c={concurrency:<4} {result['throughput_rps']:>8} rps  "
+                        f"p50={result['latency_ms_p50']}ms p99={result['latency_ms_p99']}ms{ttft} "
+                        f"rss+={result['rss_growth_kb']}KB"
+                    )
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "stub": {
+                "latency_ms": args.latency_ms,
+                "tokens_per_second": args.tokens_per_second,
+                "output_tokens": args.output_tokens
+            },
+            "stream_mode": args.stream_mode,
+            "requests_per_level": args.requests
+        },
+        "results": results
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="requests per route and level")
+    parser.add_argument("--routes", default=",".join(ROUTES), help="comma-separated intent routes")
+    parser.add_argument("--endpoints", default="ask,stream", help="ask, stream or both")
+    parser.add_argument("--stream-mode", default="tokens", choices=["tokens", "blocks"])
+    parser.add_argument("--latency-ms", type=float, default=300, help="stub latency to the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--output-tokens", type=int, default=300)
+    parser.add_argument("--out", default="", help="write JSON results to this file")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    args.routes = [route for route in args.routes.split(",") if route in ROUTES]
+    args.endpoints = args.endpoints.split(",")
+
+    report = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from typing import List
+
+# Hints allocate a hint number and record history, so they are never run speculatively.
+SPECULATIVE_INTENTS = ["explain", "debug", "suggest", "solve", "query"]
+
+@dataclass
+class SpeculationStats:
+    """Counters used to tune the speculative execution policy."""
+    requests: int = 0
+    launched: int = 0
+    hits: int = 0
+    misses: int = 0
+    wasted_calls: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        decided = self.hits + self.misses
+        return self.hits / decided if decided else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "launched": self.launched,
+            "hits": self.hits,
+            "misses": self.misses,
+            "wasted_calls": self.wasted_calls,
+            "hit_rate": round(self.hit_rate, 4)
+        }
+
+def pick_candidates(ranked_intents: List[str], has_code: bool, budget: int) -> List[str]:
+    """Choose which agents to start before the classifier answers, within the per-request budget."""
+    candidates = []
+    for intent in ranked_intents:
+        if len(candidates) >= budget:
+            break
+        if intent not in SPECULATIVE_INTENTS:
+            continue
+        if intent == "debug" and not has_code:
+            continue
+        candidates.append(intent)
+    return candidates
@@ -1,141 +1,463 @@
-from typing import TypedDict, Literal, List
+import asyncio
+import functools
+from typing import TypedDict, Literal, List, AsyncIterator, Tuple, Any, Dict, Optional
 from langgraph.graph import StateGraph, END
+from langgraph.types import StreamWriter
 from agents.intent_classifier import IntentClassifier
+from agents.fast_intent_classifier import FastIntentClassifier
 from agents.explain_agent import ExplainAgent
 from agents.debug_agent import DebugAgent
 from agents.suggest_agent import SuggestAgent
 from agents.solver_agent import SolverAgent
 from agents.hint_agent import HintAgent
 from agents.query_agent import QueryAgent
+from agents.summary_agent import SummaryAgent
+from agents.digest_agent import DigestAgent
 from utils.hint_storage import hint_storage
 from utils.chat_storage import chat_storage
+from utils.hint_ledger import hint_ledger
+from utils.hint_ladder import hint_ladders
+from utils.config import get_settings
+from utils.stream_fanout import ReplayableStream
+from utils.answer_cache import answer_cache
+from utils.markdown_blocks import split_blocks
+from utils.problem_digest import ProblemDigest, problem_digests
+from utils.code_snapshots import code_snapshots
+from utils.code_precheck import precheck, format_issue
+from utils.prefetch import PREFETCH_QUESTIONS, is_generic_question, prefetch_queue
+from utils.metrics import node_seconds
+from graph.speculation import SpeculationStats, pick_candidates
+
+MAX_HINTS = 7
 
 class GraphState(TypedDict):
     site: str
     problem_title: str
     problem_statement: str
+    problem_hash: str
     user_code: str
     language: str
     question: str
     intent: str
+    intent_source: str
+    intent_confidence: float
     answer: str
     agent_used: str
     preferred_language: str
     hint_steps: list
     chat_history: str
+    speculation: Optional[ReplayableStream]
+    debug_analysis: str
+    problem_digest: Optional[ProblemDigest]
+    bypass_cache: bool
+    cache_hit: bool
 
 class CPAssistantGraph:
     def __init__(self):
         self.intent_classifier = IntentClassifier()
+        self.fast_intent_classifier = FastIntentClassifier()
+        settings = get_settings()
+        self.fast_intent_threshold = settings.fast_intent_threshold
+        self.speculative_execution = settings.speculative_execution
+        self.speculative_max_calls = settings.speculative_max_calls
+        self.speculation_stats = SpeculationStats()
         self.explain_agent = ExplainAgent()
         self.debug_agent = DebugAgent()
         self.suggest_agent = SuggestAgent()
         self.solver_agent = SolverAgent()
         self.hint_agent = HintAgent()
         self.query_agent = QueryAgent()
+        self.summary_agent = SummaryAgent()
+        chat_storage.set_summarizer(self.summary_agent.afold)
+        self.digest_agent = DigestAgent()
+        if settings.problem_digest_llm:
+            problem_digests.refine = self.digest_agent.adigest
         
         self.graph = self._build_graph()
     
-    def _classify_intent(self, state: GraphState) -> GraphState:
-        has_code = bool(state.get("user_code"))
-        intent = self.intent_classifier.classify(state["question"], has_code)
-        state["intent"] = intent
-        return state
+    async def _collect_stream(self, chunks: AsyncIterator[str], writer: StreamWriter) -> str:
+        """Forward model chunks to the graph's custom stream and return the assembled answer."""
+        parts = []
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            parts.append(chunk)
+            writer({"token": chunk})
+        return "".join(parts)
+    
+    def _agent_chunks(self, intent: str, state: GraphState) -> AsyncIterator[str]:
+        """
+        Start the agent for an intent that changes no shared state and return its chunk
+        stream. Safe to call speculatively; usage counters are updated by the nodes.
+        """
+        site = state["site"]
+        title = state.get("problem_title", "")
+        problem = state.get("problem_statement", "")
+        question = state["question"]
+        digest = self._digest_text(state)
+        
+        if intent == "explain":
+            return self.explain_agent.astream(
+                site=site,
+                title=title,
+                problem=problem,
+                question=question,
+                digest=digest
+            )
+        if intent == "debug":
+            code = state.get("user_code", "")
+            diff = code_snapshots.followup_diff(site, title, code)
+            if diff is not None:
+                state["debug_analysis"] = "incremental"
+                return self.debug_agent.astream_followup(
+                    site=site,
+                    problem=problem,
+                    diff=diff,
+                    previous_findings=code_snapshots.get(site, title).findings,
+                    language=state.get("language", "unknown"),
+                    question=question,
+                    digest=digest
+                )
+            state["debug_analysis"] = "full"
+            return self.debug_agent.astream(
+                site=site,
+                problem=problem,
+                code=code,
+                language=state.get("language", "unknown"),
+                question=question,
+                digest=digest
+            )
+        if intent == "suggest":
+            return self.suggest_agent.astream(
+                site=site,
+                title=title,
+                problem=problem,
+                question=question,
+                digest=digest,
+                tags=", ".join(state["problem_digest"].tags) if state.get("problem_digest") else ""
+            )
+        if intent == "solve":
+            return self.solver_agent.astream(
+                site=site,
+                title=title,
+                problem=problem,
+                language=state.get("preferred_language", "cpp"),
+                question=question,
+                digest=digest
+            )
+        if intent == "query":
+            return self.query_agent.astream(
+                site=site,
+                title=title,
+                problem=problem,
+                question=question,
+                chat_history=state.get("chat_history", "No previous conversation."),
+                digest=digest
+            )
+        raise ValueError(f"No streaming agent for intent '{intent}'")
     
-    def _explain_node(self, state: GraphState) -> GraphState:
-        answer = self.explain_agent.run(
+    def _answer_chunks(self, intent: str, state: GraphState) -> AsyncIterator[str]:
+        """Reuse the speculative run kept for this intent, otherwise call the agent now."""
+        speculation = state.get("speculation")
+        if speculation is not None:
+            state["speculation"] = None
+            # From here on the run has one reader; stop it if that reader goes away.
+            speculation.cancel_when_abandoned = True
+            return speculation.subscribe()
+        return self._agent_chunks(intent, state)
+    
+    def _cache_key(self, intent: str, state: GraphState, question: Optional[str] = None) -> Optional[str]:
+        return answer_cache.make_key(
+            intent=intent,
             site=state["site"],
             title=state.get("problem_title", ""),
-            problem=state.get("problem_statement", ""),
-            question=state["question"]
+            question=question or state["question"],
+            statement=state.get("problem_statement", ""),
+            language=state.get("preferred_language", "cpp"),
+            digest=state.get("problem_hash", "")
+        )
+    
+    def _cached_answer(self, intent: str, state: GraphState) -> Optional[Tuple[str, Optional[List[str]]]]:
+        """The cached answer and its markdown blocks, if there is one."""
+        if state.get("bypass_cache"):
+            return None
+        cache_key = self._cache_key(intent, state)
+        if cache_key is None:
+            return None
+        cached = answer_cache.get(cache_key)
+        if cached is None and intent in PREFETCH_QUESTIONS and is_generic_question(state["question"]):
+            # "what does this problem ask?" and friends are served by the prefetched explanation.
+            cache_key = self._cache_key(intent, state, PREFETCH_QUESTIONS[intent])
+            cached = answer_cache.get(cache_key)
+        if cached is None:
+            return None
+        return cached, answer_cache.blocks(cache_key)
+    
+    def _drop_speculation(self, state: GraphState) -> None:
+        """Cancel the kept speculative run when the answer does not need it after all."""
+        speculation = state.get("speculation")
+        if speculation is not None:
+            speculation.cancel()
+            state["speculation"] = None
+            self.speculation_stats.wasted_calls += 1
+    
+    async def _generate_answer(self, intent: str, state: GraphState, writer: StreamWriter) -> str:
+        """Serve the answer from the response cache when possible, otherwise stream it from the agent."""
+        cached = self._cached_answer(intent, state)
+        if cached is not None:
+            answer, blocks = cached
+            self._drop_speculation(state)
+            writer({"token": answer, "blocks": blocks})
+            state["cache_hit"] = True
+            return answer
+        
+        answer = await self._collect_stream(self._answer_chunks(intent, state), writer)
+        cache_key = self._cache_key(intent, state)
+        if cache_key is not None and answer:
+            answer_cache.set(cache_key, answer, intent, split_blocks(answer))
+        return answer
+    
+    def _speculate(self, state: GraphState, ranked_intents: List[str], has_code: bool) -> Dict[str, ReplayableStream]:
+        """
+        Start the most likely agents so they run while the LLM classifier decides.
+        Intents whose answer is already cached are skipped, since they need no model call.
+        """
+        self.speculation_stats.requests += 1
+        uncached = [intent for intent in ranked_intents if self._cached_answer(intent, state) is None]
+        candidates = pick_candidates(uncached, has_code, self.speculative_max_calls)
+        runs = {intent: ReplayableStream(self._agent_chunks(intent, state)) for intent in candidates}
+        self.speculation_stats.launched += len(runs)
+        return runs
+    
+    def _resolve_speculation(self, runs: Dict[str, ReplayableStream], intent: str) -> Optional[ReplayableStream]:
+        """Keep the run matching the final intent and cancel the rest."""
+        if not runs:
+            return None
+        kept = runs.pop(intent, None)
+        if kept is not None:
+            self.speculation_stats.hits += 1
+        else:
+            self.speculation_stats.misses += 1
+        for run in runs.values():
+            run.cancel()
+        self.speculation_stats.wasted_calls += len(runs)
+        return kept
+    
+    def _digest_text(self, state: GraphState) -> str:
+        digest = state.get("problem_digest")
+        return digest.format_for_prompt() if digest is not None else ""
+    
+    async def _digest_node(self, state: GraphState) -> GraphState:
+        """Attach the shared per-problem digest (constraints, target complexity, topics)."""
+        state["problem_digest"] = problem_digests.get(
+            state.get("problem_title", ""),
+            state.get("problem_statement", ""),
+            state.get("problem_hash", "")
         )
+        return state
+    
+    async def _classify_intent(self, state: GraphState) -> GraphState:
+        has_code = bool(state.get("user_code"))
+        prediction = self.fast_intent_classifier.predict(state["question"], has_code)
+        
+        if prediction.confidence >= self.fast_intent_threshold:
+            state["intent"] = prediction.intent
+            state["intent_source"] = prediction.source
+            state["intent_confidence"] = prediction.confidence
+            return state
+        
+        runs = {}
+        if self.speculative_execution:
+            runs = self._speculate(state, prediction.ranked_intents(), has_code)
+        
+        try:
+            intent = await self.intent_classifier.aclassify(state["question"], has_code)
+        except BaseException:
+            self._resolve_speculation(runs, "")
+            raise
+        
+        state["intent"] = intent
+        state["intent_source"] = "llm"
+        state["intent_confidence"] = 1.0
+        state["speculation"] = self._resolve_speculation(runs, intent)
+        return state
+    
+    async def _explain_node(self, state: GraphState, writer: StreamWriter) -> GraphState:
+        answer = await self._generate_answer("explain", state, writer)
         state["answer"] = answer
         state["agent_used"] = "ExplainAgent"
         return state
     
-    def _debug_node(self, state: GraphState) -> GraphState:
-        answer = self.debug_agent.run(
-            site=state["site"],
-            problem=state.get("problem_statement", ""),
-            code=state.get("user_code", ""),
-            language=state.get("language", "unknown"),
-            question=state["question"]
-        )
+    async def _debug_node(self, state: GraphState, writer: StreamWriter) -> GraphState:
+        site = state["site"]
+        title = state.get("problem_title", "")
+        code = state.get("user_code", "")
+        language = state.get("language", "unknown")
+        
+        issue = precheck(code, language)
+        if issue is not None:
+            # A definite syntax error is answered locally, without an LLM call.
+            self._drop_speculation(state)
+            answer = format_issue(issue, code, language)
+            writer({"token": answer})
+            code_snapshots.precheck_answers += 1
+        else:
+            answer = await self._generate_answer("debug", state, writer)
+            if not state.get("cache_hit"):
+                if state.get("debug_analysis") == "incremental":
+                    code_snapshots.incremental_analyses += 1
+                else:
+                    code_snapshots.full_analyses += 1
+            if code and answer:
+                code_snapshots.record(site, title, code, answer)
         state["answer"] = answer
         state["agent_used"] = "DebugAgent"
         return state
     
-    def _suggest_node(self, state: GraphState) -> GraphState:
-        answer = self.suggest_agent.run(
-            site=state["site"],
-            title=state.get("problem_title", ""),
-            problem=state.get("problem_statement", ""),
-            question=state["question"]
-        )
+    async def _suggest_node(self, state: GraphState, writer: StreamWriter) -> GraphState:
+        answer = await self._generate_answer("suggest", state, writer)
         state["answer"] = answer
         state["agent_used"] = "SuggestAgent"
         return state
     
-    def _solve_node(self, state: GraphState) -> GraphState:
-        preferred_lang = state.get("preferred_language", "cpp")
-        answer = self.solver_agent.run(
-            site=state["site"],
-            title=state.get("problem_title", ""),
-            problem=state.get("problem_statement", ""),
-            language=preferred_lang,
-            question=state["question"]
-        )
+    async def _solve_node(self, state: GraphState, writer: StreamWriter) -> GraphState:
+        answer = await self._generate_answer("solve", state, writer)
         state["answer"] = answer
         state["agent_used"] = "SolverAgent"
         return state
     
-    def _hint_node(self, state: GraphState) -> GraphState:
+    def _hint_chunks(self, state: GraphState, hint_number: int, max_hints: int) -> AsyncIterator[str]:
+        """
+        Serve a hint from the problem's shared ladder. Hint #1 kicks off generation of the
+        whole ladder in one call; later hints come from it, or from a single-hint call if
+        no ladder is available.
+        """
         site = state["site"]
         title = state.get("problem_title", "")
+        problem = state.get("problem_statement", "")
+        digest = self._digest_text(state)
         
-        hint_history = hint_storage.get_hint_history(site, title)
-        next_hint_num = hint_storage.get_next_hint_number(site, title)
+        async def single_hint() -> AsyncIterator[str]:
+            previous_hints = await hint_storage.aget_hint_history(site, title)
+            async for chunk in self.hint_agent.astream(
+                site=site,
+                title=title,
+                problem=problem,
+                hint_number=hint_number,
+                previous_hints=previous_hints,
+                question=state["question"],
+                max_hints=max_hints,
+                digest=digest
+            ):
+                yield chunk
         
-        MAX_HINTS = 7
-        if next_hint_num > MAX_HINTS:
-            answer = f"**Maximum Hints Reached**\n\nYou've received all {MAX_HINTS} hints for this problem. These hints should guide you to the solution. Try implementing it yourself, or ask me to 'solve' the problem for a complete solution."
-            state["answer"] = answer
-            state["agent_used"] = "HintAgent"
-            return state
+        ladder = hint_ladders.get(site, title, problem)
+        if ladder is None and hint_number == 1:
+            ladder = hint_ladders.start(site, title, problem, self.hint_agent.astream_ladder(
+                site=site,
+                title=title,
+                problem=problem,
+                max_hints=max_hints,
+                digest=digest
+            ))
         
-        answer = self.hint_agent.run(
-            site=site,
-            title=title,
-            problem=state.get("problem_statement", ""),
-            hint_number=next_hint_num,
-            previous_hints=hint_history,
-            question=state["question"],
-            max_hints=MAX_HINTS
-        )
+        if ladder is not None and ladder.can_serve(hint_number):
+            hint_ladders.served += 1
+            return ladder.section_chunks(hint_number, single_hint)
+        return single_hint()
+    
+    async def _hint_node(self, state: GraphState, writer: StreamWriter) -> GraphState:
+        site = state["site"]
+        title = state.get("problem_title", "")
         
-        hint_storage.add_hint(site, title, next_hint_num, answer)
+        async with hint_ledger.allocating(site, title):
+            pending = hint_ledger.pending(site, title)
+            if pending is None:
+                next_hint_num = await hint_ledger.reserve(site, title)
+                if next_hint_num > MAX_HINTS:
+                    hint_ledger.release(site, title, next_hint_num)
+                    answer = f"**Maximum Hints Reached**\n\nYou've received all {MAX_HINTS} hints for this problem. These hints should guide you to the solution. Try implementing it yourself, or ask me to 'solve' the problem for a complete solution."
+                    writer({"token": answer})
+                    state["answer"] = answer
+                    state["agent_used"] = "HintAgent"
+                    return state
+                
+                chunks = self._hint_chunks(state, next_hint_num, MAX_HINTS)
+                pending = hint_ledger.start(site, title, next_hint_num, chunks)
+        
+        answer = await self._collect_stream(pending.stream.subscribe(), writer)
         
         state["answer"] = answer
         state["agent_used"] = "HintAgent"
-        state["hint_steps"] = [h.hint_number for h in hint_storage.get_hint_history(site, title)]
+        state["hint_steps"] = [h.hint_number for h in await hint_storage.aget_hint_history(site, title)]
         return state
     
-    def _query_node(self, state: GraphState) -> GraphState:
-        site = state["site"]
-        title = state.get("problem_title", "")
-        chat_history = state.get("chat_history", "No previous conversation.")
-        
-        answer = self.query_agent.run(
-            site=site,
-            title=title,
-            problem=state.get("problem_statement", ""),
-            question=state["question"],
-            chat_history=chat_history
-        )
+    async def _query_node(self, state: GraphState, writer: StreamWriter) -> GraphState:
+        answer = await self._generate_answer("query", state, writer)
         state["answer"] = answer
         state["agent_used"] = "QueryAgent"
         return state
     
+    def prefetch(self, site: str, title: str, statement: str, problem_hash: str) -> List[str]:
+        """
+        Queue low-priority warm-up for a problem page that was just opened: the digest,
+        the explanation for a generic "explain" question and the hint ladder.
+        Returns the kinds of work that were queued (already-warm or queued work is skipped).
+        """
+        state = {
+            "site": site,
+            "problem_title": title,
+            "problem_statement": statement,
+            "problem_hash": problem_hash,
+            "user_code": "",
+            "language": "unknown",
+            "question": PREFETCH_QUESTIONS["explain"],
+            "preferred_language": "cpp",
+            "problem_digest": None
+        }
+        
+        async def warm_digest() -> None:
+            problem_digests.get(title, statement, problem_hash)
+        
+        async def warm_explanation() -> None:
+            state["problem_digest"] = problem_digests.get(title, statement, problem_hash)
+            parts = [chunk async for chunk in self._agent_chunks("explain", state)]
+            answer = "".join(parts)
+            if answer:
+                answer_cache.set(explain_key, answer, "explain", split_blocks(answer))
+        
+        async def warm_hint_ladder() -> None:
+            state["problem_digest"] = problem_digests.get(title, statement, problem_hash)
+            ladder = hint_ladders.get(site, title, statement)
+            if ladder is None:
+                ladder = hint_ladders.start(site, title, statement, self.hint_agent.astream_ladder(
+                    site=site,
+                    title=title,
+                    problem=statement,
+                    max_hints=MAX_HINTS,
+                    digest=self._digest_text(state)
+                ))
+            try:
+                await ladder.stream.result()
+            except asyncio.CancelledError:
+                # Leave the ladder running for a hint request that has joined it.
+                if ladder.stream.subscribers == 0:
+                    ladder.stream.cancel()
+                raise
+        
+        queued = []
+        if not problem_digests.contains(problem_hash):
+            if prefetch_queue.submit(f"digest:{problem_hash}", problem_hash, 0, warm_digest):
+                queued.append("digest")
+        explain_key = self._cache_key("explain", state)
+        if not answer_cache.contains(explain_key):
+            if prefetch_queue.submit(f"explain:{explain_key}", problem_hash, 1, warm_explanation):
+                queued.append("explain")
+        if hint_ladders.get(site, title, statement) is None:
+            if prefetch_queue.submit(f"hint_ladder:{site}:{title}:{problem_hash}", problem_hash, 2, warm_hint_ladder):
+                queued.append("hint_ladder")
+        return queued
+    
     def _route_by_intent(self, state: GraphState) -> Literal["explain", "debug", "suggest", "solve", "hint", "query"]:
         intent = state["intent"]
         valid_intents = ["explain", "debug", "suggest", "solve", "hint", "query"]
@@ -143,18 +465,28 @@ class CPAssistantGraph:
             return intent  # type: ignore
         return "query"
     
+    def _timed(self, name: str, node):
+        """Wrap a node so its latency is recorded; functools.wraps keeps the signature LangGraph inspects."""
+        @functools.wraps(node)
+        async def timed(state: GraphState, **kwargs):
+            with node_seconds.time(node=name):
+                return await node(state, **kwargs)
+        return timed
+    
     def _build_graph(self):
         workflow = StateGraph(GraphState)
         
-        workflow.add_node("classify", self._classify_intent)
-        workflow.add_node("explain", self._explain_node)
-        workflow.add_node("debug", self._debug_node)
-        workflow.add_node("suggest", self._suggest_node)
-        workflow.add_node("solve", self._solve_node)
-        workflow.add_node("hint", self._hint_node)
-        workflow.add_node("query", self._query_node)
+        workflow.add_node("digest", self._timed("digest", self._digest_node))
+        workflow.add_node("classify", self._timed("classify", self._classify_intent))
+        workflow.add_node("explain", self._timed("explain", self._explain_node))
+        workflow.add_node("debug", self._timed("debug", self._debug_node))
+        workflow.add_node("suggest", self._timed("suggest", self._suggest_node))
+        workflow.add_node("solve", self._timed("solve", self._solve_node))
+        workflow.add_node("hint", self._timed("hint", self._hint_node))
+        workflow.add_node("query", self._timed("query", self._query_node))
         
-        workflow.set_entry_point("classify")
+        workflow.set_entry_point("digest")
+        workflow.add_edge("digest", "classify")
         
         workflow.add_conditional_edges(
             "classify",
@@ -178,6 +510,26 @@ class CPAssistantGraph:
         
         return workflow.compile()
     
-    def run(self, input_data: dict) -> dict:
-        result = self.graph.invoke(input_data)
+    async def arun(self, input_data: dict) -> dict:
+        result = await self.graph.ainvoke(input_data)
         return result
+    
+    async def astream(self, input_data: dict) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Run the graph and yield ("token", text) events as the chosen agent streams,
+        followed by a single ("done", final_state) event. A cached answer stored with
+        its markdown blocks is preceded by a ("blocks", [...]) event.
+        """
+        final_state = input_data
+        async for mode, chunk in self.graph.astream(input_data, stream_mode=["custom", "values"]):
+            if mode == "custom":
+                if chunk.get("blocks"):
+                    yield "blocks", chunk["blocks"]
+                yield "token", chunk["token"]
+            else:
+                final_state = chunk
+        yield "done", final_state
+    
+    def run(self, input_data: dict) -> dict:
+        """Blocking wrapper around `arun` for callers outside an event loop."""
+        return asyncio.run(self.arun(input_data))
@@ -1,28 +1,79 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from models.schemas import QueryRequest, QueryResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from models.schemas import (
+    QueryRequest, QueryResponse, ProblemUpload, ProblemUploadResponse,
+    PrefetchRequest, PrefetchResponse, PrefetchCancel
+)
 from graph.workflow import CPAssistantGraph
 from utils.config import get_settings
 from utils.chat_storage import chat_storage
+from utils.hint_storage import hint_storage
+from utils.hint_ledger import hint_ledger
+from utils.hint_ladder import hint_ladders
+from utils.answer_cache import answer_cache
+from utils.single_flight import single_flight
+from utils.gemini_client import gemini_registry
+from utils.llm_providers import provider_registry
+from utils.prompt_budget import prompt_budget
+from utils.problem_registry import problem_registry
+from utils.problem_digest import problem_digests
+from utils.code_snapshots import code_snapshots
+from utils.prefetch import prefetch_queue
+from utils.disconnect import ClientDisconnected, cancel_on_disconnect, cancellation_stats
+from utils.stream_buffer import BufferedStream, parse_last_event_id, stream_buffer
+from utils.sse import GzipStream, accepts_gzip, coalesce_tokens, format_event
+from utils.markdown_blocks import MarkdownBlockSplitter
+from utils.metrics import (
+    metrics, requests_total, requests_in_flight, stream_first_byte_seconds, stream_seconds
+)
+from utils.traffic_capture import TrafficCaptureMiddleware, capture_writer
+from contextlib import asynccontextmanager
+from typing import Optional, Union
 import uvicorn
-import json
 import asyncio
-
-app = FastAPI(title="CP Assistant API")
+import time
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.llm_warmup:
+        await gemini_registry.warm_up()
+    if settings.prefetch_enabled:
+        prefetch_queue.start()
+    yield
+    await prefetch_queue.stop()
+    chat_storage.close()
+    hint_storage.close()
+    if capture_writer is not None:
+        capture_writer.close()
+
+app = FastAPI(title="CP Assistant API", lifespan=lifespan)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Stream-Id"],
 )
 
+if capture_writer is not None:
+    app.add_middleware(
+        TrafficCaptureMiddleware,
+        writer=capture_writer,
+        max_field_chars=settings.capture_max_field_chars
+    )
+
 cp_graph = CPAssistantGraph()
 
+metrics.gauge(
+    "cp_conversations", "Conversations currently held in chat storage.",
+    callback=lambda: chat_storage.snapshot().get("conversations", 0)
+)
+
 @app.get("/")
 async def root():
     return {"message": "CP Assistant API is running", "status": "ok"}
@@ -32,6 +83,34 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/stats")
+async def stats():
+    """Internal counters for tuning performance features."""
+    return {
+        "speculation": cp_graph.speculation_stats.snapshot(),
+        "answer_cache": answer_cache.snapshot(),
+        "single_flight": single_flight.snapshot(),
+        "llm_clients": gemini_registry.snapshot(),
+        "llm_providers": provider_registry.snapshot(),
+        "chat_storage": chat_storage.snapshot(),
+        "hint_storage": hint_storage.snapshot(),
+        "hint_ledger": hint_ledger.snapshot(),
+        "hint_ladders": hint_ladders.snapshot(),
+        "prompt_budget": prompt_budget.snapshot(),
+        "problem_registry": problem_registry.snapshot(),
+        "problem_digests": problem_digests.snapshot(),
+        "code_snapshots": code_snapshots.snapshot(),
+        "prefetch": prefetch_queue.snapshot(),
+        "disconnects": cancellation_stats.snapshot(),
+        "stream_buffer": stream_buffer.snapshot(),
+        "traffic_capture": capture_writer.snapshot() if capture_writer is not None else None
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Request, node, model-call and stream latency metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 def detect_preferred_language(question: str, current_language: str) -> str:
     """Detect preferred programming language from question or fallback to current/default."""
     question_lower = question.lower()
@@ -58,111 +137,288 @@ def detect_preferred_language(question: str, current_language: str) -> str:
     
     return "cpp"
 
-async def generate_streaming_response(answer_text: str, agent_used: str, intent: str):
-    """Generate streaming response token by token while preserving markdown structure."""
-    import re
+@app.post("/problems", response_model=ProblemUploadResponse)
+async def register_problem(upload: ProblemUpload):
+    """Store a problem statement once; later questions can send its hash instead of the text."""
+    return ProblemUploadResponse(problem_hash=problem_registry.register(upload.problem_statement))
+
+@app.head("/problems/{problem_hash}")
+@app.get("/problems/{problem_hash}")
+async def problem_exists(problem_hash: str):
+    if problem_registry.get(problem_hash) is None:
+        raise HTTPException(status_code=404, detail={"error": "problem_not_found", "problem_hash": problem_hash})
+    return {"problem_hash": problem_hash}
+
+def resolve_problem_statement(request: Union[QueryRequest, PrefetchRequest], capture: Optional[dict] = None) -> None:
+    """
+    Fill in the statement from the problem registry when the client sent only its hash.
+    Raises a 404 with error "problem_not_found" if the hash is unknown or was evicted,
+    so the client can upload the statement again and retry. The resolved statement is
+    noted in `capture`, if given, so the traffic capture can replay it.
+    """
+    if request.problem_statement or not request.problem_hash:
+        request.problem_hash = None
+        return
+    statement = problem_registry.get(request.problem_hash)
+    if statement is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": "problem_not_found", "problem_hash": request.problem_hash}
+        )
+    request.problem_statement = statement
+    if capture is not None:
+        capture["problem_statement"] = statement
+
+@app.post("/prefetch", response_model=PrefetchResponse)
+async def prefetch(request: PrefetchRequest):
+    """
+    Warm caches for a problem page that was just opened, ahead of the first question.
+    The work runs at low priority and is shared by every client on the same problem.
+    """
+    resolve_problem_statement(request)
+    statement = request.problem_statement or ""
+    if not statement:
+        raise HTTPException(status_code=400, detail="problem_statement or problem_hash is required")
     
-    tokens = re.findall(r'\S+|\s+', answer_text)
+    problem_hash = problem_registry.register(statement)
+    queued = []
+    if settings.prefetch_enabled:
+        queued = cp_graph.prefetch(request.site, request.problem_title or "", statement, problem_hash)
+        prefetch_queue.add_interest(problem_hash)
+    return PrefetchResponse(problem_hash=problem_hash, queued=queued)
+
+@app.post("/prefetch/cancel")
+async def cancel_prefetch(request: PrefetchCancel):
+    """Withdraw interest in a prefetch, e.g. when the problem page is closed."""
+    return {"cancelled": prefetch_queue.cancel(request.problem_hash)}
+
+def build_input_state(request: QueryRequest, chat_history: str) -> dict:
+    """Build the initial graph state for a query."""
+    preferred_lang = detect_preferred_language(
+        request.question, 
+        request.language or "cpp"
+    )
     
-    for token in tokens:
-        chunk = {
-            "token": token,
-            "done": False
-        }
-        yield f"data: {json.dumps(chunk)}\n\n"
-        
-        if '\n' not in token:
-            await asyncio.sleep(0.02)
+    return {
+        "site": request.site,
+        "problem_title": request.problem_title or "",
+        "problem_statement": request.problem_statement or "",
+        "problem_hash": request.problem_hash or "",
+        "user_code": request.user_code or "",
+        "language": request.language or "unknown",
+        "question": request.question,
+        "intent": "",
+        "intent_source": "",
+        "intent_confidence": 0.0,
+        "answer": "",
+        "agent_used": "",
+        "preferred_language": preferred_lang,
+        "hint_steps": [],
+        "chat_history": chat_history,
+        "speculation": None,
+        "debug_analysis": "",
+        "problem_digest": None,
+        "bypass_cache": request.bypass_cache,
+        "cache_hit": False
+    }
+
+async def generate_streaming_response(input_state: dict, blocks: bool = False, capture: Optional[dict] = None):
+    """
+    Stream answer chunks from the graph as SSE events the moment the model produces them.
+    If the stream is abandoned, the graph run (and the model call under it) is cancelled
+    and the unfinished turn is not saved to the chat history.
+    
+    With `blocks`, events carry finished markdown blocks ({"block": ...}) and the growth
+    of the unfinished rest since the previous event ({"token": ...}, appended to the tail
+    the client keeps; a finished block starts a new tail). A tail that was rewritten
+    rather than extended is sent whole ({"tail": ...}). The client only has to re-render
+    the tail. The resolved intent, agent and providers are noted in `capture`,
+    if given.
+    """
+    site = input_state["site"]
+    title = input_state["problem_title"]
+    
+    budget = prompt_budget.begin_request()
+    providers = provider_registry.begin_request()
+    events = coalesce_tokens(
+        cp_graph.astream(input_state),
+        settings.sse_coalesce_ms / 1000,
+        settings.sse_coalesce_bytes
+    )
+    splitter = MarkdownBlockSplitter() if blocks else None
+    replayed = False
+    streamed = []
+    with requests_in_flight.track(endpoint="stream"), prefetch_queue.interactive():
+        try:
+            result = input_state
+            async for event, payload in events:
+                if event == "token":
+                    streamed.append(payload)
+                    if splitter is None:
+                        yield format_event({"token": payload})
+                    elif not replayed:
+                        for block in splitter.feed(payload):
+                            yield format_event({"block": block})
+                        update = splitter.tail_update()
+                        if update is not None:
+                            yield format_event(update)
+                elif event == "blocks":
+                    if splitter is not None:
+                        # Cached answer: its blocks were split when it was stored.
+                        replayed = True
+                        for block in payload:
+                            yield format_event({"block": block})
+                elif event == "done":
+                    result = payload
+            if splitter is not None and not replayed:
+                for block in splitter.finish():
+                    yield format_event({"block": block})
+        except (asyncio.CancelledError, GeneratorExit):
+            cancellation_stats.record_cancelled("".join(streamed))
+            raise
+        except Exception as e:
+            error_chunk = {
+                "token": "",
+                "done": True,
+                "error": str(e)
+            }
+            yield format_event(error_chunk)
+            return
+    
+    requests_total.inc(endpoint="stream", intent=result["intent"], agent=result["agent_used"])
+    if capture is not None:
+        capture.update(intent=result["intent"], agent=result["agent_used"], providers=providers)
+    if not result.get("cache_hit"):
+        cancellation_stats.record_completed(result["answer"])
+    chat_storage.add_message(site, title, "assistant", result["answer"], result["agent_used"])
     
     final_chunk = {
         "token": "",
         "done": True,
-        "agent_used": agent_used,
-        "intent": intent
+        "agent_used": result["agent_used"],
+        "intent": result["intent"],
+        "tokens_saved": budget.tokens_saved
     }
-    yield f"data: {json.dumps(final_chunk)}\n\n"
+    yield format_event(final_chunk)
+    
+    await chat_storage.acompact_history(site, title)
+
+def stream_response(stream: BufferedStream, start: int, http_request: Request,
+                    received_at: Optional[float] = None) -> StreamingResponse:
+    """
+    Relay a buffered answer stream from sequence number `start` until it ends or the client
+    leaves, gzip-compressed per frame when enabled and accepted by the client.
+    With `received_at` (a perf_counter timestamp), time to first byte and duration are recorded.
+    """
+    gzip = GzipStream() if settings.sse_gzip and accepts_gzip(http_request.headers.get("accept-encoding")) else None
+    
+    async def relay():
+        frames = stream_buffer.follow(stream, start)
+        first = received_at is not None
+        try:
+            async for frame in cancel_on_disconnect(frames, http_request.is_disconnected, settings.disconnect_poll_seconds):
+                if first:
+                    first = False
+                    stream_first_byte_seconds.observe(time.perf_counter() - received_at)
+                yield gzip.compress(frame) if gzip else frame
+        except ClientDisconnected:
+            return
+        finally:
+            if received_at is not None:
+                stream_seconds.observe(time.perf_counter() - received_at)
+        if gzip:
+            yield gzip.finish()
+    
+    headers = {"X-Stream-Id": stream.stream_id}
+    if gzip:
+        headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+    return StreamingResponse(relay(), media_type="text/event-stream", headers=headers)
+
+def resume_position(http_request: Request) -> Optional[tuple]:
+    """(stream, next sequence number) for a Last-Event-ID header naming a buffered stream."""
+    last_event = parse_last_event_id(http_request.headers.get("last-event-id"))
+    if last_event is None:
+        return None
+    stream = stream_buffer.get(last_event[0])
+    if stream is None:
+        return None
+    return stream, last_event[1] + 1
 
 @app.post("/ask/stream")
-async def ask_question_stream(request: QueryRequest):
-    """Streaming endpoint that sends response token-by-token."""
+async def ask_question_stream(request: QueryRequest, http_request: Request):
+    """
+    Streaming endpoint that sends response token-by-token. Every event carries an ID;
+    a retry sending Last-Event-ID resumes the buffered answer instead of asking again.
+    """
+    received_at = time.perf_counter()
+    capture = http_request.scope.get("capture")
+    resume = resume_position(http_request)
+    if resume is not None:
+        if capture is not None:
+            capture["resumed"] = True
+        return stream_response(*resume, http_request)
+    
+    resolve_problem_statement(request, capture)
     try:
-        preferred_lang = detect_preferred_language(
-            request.question, 
-            request.language or "cpp"
-        )
-        
         site = request.site
         title = request.problem_title or ""
         
-        chat_history = chat_storage.format_history_for_prompt(site, title)
+        chat_history = await chat_storage.aformat_history_for_prompt(site, title)
         
         chat_storage.add_message(site, title, "user", request.question)
         
-        input_state = {
-            "site": site,
-            "problem_title": title,
-            "problem_statement": request.problem_statement or "",
-            "user_code": request.user_code or "",
-            "language": request.language or "unknown",
-            "question": request.question,
-            "intent": "",
-            "answer": "",
-            "agent_used": "",
-            "preferred_language": preferred_lang,
-            "hint_steps": [],
-            "chat_history": chat_history
-        }
-        
-        result = cp_graph.run(input_state)
-        
-        chat_storage.add_message(site, title, "assistant", result["answer"], result["agent_used"])
+        input_state = build_input_state(request, chat_history)
         
-        return StreamingResponse(
-            generate_streaming_response(result["answer"], result["agent_used"], result["intent"]),
-            media_type="text/event-stream"
+        stream = stream_buffer.start(
+            generate_streaming_response(input_state, request.stream_mode == "blocks", capture)
         )
+        return stream_response(stream, 0, http_request, received_at)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ask/stream/{stream_id}")
+async def resume_question_stream(stream_id: str, http_request: Request):
+    """Reconnect to a buffered answer stream, continuing after the Last-Event-ID header if given."""
+    resume = resume_position(http_request)
+    if resume is not None and resume[0].stream_id == stream_id:
+        return stream_response(*resume, http_request)
+    
+    stream = stream_buffer.get(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail={"error": "stream_not_found", "stream_id": stream_id})
+    return stream_response(stream, 0, http_request)
+
 @app.post("/ask", response_model=QueryResponse)
-async def ask_question(request: QueryRequest):
+async def ask_question(request: QueryRequest, http_request: Request):
     """Non-streaming endpoint (backwards compatible)."""
+    capture = http_request.scope.get("capture")
+    resolve_problem_statement(request, capture)
     try:
-        preferred_lang = detect_preferred_language(
-            request.question, 
-            request.language or "cpp"
-        )
-        
         site = request.site
         title = request.problem_title or ""
         
-        chat_history = chat_storage.format_history_for_prompt(site, title)
+        chat_history = await chat_storage.aformat_history_for_prompt(site, title)
         
         chat_storage.add_message(site, title, "user", request.question)
         
-        input_state = {
-            "site": site,
-            "problem_title": title,
-            "problem_statement": request.problem_statement or "",
-            "user_code": request.user_code or "",
-            "language": request.language or "unknown",
-            "question": request.question,
-            "intent": "",
-            "answer": "",
-            "agent_used": "",
-            "preferred_language": preferred_lang,
-            "hint_steps": [],
-            "chat_history": chat_history
-        }
+        input_state = build_input_state(request, chat_history)
         
-        result = cp_graph.run(input_state)
+        budget = prompt_budget.begin_request()
+        providers = provider_registry.begin_request()
+        with requests_in_flight.track(endpoint="ask"), prefetch_queue.interactive():
+            result = await cp_graph.arun(input_state)
+        requests_total.inc(endpoint="ask", intent=result["intent"], agent=result["agent_used"])
+        if capture is not None:
+            capture.update(intent=result["intent"], agent=result["agent_used"], providers=providers)
         
         chat_storage.add_message(site, title, "assistant", result["answer"], result["agent_used"])
+        await chat_storage.acompact_history(site, title)
         
         return QueryResponse(
             answer=result["answer"],
             agent_used=result["agent_used"],
-            intent=result["intent"]
+            intent=result["intent"],
+            tokens_saved=budget.tokens_saved
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 
 class QueryRequest(BaseModel):
     site: str
@@ -8,8 +8,32 @@ class QueryRequest(BaseModel):
     user_code: Optional[str] = None
     language: Optional[str] = None
     question: str
+    bypass_cache: bool = False
+    problem_hash: Optional[str] = None
+    # "blocks": stream finished markdown blocks plus the tail in progress instead of raw tokens
+    stream_mode: Literal["tokens", "blocks"] = "tokens"
+
+class ProblemUpload(BaseModel):
+    problem_statement: str
+
+class ProblemUploadResponse(BaseModel):
+    problem_hash: str
+
+class PrefetchRequest(BaseModel):
+    site: str
+    problem_title: Optional[str] = None
+    problem_statement: Optional[str] = None
+    problem_hash: Optional[str] = None
+
+class PrefetchResponse(BaseModel):
+    problem_hash: str
+    queued: List[str]
+
+class PrefetchCancel(BaseModel):
+    problem_hash: str
 
 class QueryResponse(BaseModel):
     answer: str
     agent_used: str
     intent: str
+    tokens_saved: int = 0
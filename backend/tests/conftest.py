@@ -0,0 +1,7 @@
+import os
+import sys
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("LLM_WARMUP", "false")
+os.environ.setdefault("PREFETCH_ENABLED", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,32 @@
+from utils.code_precheck import format_issue, precheck
+
+def test_python_syntax_error_is_reported_with_its_line():
+    issue = precheck("x = 1\nif x == 1\n    print(x)\n", "Python 3")
+    assert issue is not None and issue.line == 2
+
+def test_python_cut_off_at_the_end_is_not_reported():
+    assert precheck("def solve(n):\n    return (n +\n", "python") is None
+    assert precheck("for i in range(3):\n", "PyPy 3-64") is None
+
+def test_python2_and_unknown_languages_are_skipped():
+    assert precheck("print 'hi'\n", "Python 2") is None
+    assert precheck("main = putStrLn (", "haskell") is None
+
+def test_c_like_mismatched_bracket_is_reported():
+    issue = precheck("int main() {\n    int a[3};\n}\n", "GNU G++17 7.3.0")
+    assert issue is not None and issue.line == 2
+    assert "opened on line 2" in issue.message
+
+def test_c_like_brackets_in_literals_and_comments_are_ignored():
+    code = 'int main() {\n    puts(")]}"); // )\n    /* ] */ char c = \'}\';\n    return 0;\n}\n'
+    assert precheck(code, "cpp") is None
+
+def test_c_like_brackets_left_open_at_the_end_are_ignored():
+    assert precheck("int main() {\n    for (int i = 0; i < n; i++) {\n", "java") is None
+
+def test_format_issue_marks_the_offending_line():
+    code = "a\nb\nc)\nd\ne\nf"
+    issue = precheck(code, "c++")
+    answer = format_issue(issue, code, "c++")
+    assert ">    3 | c)" in answer
+    assert "   6 | f" not in answer
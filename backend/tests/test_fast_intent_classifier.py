@@ -0,0 +1,40 @@
+import pytest
+from agents.fast_intent_classifier import FastIntentClassifier
+
+THRESHOLD = 0.8
+
+@pytest.fixture(scope="module")
+def classifier():
+    return FastIntentClassifier()
+
+@pytest.mark.parametrize("question, has_code, intent", [
+    ("Give me a hint", False, "hint"),
+    ("Explain this problem", False, "explain"),
+    ("Give me the full solution code", False, "solve"),
+    ("give me similar problems", False, "suggest"),
+    ("Why does my code give wrong answer on test 2?", True, "debug"),
+])
+def test_clear_questions_resolve_locally(classifier, question, has_code, intent):
+    prediction = classifier.predict(question, has_code)
+    assert prediction.intent == intent
+    assert prediction.confidence >= THRESHOLD
+
+@pytest.mark.parametrize("question, has_code", [
+    ("Can you explain hint 2 again?", False),
+    ("what should i practice next", False),
+    ("What is the time limit here?", True),
+    ("explain the solution", False),
+    ("I get WA, why?", False),
+])
+def test_ambiguous_questions_go_to_the_llm(classifier, question, has_code):
+    assert classifier.predict(question, has_code).confidence < THRESHOLD
+
+def test_follow_up_about_a_hint_is_never_a_new_hint(classifier):
+    for question in ("Can you explain hint 2 again?", "I don't get that hint", "what did the previous hint mean"):
+        assert classifier.predict(question, False).intent != "hint"
+
+def test_rule_matches_combine_with_model_scores(classifier):
+    prediction = classifier.predict("give me another hint", False)
+    assert prediction.source == "rules"
+    assert sum(prediction.scores.values()) == pytest.approx(1.0)
+    assert prediction.ranked_intents()[0] == "hint"
@@ -0,0 +1,87 @@
+import asyncio
+from utils.hint_ladder import HintLadderCache, split_ladder
+
+CLOSING = "Need more help? Ask for another hint!"
+
+def ladder_text(count, truncate_last=False):
+    sections = [f"## Hint #{number}\n\nIdea {number}.\n\n{CLOSING}" for number in range(1, count + 1)]
+    if truncate_last:
+        sections[-1] = sections[-1][:-len(CLOSING) - 2]
+    return "\n\n".join(sections)
+
+def source(text, error=None, step=7):
+    async def chunks():
+        for start in range(0, len(text), step):
+            await asyncio.sleep(0)
+            yield text[start:start + step]
+        if error is not None:
+            raise error
+    return chunks()
+
+async def fallback_hint():
+    yield "## Hint (fallback)"
+
+async def serve(ladder, number):
+    return "".join([chunk async for chunk in ladder.section_chunks(number, fallback_hint)])
+
+def test_split_ladder():
+    assert list(split_ladder(ladder_text(3))) == [1, 2, 3]
+
+def test_complete_ladder_serves_every_hint():
+    cache = HintLadderCache(max_problems=4)
+
+    async def scenario():
+        ladder = cache.start("cf", "A", "statement", source(ladder_text(3)))
+        hints = await asyncio.gather(*(serve(ladder, number) for number in (1, 2, 3)))
+        return ladder, hints
+
+    ladder, hints = asyncio.run(scenario())
+    assert hints == list(split_ladder(ladder_text(3)).values())
+    assert all(ladder.can_serve(number) for number in (1, 2, 3))
+    assert not ladder.can_serve(4)
+    assert cache.fallbacks == 0
+
+def test_truncated_last_section_falls_back_to_a_single_hint():
+    cache = HintLadderCache(max_problems=4)
+
+    async def scenario():
+        ladder = cache.start("cf", "A", "statement", source(ladder_text(3, truncate_last=True)))
+        await ladder.stream.result()
+        return ladder, await serve(ladder, 2), await serve(ladder, 3)
+
+    ladder, second, third = asyncio.run(scenario())
+    assert second.startswith("## Hint #2") and second.endswith(CLOSING)
+    assert ladder.can_serve(2)
+    assert not ladder.can_serve(3)
+    assert third == "## Hint (fallback)"
+    assert (cache.fallbacks, cache.failures) == (1, 0)
+
+def test_ladder_failure_falls_back_and_is_counted():
+    cache = HintLadderCache(max_problems=4)
+    text = ladder_text(2)
+    cut = text.index("## Hint #2") + 12
+
+    async def scenario():
+        ladder = cache.start("cf", "A", "statement", source(text[:cut], RuntimeError("quota")))
+        return await serve(ladder, 2)
+
+    hint = asyncio.run(scenario())
+    assert hint.endswith("## Hint (fallback)")
+    assert (cache.fallbacks, cache.failures) == (1, 1)
+
+def test_hint_falls_back_when_the_ladder_is_cancelled_under_it():
+    cache = HintLadderCache(max_problems=4)
+
+    async def endless():
+        yield "## Hint #1\n\nIdea"
+        await asyncio.sleep(10)
+
+    async def scenario():
+        ladder = cache.start("cf", "A", "statement", endless())
+        hint = asyncio.create_task(serve(ladder, 1))
+        await asyncio.sleep(0.01)
+        ladder.stream.cancel()
+        return await hint
+
+    assert asyncio.run(scenario()).endswith("## Hint (fallback)")
+    assert (cache.fallbacks, cache.failures) == (1, 1)
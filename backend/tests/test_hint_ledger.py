@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from graph import workflow
+from graph.workflow import CPAssistantGraph
+from utils.hint_ledger import HintLedger
+from utils.hint_storage import HintHistoryStorage
+from utils.sqlite_history import SQLiteDatabase, SQLiteHintBackend
+
+@pytest.fixture
+def sqlite_hints(tmp_path, monkeypatch):
+    db = SQLiteDatabase(str(tmp_path / "history.db"), retention_seconds=3600)
+    storage = HintHistoryStorage(SQLiteHintBackend(db))
+    ledger = HintLedger(storage)
+    monkeypatch.setattr(workflow, "hint_storage", storage)
+    monkeypatch.setattr(workflow, "hint_ledger", ledger)
+    yield ledger
+    db.close()
+
+def hint_node_graph():
+    """Just enough of the graph to run _hint_node: hints are generated by a fake agent."""
+    async def hint_chunks(state, hint_number, max_hints):
+        await asyncio.sleep(0.05)
+        yield f"hint {hint_number}"
+
+    graph = SimpleNamespace(_hint_chunks=hint_chunks)
+    graph._collect_stream = lambda chunks, writer: CPAssistantGraph._collect_stream(graph, chunks, writer)
+    return graph
+
+def test_concurrent_hint_requests_join_one_hint(sqlite_hints):
+    graph = hint_node_graph()
+
+    async def ask():
+        state = {"site": "cf", "problem_title": "A"}
+        return await CPAssistantGraph._hint_node(graph, state, lambda event: None)
+
+    async def scenario():
+        return await asyncio.gather(ask(), ask())
+
+    results = asyncio.run(scenario())
+    assert [result["answer"] for result in results] == ["hint 1", "hint 1"]
+    assert sqlite_hints.snapshot() == {"pending": 0, "started": 1, "joined": 1}
+    assert sqlite_hints._locks == {}
+
+def test_next_request_after_a_finished_hint_gets_the_next_number(sqlite_hints):
+    graph = hint_node_graph()
+
+    async def scenario():
+        answers = []
+        for _ in range(2):
+            state = {"site": "cf", "problem_title": "A"}
+            answers.append((await CPAssistantGraph._hint_node(graph, state, lambda event: None))["answer"])
+        return answers
+
+    assert asyncio.run(scenario()) == ["hint 1", "hint 2"]
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from utils.chat_storage import ChatHistoryStorage
+from utils.history_backends import MemoryChatBackend
+from utils.history_compactor import HistoryCompactor
+from utils.sqlite_history import SQLiteChatBackend, SQLiteDatabase
+
+def compactor():
+    return HistoryCompactor(verbatim_messages=4, max_conversations=100, max_bytes=1 << 20, idle_ttl_seconds=3600)
+
+def wait_for_commit(backend: SQLiteChatBackend) -> None:
+    deadline = time.monotonic() + 5
+    while backend._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def test_prompt_cache_is_dropped_on_local_append():
+    storage = ChatHistoryStorage(
+        MemoryChatBackend(max_messages=15, max_conversations=10, max_bytes=1 << 20, idle_ttl_seconds=3600),
+        compactor=compactor()
+    )
+
+    async def scenario():
+        storage.add_message("cf", "A", "user", "first")
+        assert "first" in await storage.aformat_history_for_prompt("cf", "A")
+        await storage.aformat_history_for_prompt("cf", "A")
+        assert storage.compactor.prompt_hits == 1
+        storage.add_message("cf", "A", "user", "second")
+        assert "second" in await storage.aformat_history_for_prompt("cf", "A")
+
+    asyncio.run(scenario())
+
+def test_prompt_cache_sees_turns_written_by_another_worker(tmp_path):
+    path = str(tmp_path / "history.db")
+    databases = [SQLiteDatabase(path, retention_seconds=3600) for _ in range(2)]
+    backends = [SQLiteChatBackend(db, max_messages=15) for db in databases]
+    mine, other = (ChatHistoryStorage(backend, compactor=compactor()) for backend in backends)
+
+    async def scenario():
+        mine.add_message("cf", "B", "user", "from this worker")
+        wait_for_commit(backends[0])
+        assert "from this worker" in await mine.aformat_history_for_prompt("cf", "B")
+        assert "from this worker" in await mine.aformat_history_for_prompt("cf", "B")
+        assert mine.compactor.prompt_hits == 1
+
+        other.add_message("cf", "B", "assistant", "from the other worker")
+        wait_for_commit(backends[1])
+        assert "from the other worker" in await mine.aformat_history_for_prompt("cf", "B")
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        for db in databases:
+            db.close()
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from utils.llm_providers import HedgedChatModel, ProviderRegistry, collect_served, record_served
+from utils.single_flight import SingleFlight
+
+class FakeProvider:
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.cancelled = False
+
+    async def answer(self):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.name
+
+def make_model(*providers, hedge_seconds=0.05):
+    registry = ProviderRegistry(
+        specs=[provider.name for provider in providers],
+        hedge_enabled=True,
+        hedge_quantile=0.95,
+        hedge_min_seconds=hedge_seconds,
+        hedge_default_seconds=hedge_seconds,
+        hedge_min_samples=20,
+        window=16
+    )
+    model = HedgedChatModel(providers=[(provider.name, provider) for provider in providers], registry=registry)
+    return model, registry
+
+def race(model):
+    return model._race("generate", lambda provider: (provider.answer(), None))
+
+def test_fast_primary_is_not_hedged():
+    model, registry = make_model(FakeProvider("primary", 0.0), FakeProvider("backup", 0.0))
+    name, result, _ = asyncio.run(race(model))
+    assert (name, result) == ("primary", "primary")
+    assert registry.hedges == 0
+
+def test_slow_primary_is_hedged_and_cancelled_when_the_backup_wins():
+    primary = FakeProvider("primary", 1.0)
+    model, registry = make_model(primary, FakeProvider("backup", 0.0))
+
+    async def scenario():
+        name, _, _ = await race(model)
+        await asyncio.sleep(0)
+        return name
+
+    assert asyncio.run(scenario()) == "backup"
+    assert registry.hedges == 1
+    assert registry.stats("backup", "generate").hedges_won == 1
+    assert primary.cancelled
+
+def test_failing_primary_fails_over_to_the_next_provider():
+    model, registry = make_model(FakeProvider("primary", error=RuntimeError("quota")), FakeProvider("backup"))
+    name, _, _ = asyncio.run(race(model))
+    assert name == "backup"
+    assert registry.failovers == 1
+    assert registry.stats("primary", "generate").errors == 1
+
+def test_error_is_raised_when_every_provider_fails():
+    model, _ = make_model(FakeProvider("primary", error=RuntimeError("quota")), FakeProvider("backup", error=ValueError("down")))
+    with pytest.raises((RuntimeError, ValueError)):
+        asyncio.run(race(model))
+
+def test_coalesced_callers_are_credited_with_the_serving_provider():
+    model, _ = make_model(FakeProvider("primary", 0.01))
+    flights = SingleFlight()
+
+    async def caller():
+        served = []
+        collect_served(served)
+        await flights.do("k", lambda: race(model))
+        return served
+
+    async def scenario():
+        return await asyncio.gather(caller(), caller())
+
+    assert asyncio.run(scenario()) == [["primary"], ["primary"]]
+
+def test_stream_subscribers_are_credited_with_the_serving_provider():
+    flights = SingleFlight()
+
+    async def source():
+        await asyncio.sleep(0.01)
+        record_served(["primary"])
+        yield "answer"
+
+    async def caller():
+        served = []
+        collect_served(served)
+        chunks = [chunk async for chunk in flights.stream("k", source)]
+        return served, chunks
+
+    async def scenario():
+        return await asyncio.gather(caller(), caller())
+
+    assert asyncio.run(scenario()) == [(["primary"], ["answer"])] * 2
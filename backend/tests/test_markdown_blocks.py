@@ -0,0 +1,66 @@
+from utils.markdown_blocks import MarkdownBlockSplitter, split_blocks
+
+ANSWER = """## Approach
+
+Use a prefix sum.
+It runs in O(n).
+
+- first
+  continued item
+
+```cpp
+int main() {
+
+    return 0;
+}
+```
+Done."""
+
+def test_split_blocks():
+    assert split_blocks(ANSWER) == [
+        "## Approach",
+        "Use a prefix sum.\nIt runs in O(n).",
+        "- first\n  continued item",
+        "```cpp\nint main() {\n\n    return 0;\n}\n```",
+        "Done."
+    ]
+
+def test_streamed_chunks_give_the_same_blocks_as_the_whole_answer():
+    for size in (1, 3, 7, 64):
+        splitter = MarkdownBlockSplitter()
+        blocks = []
+        for start in range(0, len(ANSWER), size):
+            blocks += splitter.feed(ANSWER[start:start + size])
+        assert blocks + splitter.finish() == split_blocks(ANSWER)
+
+def test_open_fence_stays_in_the_tail():
+    splitter = MarkdownBlockSplitter()
+    assert splitter.feed("Intro.\n\n```py\nx = 1\n\n") == ["Intro."]
+    assert splitter.tail == "```py\nx = 1"
+    assert splitter.feed("```\n") == ["```py\nx = 1\n\n```"]
+    assert splitter.tail == ""
+
+def test_paragraph_is_not_finished_before_the_next_unindented_line():
+    splitter = MarkdownBlockSplitter()
+    assert splitter.feed("1. step\n\n") == []
+    assert splitter.feed("   more of step one\n\nNext\n") == ["1. step\n\n   more of step one"]
+    assert splitter.tail == "Next"
+
+def test_tail_updates_only_carry_what_was_added():
+    splitter = MarkdownBlockSplitter()
+    answer = "Intro.\n\n```cpp\n" + "".join(f"int x{index} = {index};\n" for index in range(50)) + "```\nDone."
+    client_tail, blocks, sent = "", [], 0
+    for start in range(0, len(answer), 5):
+        for block in splitter.feed(answer[start:start + 5]):
+            blocks.append(block)
+            client_tail = ""
+        update = splitter.tail_update()
+        if update is None:
+            continue
+        sent += len(next(iter(update.values())))
+        client_tail = update["tail"] if "tail" in update else client_tail + update["token"]
+        assert client_tail == splitter.tail
+    blocks += splitter.finish()
+    assert blocks == split_blocks(answer)
+    # Each character of the answer goes over the wire about once, not once per frame.
+    assert sent <= len(answer)
@@ -0,0 +1,78 @@
+import asyncio
+from utils.prefetch import PrefetchQueue, is_generic_question
+
+async def noop():
+    return None
+
+def test_generic_questions():
+    assert is_generic_question("Can you explain this problem?")
+    assert not is_generic_question("Why does my dp overflow?")
+
+def test_queued_jobs_are_cancelled_once_every_client_withdraws():
+    async def scenario():
+        queue = PrefetchQueue(concurrency=1, ttl_seconds=60)
+        queue.submit("p1:explain", "p1", 0, noop)
+        queue.submit("p1:digest", "p1", 1, noop)
+        queue.submit("p2:explain", "p2", 0, noop)
+        queue.add_interest("p1")
+        queue.add_interest("p1")
+        queue.add_interest("p2")
+
+        assert queue.cancel("p1") == 0
+        assert queue.snapshot()["queued_now"] == 3
+        assert queue.cancel("p1") == 2
+        assert queue.snapshot()["queued_now"] == 1
+
+        # A cancelled key can be submitted again.
+        assert queue.submit("p1:explain", "p1", 0, noop)
+        queue.add_interest("p1")
+        assert queue.cancel("p1") == 1
+        # A stale cancel from a client that is no longer counted changes nothing.
+        assert queue.cancel("p2") == 1
+        assert queue.cancel("p2") == 0
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert queue.cancelled == 4
+    assert queue._next_job() is None
+
+def test_interest_in_a_problem_without_jobs_is_not_kept():
+    async def scenario():
+        queue = PrefetchQueue(concurrency=1, ttl_seconds=60)
+        assert not queue.add_interest("warm")
+        queue.submit("busy:explain", "busy", 0, noop)
+        assert queue.add_interest("busy")
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert queue._interest == {"busy": 1}
+
+def test_running_job_is_cancelled():
+    async def scenario():
+        queue = PrefetchQueue(concurrency=1, ttl_seconds=60)
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def slow():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        queue.submit("p1:explain", "p1", 0, slow)
+        queue.add_interest("p1")
+        queue.start()
+        await asyncio.wait_for(started.wait(), 1)
+        assert queue.cancel("p1") == 1
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        snapshot = queue.snapshot()
+        await queue.stop()
+        return snapshot
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["running"] == 0
+    assert snapshot["completed"] == 0 and snapshot["failed"] == 0
+    assert snapshot["cancelled"] == 1
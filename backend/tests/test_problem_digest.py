@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from utils.problem_digest import ProblemDigestCache, local_digest
+
+@pytest.mark.parametrize("statement, max_n, complexity", [
+    ("1 <= n <= 2*10^5, 1 <= k <= 10^9\n1 <= a_i <= 10^9", 200000, "O(n log n)"),
+    (
+        "The first line contains t (1 ≤ t ≤ 10^4).\n"
+        "Each test case starts with n (1 ≤ n ≤ 100).\n"
+        "The sum of n over all test cases does not exceed 2 * 10^5.",
+        200000, "O(n log n)"
+    ),
+    ("1 ≤ |s| ≤ 5000", 5000, "O(n^2)"),
+    ("1 <= q <= 10^5\n1 <= x <= 10^18", 100000, "O(n log n)"),
+    ("1 <= n <= 500\n1 <= a_i <= 10^9", 500, "O(n^3)"),
+])
+def test_local_digest_uses_input_sizes(statement, max_n, complexity):
+    digest = local_digest(statement)
+    assert digest.max_n == max_n
+    assert digest.target_complexity == complexity
+
+def test_value_ranges_alone_give_no_size():
+    assert local_digest("1 <= k <= 10^9").max_n is None
+
+STATEMENT = "Given a rooted tree with n vertices, 1 <= n <= 10^5."
+
+@pytest.mark.parametrize("tags, expected", [
+    ("graphs", None),
+    (["graphs", "dfs"], ["graphs", "dfs"]),
+    ([], None),
+])
+def test_refined_tags_must_be_a_list(tags, expected):
+    # None: the local tags are kept.
+    expected = expected or local_digest(STATEMENT).tags
+    cache = ProblemDigestCache(max_entries=10, max_bytes=1 << 20, idle_ttl_seconds=3600)
+
+    async def refine(title, statement, base):
+        return {"tags": tags}
+
+    cache.refine = refine
+
+    async def scenario():
+        cache.get("A", STATEMENT)
+        await asyncio.gather(*cache._tasks.values())
+        return cache.get("A", STATEMENT)
+
+    assert asyncio.run(scenario()).tags == expected
+
+def test_refine_runs_outside_the_request_context():
+    from utils import llm_providers, prompt_budget
+
+    cache = ProblemDigestCache(max_entries=10, max_bytes=1 << 20, idle_ttl_seconds=3600)
+    seen = {}
+
+    async def refine(title, statement, base):
+        seen["report"] = prompt_budget._current_report.get()
+        seen["served"] = llm_providers._served_by.get()
+        return {}
+
+    cache.refine = refine
+
+    async def scenario():
+        llm_providers.collect_served([])
+        prompt_budget.prompt_budget.begin_request()
+        cache.get("A", STATEMENT)
+        await asyncio.gather(*cache._tasks.values())
+
+    asyncio.run(scenario())
+    assert seen == {"report": None, "served": None}
@@ -0,0 +1,77 @@
+from utils.prompt_budget import estimate_tokens, fit_text, normalize_text
+
+LEETCODE_PAGE = """1. Difficulty Words
+Easy
+Topics
+Companies
+Hint
+Given a word, print how hard it is.
+
+Example 1:
+Input
+easy
+Output
+hard
+run
+1.2K
+
+Constraints: 1 <= n <= 10^5
+Accepted
+1.2M
+Submissions
+2.3M
+Acceptance Rate
+52.1%
+"""
+
+def test_normalize_text_drops_page_chrome():
+    text = normalize_text(LEETCODE_PAGE)
+    for chrome in ("Companies", "Topics", "Acceptance Rate", "1.2M", "52.1%", "Submissions"):
+        assert chrome not in text.splitlines()
+    assert text.startswith("1. Difficulty Words\nGiven a word")
+
+def test_normalize_text_keeps_sample_lines_that_look_like_chrome():
+    text = normalize_text(LEETCODE_PAGE)
+    assert "Input\neasy\nOutput\nhard\nrun\n1.2K" in text
+
+def test_fit_text_leaves_text_within_budget_alone():
+    assert fit_text("short text", 100, "head_tail") == "short text"
+
+def test_fit_text_strategies_keep_the_right_end():
+    lines = [f"line {index} of the statement" for index in range(200)]
+    text = "\n".join(lines)
+    budget = 200
+
+    head = fit_text(text, budget, "head")
+    assert head.startswith(lines[0]) and head.endswith("more lines omitted ...]")
+
+    tail = fit_text(text, budget, "tail")
+    assert tail.startswith("[...") and tail.endswith(lines[-1])
+
+    both = fit_text(text, budget, "head_tail")
+    assert both.startswith(lines[0]) and both.endswith(lines[-1]) and "lines omitted" in both
+
+    for fitted in (head, tail, both):
+        assert estimate_tokens(fitted) <= budget + 20
+
+def test_fit_text_cuts_a_single_line_over_budget():
+    line = " ".join(f"word{index}" for index in range(3000))
+    budget = 100
+    for strategy in ("head", "tail", "head_tail"):
+        fitted = fit_text(line, budget, strategy)
+        assert "[...]" in fitted
+        assert budget // 2 <= estimate_tokens(fitted) <= budget + 5
+        if strategy != "tail":
+            assert fitted.startswith("word0 word1")
+        if strategy != "head":
+            assert fitted.endswith("word2999")
+
+def test_fit_text_cuts_an_oversized_first_or_last_line():
+    minified = "int a[]={" + ",".join(str(index) for index in range(2000)) + "};"
+    text = minified + "\nint main() { return 0; }"
+    head = fit_text(text, 200, "head")
+    assert head.startswith("int a[]={0,1,2") and head.endswith("[... 1 more lines omitted ...]")
+    tail = fit_text(minified + "\n" + minified, 200, "tail")
+    assert tail.startswith("[... 1 earlier lines omitted ...]\n[...] ") and tail.endswith("1999};")
+    both = fit_text(text, 200, "head_tail")
+    assert both.startswith("int a[]={0,1,2") and both.endswith("int main() { return 0; }")
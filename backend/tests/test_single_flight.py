@@ -0,0 +1,94 @@
+import asyncio
+from utils.single_flight import SingleFlight
+
+def test_identical_calls_share_one_upstream_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "query"
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("k", fn) for _ in range(3)))
+
+    assert asyncio.run(scenario()) == ["query"] * 3
+    assert calls == [1]
+    assert flights.snapshot()["in_flight_calls"] == 0
+
+def test_call_survives_one_caller_leaving_and_is_cancelled_when_all_leave():
+    flights = SingleFlight()
+
+    async def scenario():
+        upstream_cancelled = asyncio.Event()
+
+        async def fn():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                upstream_cancelled.set()
+                raise
+
+        first = asyncio.create_task(flights.do("k", fn))
+        second = asyncio.create_task(flights.do("k", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert not upstream_cancelled.is_set()
+
+        second.cancel()
+        await asyncio.wait_for(upstream_cancelled.wait(), 1)
+
+    asyncio.run(scenario())
+
+def test_new_caller_never_joins_a_call_being_cancelled():
+    flights = SingleFlight()
+
+    async def scenario():
+        started = 0
+
+        async def fn():
+            nonlocal started
+            started += 1
+            try:
+                await asyncio.sleep(0.01)
+            except asyncio.CancelledError:
+                # Still winding down when the next caller arrives.
+                await asyncio.sleep(0.01)
+                raise
+            return started
+
+        abandoned = asyncio.create_task(flights.do("k", fn))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        await asyncio.sleep(0)
+        assert await flights.do("k", fn) == 2
+
+    asyncio.run(scenario())
+
+def test_new_subscriber_never_joins_a_stream_being_cancelled():
+    flights = SingleFlight()
+
+    async def scenario():
+        runs = 0
+
+        async def source():
+            nonlocal runs
+            runs += 1
+            run = runs
+            try:
+                yield f"run{run} "
+                await asyncio.sleep(0.02)
+                yield "done"
+            except asyncio.CancelledError:
+                await asyncio.sleep(0.01)
+                raise
+
+        first = flights.stream("k", source)
+        assert await first.__anext__() == "run1 "
+        await first.aclose()
+        text = "".join([chunk async for chunk in flights.stream("k", source)])
+        assert text == "run2 done"
+
+    asyncio.run(scenario())
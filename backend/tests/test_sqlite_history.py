@@ -0,0 +1,113 @@
+import asyncio
+import sqlite3
+import threading
+import time
+import pytest
+from utils.chat_storage import ChatHistoryStorage
+from utils.hint_storage import HintHistoryStorage
+from utils.sqlite_history import SQLiteChatBackend, SQLiteDatabase, SQLiteHintBackend
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "history.db")
+
+@pytest.fixture
+def databases(db_path):
+    # Two databases on one file stand in for two worker processes.
+    opened = [SQLiteDatabase(db_path, retention_seconds=3600) for _ in range(2)]
+    yield opened
+    for db in opened:
+        db.close()
+
+def test_hint_numbers_are_unique_across_workers(databases):
+    first, second = (HintHistoryStorage(SQLiteHintBackend(db)) for db in databases)
+
+    async def scenario():
+        numbers = await asyncio.gather(*(
+            storage.areserve_hint_number("cf", "A") for storage in (first, second, first, second)
+        ))
+        assert sorted(numbers) == [1, 2, 3, 4]
+        assert await first.aget_hint_history("cf", "A") == []
+
+        await second.acommit_hint("cf", "A", 2, "look at the constraints")
+        hints = await first.aget_hint_history("cf", "A")
+        assert [(h.hint_number, h.hint_text) for h in hints] == [(2, "look at the constraints")]
+
+        for number in (1, 3, 4):
+            first.release_hint("cf", "A", number)
+        assert await first.areserve_hint_number("cf", "A") == 3
+
+    asyncio.run(scenario())
+
+def test_reservation_waits_off_the_event_loop(databases, db_path):
+    storage = HintHistoryStorage(SQLiteHintBackend(databases[0]))
+    locker = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    locker.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.5, lambda: locker.execute("COMMIT")).start()
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        started = time.perf_counter()
+        number = await storage.areserve_hint_number("cf", "B")
+        waited = time.perf_counter() - started
+        ticker.cancel()
+        return number, waited, ticks
+
+    number, waited, ticks = asyncio.run(scenario())
+    locker.close()
+    assert number == 1
+    assert waited >= 0.4
+    # The loop kept running while the reservation waited for the write lock.
+    assert ticks >= 20
+
+def test_chat_reads_merge_uncommitted_messages(databases):
+    storage = ChatHistoryStorage(SQLiteChatBackend(databases[0], max_messages=15))
+    other = ChatHistoryStorage(SQLiteChatBackend(databases[1], max_messages=15))
+
+    async def scenario():
+        storage.add_message("cf", "C", "user", "first question")
+        assert "first question" in await storage.aformat_history_for_prompt("cf", "C")
+        databases[0].close()
+        assert "first question" in await other.aformat_history_for_prompt("cf", "C")
+
+    asyncio.run(scenario())
+
+def test_clear_also_drops_queued_messages(databases):
+    backend = SQLiteChatBackend(databases[0], max_messages=15)
+    storage = ChatHistoryStorage(backend)
+    storage.add_message("cf", "D", "user", "hello")
+    storage.clear_history("cf", "D")
+    storage.add_message("cf", "D", "user", "after clear")
+    databases[0].close()
+    assert [m.content for m in backend.get_messages(storage._generate_key("cf", "D"))] == ["after clear"]
+
+def test_snapshot_counts_are_refreshed_off_the_event_loop(databases, monkeypatch):
+    import utils.sqlite_history as sqlite_history
+    monkeypatch.setattr(sqlite_history, "STATS_REFRESH_SECONDS", 0.0)
+    backend = SQLiteChatBackend(databases[0], max_messages=15)
+    storage = ChatHistoryStorage(backend)
+    storage.add_message("cf", "E", "user", "hello")
+    storage.add_message("cf", "F", "user", "hello")
+
+    loop_thread = threading.get_ident()
+    queried_on = []
+    connection = databases[0].connection
+
+    def tracked_connection():
+        queried_on.append(threading.get_ident())
+        return connection()
+
+    monkeypatch.setattr(databases[0], "connection", tracked_connection)
+    deadline = time.monotonic() + 5
+    while backend.snapshot()["conversations"] != 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    assert queried_on and loop_thread not in queried_on
@@ -0,0 +1,59 @@
+import asyncio
+import gzip
+import pytest
+from utils.sse import GzipStream, accepts_gzip, coalesce_tokens
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("gzip, deflate, br", True),
+    ("deflate, GZIP;q=0.5", True),
+    ("gzip;q=1.0", True),
+    ("gzip;q=0", False),
+    ("gzip;q=0.0", False),
+    ("gzip; q=0.000", False),
+    ("gzip;q=abc", False),
+    ("deflate, br", False),
+    ("", False),
+    (None, False)
+])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
+
+def test_gzip_stream_round_trip():
+    stream = GzipStream()
+    body = stream.compress("data: a\n\n") + stream.compress("data: b\n\n") + stream.finish()
+    assert gzip.decompress(body) == b"data: a\n\ndata: b\n\n"
+
+def test_coalesce_tokens_merges_and_flushes_before_other_events():
+    async def source():
+        for word in ["a", "b", "c"]:
+            yield "token", word
+        yield "done", {}
+
+    async def scenario():
+        return [event async for event in coalesce_tokens(source(), 10, 1024)]
+
+    assert asyncio.run(scenario()) == [("token", "a"), ("token", "bc"), ("done", {})]
+
+def test_coalesce_tokens_steps_source_from_one_task_and_closes_it():
+    steppers = set()
+    closed = []
+
+    async def source():
+        try:
+            while True:
+                steppers.add(asyncio.current_task())
+                await asyncio.sleep(0.001)
+                yield "token", "x"
+        finally:
+            closed.append(True)
+
+    async def scenario():
+        stream = coalesce_tokens(source(), 0.005, 1024)
+        for _ in range(5):
+            await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(scenario())
+    assert len(steppers) == 1
+    assert closed == [True]
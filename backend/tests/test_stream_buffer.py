@@ -0,0 +1,53 @@
+import asyncio
+from utils.stream_buffer import StreamBuffer, parse_last_event_id
+
+def frames(count, delay=0.01):
+    async def source():
+        for index in range(count):
+            await asyncio.sleep(delay)
+            yield f"data: {index}\n\n"
+    return source()
+
+def make_buffer(grace_seconds=0.05):
+    return StreamBuffer(max_streams=8, max_bytes=1 << 20, ttl_seconds=60, grace_seconds=grace_seconds)
+
+def test_parse_last_event_id():
+    assert parse_last_event_id("abc:3") == ("abc", 3)
+    assert parse_last_event_id("abc") is None
+    assert parse_last_event_id("abc:x") is None
+    assert parse_last_event_id(None) is None
+
+def test_resume_replays_only_the_missed_frames():
+    buffer = make_buffer()
+
+    async def scenario():
+        stream = buffer.start(frames(4))
+        first = buffer.follow(stream)
+        received = [await first.__anext__(), await first.__anext__()]
+        await first.aclose()
+        last_id, _ = received[-1].split("\n", 1)
+        _, seq = parse_last_event_id(last_id[len("id: "):])
+        rest = [frame async for frame in buffer.follow(stream, seq + 1)]
+        return stream, received + rest
+
+    stream, received = asyncio.run(scenario())
+    assert [frame.split("\n", 1)[1] for frame in received] == [f"data: {index}\n\n" for index in range(4)]
+    assert received[2].startswith(f"id: {stream.event_id(2)}\n")
+    assert buffer.resumed == 1
+    assert buffer.abandoned == 0
+
+def test_stream_nobody_reconnects_to_is_cancelled_after_the_grace_period():
+    buffer = make_buffer(grace_seconds=0.02)
+
+    async def scenario():
+        stream = buffer.start(frames(100))
+        follower = buffer.follow(stream)
+        await follower.__anext__()
+        await follower.aclose()
+        await asyncio.sleep(0.1)
+        return stream
+
+    stream = asyncio.run(scenario())
+    assert stream.frames.finished
+    assert buffer.abandoned == 1
+    assert buffer.get(stream.stream_id) is None
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import httpx
+from benchmarks.replay import load_records, register_problems
+from utils.traffic_capture import CaptureWriter, TrafficCaptureMiddleware, sanitize_request
+
+STATEMENT = "Given n (1 <= n <= 2 * 10^5) integers, contact judge@example.com.\n" + "x" * 5000
+
+def test_sanitize_keeps_statement_and_code_whole():
+    code = "int main() { // token sk-" + "a" * 30 + "\n" + "y" * 5000 + "}"
+    clean = sanitize_request({
+        "site": "cf",
+        "problem_statement": STATEMENT,
+        "user_code": code,
+        "question": "why WA? mail me at me@example.com " + "z" * 500,
+        "unknown": "dropped"
+    }, max_field_chars=100)
+    assert clean["problem_statement"] == STATEMENT
+    assert len(clean["user_code"]) > 5000 and "[redacted]" in clean["user_code"]
+    assert clean["question"].startswith("why WA? mail me at [email]")
+    assert len(clean["question"]) == 100
+    assert "unknown" not in clean
+
+def run_requests(writer, requests):
+    async def app(scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+        note = scope.get("capture")
+        if note is not None and scope["path"] == "/ask":
+            note.update(intent="explain", agent="ExplainAgent", problem_statement=STATEMENT)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    middleware = TrafficCaptureMiddleware(app, writer, max_field_chars=100)
+
+    async def call(path, body):
+        payload = json.dumps(body).encode()
+        messages = [{"type": "http.request", "body": payload, "more_body": False}]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            pass
+
+        await middleware({"type": "http", "method": "POST", "path": path}, receive, send)
+
+    async def scenario():
+        for path, body in requests:
+            await call(path, body)
+
+    asyncio.run(scenario())
+    writer.close()
+
+def test_hash_only_questions_carry_their_statement(tmp_path):
+    path = str(tmp_path / "requests.jsonl")
+    ask = {"site": "cf", "problem_title": "A", "problem_hash": "abc", "question": "Explain this problem"}
+    run_requests(CaptureWriter(path, max_bytes=1 << 20, backups=1, flush_interval=0.01), [
+        ("/ask", ask),
+        ("/ask", ask),
+    ])
+    records = load_records([path])
+    assert [record["endpoint"] for record in records] == ["problems", "ask", "ask"]
+    assert records[0]["resolved"] is True
+    assert records[0]["request"]["problem_statement"] == STATEMENT
+
+def test_problem_uploads_are_captured_and_registered_on_replay(tmp_path):
+    path = str(tmp_path / "requests.jsonl")
+    run_requests(CaptureWriter(path, max_bytes=1 << 20, backups=1, flush_interval=0.01), [
+        ("/problems", {"problem_statement": STATEMENT}),
+        ("/ask", {"site": "cf", "problem_title": "A", "problem_hash": "abc", "question": "hint"}),
+    ])
+    records = load_records([path], limit=1)
+    assert [record["endpoint"] for record in records] == ["problems", "ask"]
+
+    uploaded = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        uploaded.append(json.loads(request.content)["problem_statement"])
+        return httpx.Response(200, json={"problem_hash": "abc"})
+
+    async def scenario():
+        async with httpx.AsyncClient(base_url="http://backend", transport=httpx.MockTransport(handler)) as client:
+            return await register_problems(client, records)
+
+    assert asyncio.run(scenario()) == 1
+    assert uploaded == [STATEMENT]
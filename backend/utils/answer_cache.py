@@ -0,0 +1,194 @@
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import re
+import time
+from .config import get_settings
+
+# Intents whose answers depend only on the problem, the question and the preferred language.
+# Values are per-intent TTL multipliers applied to the cache's base TTL.
+CACHEABLE_INTENTS: Dict[str, float] = {
+    "explain": 1.0,
+    "suggest": 1.0,
+    "solve": 0.5,
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s+#]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivially different phrasings share a key."""
+    text = _PUNCTUATION.sub(" ", question.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+def statement_hash(statement: str) -> str:
+    """Hash of the problem statement content, insensitive to whitespace differences."""
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+@dataclass
+class CacheStats:
+    hits_memory: int = 0
+    hits_disk: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions_lru: int = 0
+    evictions_ttl: int = 0
+    evictions_size: int = 0
+
+class AnswerCache:
+    """
+    Two-tier answer cache: an in-memory LRU bounded by entry count and bytes with TTL,
+    backed by an optional on-disk tier (one JSON file per key) that survives restarts.
+    An answer can be stored with its rendered-ready markdown blocks, so cache hits can
+    stream them without splitting the text again.
+    """
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 32 * 1024 * 1024,
+                 ttl_seconds: float = 86400, disk_dir: str = ""):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self._memory: "OrderedDict[str, Tuple[float, int, str, Optional[List[str]]]]" = OrderedDict()
+        self._bytes = 0
+        self.stats = CacheStats()
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def make_key(self, intent: str, site: str, title: str, question: str,
+                 statement: str, language: str = "", digest: str = "") -> Optional[str]:
+        """
+        Build the cache key for a request, or None if this intent is not cacheable.
+        `digest` is the statement's precomputed `statement_hash`, if the caller has it.
+        """
+        if intent not in CACHEABLE_INTENTS:
+            return None
+        if intent != "solve":
+            language = ""
+        raw = "|".join([intent, site, title.strip().lower(), normalize_question(question),
+                        digest or statement_hash(statement), language])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, _, answer, _ = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats.hits_memory += 1
+                return answer
+            self._remove(key)
+            self.stats.evictions_ttl += 1
+
+        disk_entry = self._read_disk(key)
+        if disk_entry is not None:
+            expires_at, answer, blocks = disk_entry
+            if expires_at > now:
+                self._put_memory(key, answer, expires_at, blocks)
+                self.stats.hits_disk += 1
+                return answer
+            self._delete_disk(key)
+            self.stats.evictions_ttl += 1
+
+        self.stats.misses += 1
+        return None
+
+    def contains(self, key: str) -> bool:
+        """True if an unexpired answer is stored for key; does not touch stats or LRU order."""
+        entry = self._memory.get(key)
+        if entry is not None and entry[0] > time.time():
+            return True
+        disk_entry = self._read_disk(key)
+        return disk_entry is not None and disk_entry[0] > time.time()
+
+    def blocks(self, key: str) -> Optional[List[str]]:
+        """Markdown blocks stored with the answer at key (call after a hit from `get`)."""
+        entry = self._memory.get(key)
+        return entry[3] if entry is not None else None
+
+    def set(self, key: str, answer: str, intent: str = "", blocks: Optional[List[str]] = None) -> None:
+        ttl = self.ttl_seconds * CACHEABLE_INTENTS.get(intent, 1.0)
+        expires_at = time.time() + ttl
+        self._put_memory(key, answer, expires_at, blocks)
+        self._write_disk(key, answer, expires_at, blocks)
+        self.stats.stores += 1
+
+    def _put_memory(self, key: str, answer: str, expires_at: float, blocks: Optional[List[str]] = None) -> None:
+        size = len(answer.encode()) + sum(len(block.encode()) for block in blocks or [])
+        if size > self.max_bytes:
+            return
+        if key in self._memory:
+            self._remove(key)
+        self._memory[key] = (expires_at, size, answer, blocks)
+        self._bytes += size
+
+        while len(self._memory) > self.max_entries:
+            self._remove(next(iter(self._memory)))
+            self.stats.evictions_lru += 1
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._memory)))
+            self.stats.evictions_size += 1
+
+    def _remove(self, key: str) -> None:
+        _, size, _, _ = self._memory.pop(key)
+        self._bytes -= size
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, str, Optional[List[str]]]]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["expires_at"], data["answer"], data.get("blocks")
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key: str, answer: str, expires_at: float, blocks: Optional[List[str]] = None) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": expires_at, "answer": answer, "blocks": blocks}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def _delete_disk(self, key: str) -> None:
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def snapshot(self) -> dict:
+        """Hit/miss/eviction counters plus current memory usage."""
+        hits = self.stats.hits_memory + self.stats.hits_disk
+        lookups = hits + self.stats.misses
+        return {
+            "entries": len(self._memory),
+            "bytes": self._bytes,
+            "hits_memory": self.stats.hits_memory,
+            "hits_disk": self.stats.hits_disk,
+            "misses": self.stats.misses,
+            "stores": self.stats.stores,
+            "evictions_lru": self.stats.evictions_lru,
+            "evictions_ttl": self.stats.evictions_ttl,
+            "evictions_size": self.stats.evictions_size,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+_settings = get_settings()
+answer_cache = AnswerCache(
+    max_entries=_settings.answer_cache_max_entries,
+    max_bytes=_settings.answer_cache_max_bytes,
+    ttl_seconds=_settings.answer_cache_ttl_seconds,
+    disk_dir=_settings.answer_cache_dir
+)
@@ -0,0 +1,104 @@
+from typing import Any, Callable, Hashable, Optional
+from collections import OrderedDict
+import time
+
+class _Entry:
+    __slots__ = ("value", "size", "touched")
+
+    def __init__(self, value: Any, size: int, touched: float):
+        self.value = value
+        self.size = size
+        self.touched = touched
+
+class BoundedStore:
+    """
+    Keyed container store with a global LRU cap on entries, idle TTL expiry and a
+    total byte budget. Callers report size changes of an entry through `resize`.
+
+    Entries are kept in access order, so expiry and eviction only touch the oldest ones.
+    """
+    def __init__(self, max_entries: int, max_bytes: int, idle_ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self.evictions_lru = 0
+        self.evictions_ttl = 0
+        self.evictions_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the value for key and mark it as recently used, or None if absent/expired."""
+        now = time.time()
+        self._expire(now)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry.touched = now
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self._entries[key] = _Entry(value, 0, time.time())
+            self._enforce_limits(protect=key)
+        return value
+
+    def resize(self, key: Hashable, delta: int) -> None:
+        """Account for `delta` bytes added to (or removed from) the entry at key."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.size += delta
+        self._bytes += delta
+        self._enforce_limits(protect=key)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._bytes -= entry.size
+        return entry.value
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.touched < self.idle_ttl_seconds:
+                break
+            self.pop(key)
+            self.evictions_ttl += 1
+
+    def _enforce_limits(self, protect: Hashable) -> None:
+        while len(self._entries) > self.max_entries:
+            if not self._evict_oldest(protect):
+                break
+            self.evictions_lru += 1
+        while self._bytes > self.max_bytes:
+            if not self._evict_oldest(protect):
+                break
+            self.evictions_bytes += 1
+
+    def _evict_oldest(self, protect: Hashable) -> bool:
+        for key in self._entries:
+            if key != protect:
+                self.pop(key)
+                return True
+        return False
+
+    def snapshot(self) -> dict:
+        return {
+            "conversations": len(self._entries),
+            "bytes": self._bytes,
+            "evictions_lru": self.evictions_lru,
+            "evictions_ttl": self.evictions_ttl,
+            "evictions_bytes": self.evictions_bytes
+        }
@@ -1,22 +1,24 @@
-from typing import List, Dict
+from typing import List, Optional
 import hashlib
-from dataclasses import dataclass
-from datetime import datetime
-from collections import deque
-
-@dataclass
-class ChatMessage:
-    """Stores a single message with metadata."""
-    role: str  # 'user' or 'assistant'
-    content: str
-    agent_used: str
-    timestamp: str
+import time
+from .history_records import ChatMessage
+from .history_backends import ChatBackend, MemoryChatBackend, call_backend
+from .history_compactor import HistoryCompactor, Summarizer, format_messages
+from .config import get_settings
+from .metrics import storage_seconds
 
 class ChatHistoryStorage:
-    """Stores chat history with a maximum of 15 messages per problem."""
-    def __init__(self, max_messages: int = 15):
-        self._storage: Dict[str, deque] = {}
+    """
+    Stores chat history with a maximum of 15 messages per problem.
+    
+    The storage engine is pluggable: the in-memory backend is bounded per process,
+    the SQLite backend is shared by every worker on the host and survives restarts.
+    With a compactor attached, prompts carry a rolling summary plus the latest turns.
+    """
+    def __init__(self, backend: ChatBackend, max_messages: int = 15, compactor: Optional[HistoryCompactor] = None):
+        self.backend = backend
         self.max_messages = max_messages
+        self.compactor = compactor
     
     def _generate_key(self, site: str, problem_title: str) -> str:
         """Generate a unique key for a problem based on site and title."""
@@ -26,46 +28,95 @@ class ChatHistoryStorage:
     def get_chat_history(self, site: str, problem_title: str) -> List[ChatMessage]:
         """Get the chat history for this problem (last 15 messages)."""
         key = self._generate_key(site, problem_title)
-        if key in self._storage:
-            return list(self._storage[key])
-        return []
+        return self.backend.get_messages(key)
     
     def add_message(self, site: str, problem_title: str, role: str, content: str, agent_used: str = "") -> None:
         """Add a message to chat history (maintains last 15 messages)."""
         key = self._generate_key(site, problem_title)
         
-        if key not in self._storage:
-            self._storage[key] = deque(maxlen=self.max_messages)
-        
         message = ChatMessage(
             role=role,
             content=content,
             agent_used=agent_used,
-            timestamp=datetime.utcnow().isoformat()
+            timestamp=time.time()
         )
         
-        self._storage[key].append(message)
+        with storage_seconds.time(operation="add_message"):
+            self.backend.append_message(key, message)
+        if self.compactor is not None:
+            self.compactor.invalidate(key)
+    
+    def set_summarizer(self, summarize: Summarizer) -> None:
+        """Attach the LLM call used to fold older turns into the rolling summary."""
+        if self.compactor is not None:
+            self.compactor.summarize = summarize
     
-    def format_history_for_prompt(self, site: str, problem_title: str) -> str:
+    async def _aget_messages(self, key: str) -> List[ChatMessage]:
+        with storage_seconds.time(operation="get_messages"):
+            return await call_backend(self.backend.executor, self.backend.get_messages, key)
+    
+    async def aformat_history_for_prompt(self, site: str, problem_title: str) -> str:
         """Format chat history as a string for use in prompts."""
-        history = self.get_chat_history(site, problem_title)
+        key = self._generate_key(site, problem_title)
+        if self.compactor is not None:
+            version = await call_backend(self.backend.executor, self.backend.version, key)
+            cached = self.compactor.cached_prompt(key, version)
+            if cached is not None:
+                return cached
+            messages = await self._aget_messages(key)
+            return self.compactor.build_prompt(key, messages, version)
+        
+        history = await self._aget_messages(key)
         if not history:
             return "No previous conversation."
-        
-        formatted = []
-        for msg in history:
-            if msg.role == "user":
-                formatted.append(f"User: {msg.content}")
-            else:
-                agent_info = f" (via {msg.agent_used})" if msg.agent_used else ""
-                formatted.append(f"Assistant{agent_info}: {msg.content}")
-        
-        return "\n\n".join(formatted)
+        return format_messages(history)
+    
+    async def acompact_history(self, site: str, problem_title: str) -> None:
+        """Schedule folding of turns that left the verbatim window. Call after a response is sent."""
+        if self.compactor is None:
+            return
+        key = self._generate_key(site, problem_title)
+        self.compactor.schedule(key, await self._aget_messages(key))
     
     def clear_history(self, site: str, problem_title: str) -> None:
         """Clear chat history for a specific problem."""
         key = self._generate_key(site, problem_title)
-        if key in self._storage:
-            del self._storage[key]
+        self.backend.clear(key)
+        if self.compactor is not None:
+            self.compactor.clear(key)
+    
+    def snapshot(self) -> dict:
+        """Live gauges for resident conversations and bytes."""
+        snapshot = self.backend.snapshot()
+        if self.compactor is not None:
+            snapshot["compactor"] = self.compactor.snapshot()
+        return snapshot
+    
+    def close(self) -> None:
+        """Flush pending writes on shutdown."""
+        self.backend.close()
+
+def _create_backend(max_messages: int) -> ChatBackend:
+    settings = get_settings()
+    if settings.storage_backend == "sqlite":
+        from .sqlite_history import SQLiteChatBackend, get_database
+        return SQLiteChatBackend(get_database(settings.sqlite_path, settings.history_retention_seconds), max_messages)
+    return MemoryChatBackend(
+        max_messages=max_messages,
+        max_conversations=settings.history_max_conversations,
+        max_bytes=settings.history_max_bytes,
+        idle_ttl_seconds=settings.history_idle_ttl_seconds
+    )
+
+def _create_compactor() -> Optional[HistoryCompactor]:
+    settings = get_settings()
+    if not settings.history_summary:
+        return None
+    return HistoryCompactor(
+        verbatim_messages=settings.history_verbatim_messages,
+        max_conversations=settings.history_max_conversations,
+        max_bytes=settings.history_max_bytes,
+        idle_ttl_seconds=settings.history_idle_ttl_seconds
+    )
 
-chat_storage = ChatHistoryStorage()
+chat_storage = ChatHistoryStorage(_create_backend(max_messages=15), compactor=_create_compactor())
@@ -0,0 +1,130 @@
+from typing import List, Optional
+from dataclasses import dataclass
+import ast
+import re
+import warnings
+
+BRACKET_PAIRS = {")": "(", "]": "[", "}": "{"}
+# Language labels as the sites show them, e.g. "c++", "GNU G++17 7.3.0", "Python 3", "PyPy 3-64".
+PYTHON_LANGUAGE = re.compile(r"python|pypy")
+PYTHON2_LANGUAGE = re.compile(r"(?:python|pypy)\s*2")
+C_LIKE_LANGUAGE = re.compile(r"c\+\+|g\+\+|clang|\bcpp\b|^c$|\bgnu c\d*\b|java|typescript|\bc#|csharp|\bgo\b|kotlin|node")
+
+# Python errors that a truncated paste (e.g. a virtualized editor that only renders the
+# visible lines) produces at the end of the file. Those are not reported as definite.
+TRUNCATION_ERRORS = re.compile(r"unexpected EOF|expected an indented block|was never closed|EOF while scanning", re.IGNORECASE)
+
+@dataclass
+class SyntaxIssue:
+    """A syntax error found locally, certain enough to answer without the LLM."""
+    line: int
+    message: str
+
+def _is_python(language: str) -> bool:
+    return bool(PYTHON_LANGUAGE.search(language)) and not PYTHON2_LANGUAGE.search(language)
+
+def _is_c_like(language: str) -> bool:
+    return bool(C_LIKE_LANGUAGE.search(language))
+
+def _check_python(code: str) -> Optional[SyntaxIssue]:
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            ast.parse(code)
+    except SyntaxError as e:
+        last_line = len(code.rstrip().splitlines())
+        if TRUNCATION_ERRORS.search(e.msg or "") and (e.lineno or 0) >= last_line:
+            return None
+        return SyntaxIssue(line=e.lineno or 1, message=e.msg or "invalid syntax")
+    return None
+
+def _strip_literals(line: str, in_block_comment: bool):
+    """Blank out string/char literals and comments in one line. Returns (line, in_block_comment)."""
+    out: List[str] = []
+    i = 0
+    quote = ""
+    while i < len(line):
+        ch = line[i]
+        pair = line[i:i + 2]
+        if in_block_comment:
+            if pair == "*/":
+                in_block_comment = False
+                i += 2
+                continue
+            i += 1
+            continue
+        if quote:
+            if ch == "\\":
+                i += 2
+                continue
+            if ch == quote:
+                quote = ""
+            i += 1
+            continue
+        if pair == "//":
+            break
+        if pair == "/*":
+            in_block_comment = True
+            i += 2
+            continue
+        if ch in ("\"", "'", "`"):
+            quote = ch
+            i += 1
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out), in_block_comment
+
+def _check_brackets(code: str) -> Optional[SyntaxIssue]:
+    """
+    Report a closing bracket that does not match the innermost open one. Brackets left
+    open at the end are ignored, since the paste may be cut short.
+    """
+    stack: List[tuple] = []
+    in_block_comment = False
+    for number, raw in enumerate(code.splitlines(), start=1):
+        if raw.lstrip().startswith("#"):
+            continue
+        line, in_block_comment = _strip_literals(raw, in_block_comment)
+        for ch in line:
+            if ch in "([{":
+                stack.append((ch, number))
+            elif ch in BRACKET_PAIRS:
+                if not stack:
+                    return SyntaxIssue(line=number, message=f"unmatched '{ch}'")
+                opener, opened_at = stack.pop()
+                if opener != BRACKET_PAIRS[ch]:
+                    return SyntaxIssue(
+                        line=number,
+                        message=f"'{ch}' does not match '{opener}' opened on line {opened_at}"
+                    )
+    return None
+
+def precheck(code: str, language: str) -> Optional[SyntaxIssue]:
+    """Cheap local syntax check; None when the code looks fine or the language is not covered."""
+    if not code.strip():
+        return None
+    code = code.replace("\u00a0", " ")
+    language = (language or "").strip().lower()
+    if _is_python(language):
+        return _check_python(code)
+    if _is_c_like(language):
+        return _check_brackets(code)
+    return None
+
+def format_issue(issue: SyntaxIssue, code: str, language: str) -> str:
+    """Markdown answer for a syntax error, showing the offending line with some context."""
+    lines = code.replace("\u00a0", " ").splitlines()
+    start = max(0, issue.line - 3)
+    end = min(len(lines), issue.line + 2)
+    excerpt = "\n".join(
+        f"{'>' if number == issue.line else ' '} {number:>4} | {lines[number - 1]}"
+        for number in range(start + 1, end + 1)
+    )
+    return (
+        "## Syntax Error Found\n\n"
+        f"**Line {issue.line}:** {issue.message}\n\n"
+        f"```{language or ''}\n{excerpt}\n```\n\n"
+        "Fix this first: the code will not compile until it is resolved. "
+        "Ask again after fixing it and I'll review the logic."
+    )
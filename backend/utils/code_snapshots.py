@@ -0,0 +1,83 @@
+from typing import Optional
+from dataclasses import dataclass
+import difflib
+import time
+from .bounded_store import BoundedStore
+from .config import get_settings
+
+# Past this share of changed lines a follow-up diff is no cheaper than the whole file.
+MAX_CHANGED_RATIO = 0.5
+MAX_FINDINGS_CHARS = 4000
+
+@dataclass(slots=True)
+class CodeSnapshot:
+    """The code DebugAgent last analyzed for a conversation, and what it found."""
+    code: str
+    findings: str
+    timestamp: float
+
+    def size_bytes(self) -> int:
+        return len(self.code.encode()) + len(self.findings.encode()) + 96
+
+def code_diff(old: str, new: str, context_lines: int = 3) -> str:
+    """Unified line diff of two code versions; empty if nothing changed."""
+    diff = difflib.unified_diff(
+        old.splitlines(), new.splitlines(),
+        fromfile="previous", tofile="current", n=context_lines, lineterm=""
+    )
+    return "\n".join(diff)
+
+def changed_ratio(old: str, new: str) -> float:
+    return 1.0 - difflib.SequenceMatcher(None, old.splitlines(), new.splitlines(), autojunk=False).ratio()
+
+class CodeSnapshotStore:
+    """Last debugged code per conversation, used to send only what changed on follow-ups."""
+    def __init__(self, max_conversations: int, max_bytes: int, idle_ttl_seconds: float):
+        self._store = BoundedStore(max_conversations, max_bytes, idle_ttl_seconds)
+        self.full_analyses = 0
+        self.incremental_analyses = 0
+        self.precheck_answers = 0
+
+    def _key(self, site: str, problem_title: str) -> str:
+        return f"{site}:{problem_title}"
+
+    def get(self, site: str, problem_title: str) -> Optional[CodeSnapshot]:
+        return self._store.get(self._key(site, problem_title))
+
+    def followup_diff(self, site: str, problem_title: str, code: str) -> Optional[str]:
+        """
+        Return the diff against the last analyzed code if a follow-up prompt is worthwhile,
+        or None when there is no snapshot, nothing changed, or most of the file changed.
+        """
+        snapshot = self.get(site, problem_title)
+        if snapshot is None or not snapshot.findings or snapshot.code == code:
+            return None
+        if changed_ratio(snapshot.code, code) > MAX_CHANGED_RATIO:
+            return None
+        return code_diff(snapshot.code, code) or None
+
+    def record(self, site: str, problem_title: str, code: str, findings: str) -> None:
+        key = self._key(site, problem_title)
+        snapshot = CodeSnapshot(code=code, findings=findings[:MAX_FINDINGS_CHARS], timestamp=time.time())
+        self._store.pop(key)
+        self._store.get_or_create(key, lambda: snapshot)
+        self._store.resize(key, snapshot.size_bytes())
+
+    def snapshot(self) -> dict:
+        return {
+            "snapshots": len(self._store),
+            "bytes": self._store.bytes,
+            "full_analyses": self.full_analyses,
+            "incremental_analyses": self.incremental_analyses,
+            "precheck_answers": self.precheck_answers
+        }
+
+def _create_store() -> CodeSnapshotStore:
+    settings = get_settings()
+    return CodeSnapshotStore(
+        max_conversations=settings.history_max_conversations,
+        max_bytes=settings.history_max_bytes // 2,
+        idle_ttl_seconds=settings.history_idle_ttl_seconds
+    )
+
+code_snapshots = _create_store()
@@ -5,6 +5,55 @@ import os
 class Settings(BaseSettings):
     google_api_key: str
     port: int = 5000
+    gemini_model: str = "gemini-2.0-flash-exp"
+    llm_max_concurrency: int = 32
+    llm_warmup: bool = True
+    fast_intent_threshold: float = 0.8
+    speculative_execution: bool = False
+    speculative_max_calls: int = 1
+    answer_cache_max_entries: int = 1000
+    answer_cache_max_bytes: int = 32 * 1024 * 1024
+    answer_cache_ttl_seconds: float = 86400
+    answer_cache_dir: str = ""
+    history_max_conversations: int = 10000
+    history_max_bytes: int = 64 * 1024 * 1024
+    history_idle_ttl_seconds: float = 6 * 3600
+    storage_backend: str = "memory"
+    sqlite_path: str = "cp_assistant.db"
+    history_retention_seconds: float = 7 * 86400
+    hint_ladder_max_problems: int = 2000
+    history_summary: bool = True
+    history_verbatim_messages: int = 4
+    prompt_budget: bool = True
+    problem_registry_max_entries: int = 5000
+    problem_registry_max_bytes: int = 64 * 1024 * 1024
+    problem_registry_ttl_seconds: float = 24 * 3600
+    # Refining a digest costs one extra LLM call per new problem statement.
+    problem_digest_llm: bool = False
+    prefetch_enabled: bool = True
+    prefetch_concurrency: int = 2
+    prefetch_ttl_seconds: float = 120
+    disconnect_poll_seconds: float = 0.5
+    stream_buffer_max_streams: int = 1000
+    stream_buffer_max_bytes: int = 32 * 1024 * 1024
+    stream_buffer_ttl_seconds: float = 120
+    stream_resume_grace_seconds: float = 15
+    sse_coalesce_ms: float = 40
+    sse_coalesce_bytes: int = 2048
+    sse_gzip: bool = False
+    capture_enabled: bool = False
+    capture_path: str = "captures/requests.jsonl"
+    capture_max_bytes: int = 64 * 1024 * 1024
+    capture_backups: int = 5
+    capture_max_field_chars: int = 20000
+    # Comma-separated, primary first. Hedging and failover need a second entry.
+    llm_providers: str = "gemini"
+    llm_hedge_enabled: bool = True
+    llm_hedge_quantile: float = 0.95
+    llm_hedge_min_seconds: float = 0.5
+    llm_hedge_default_seconds: float = 3.0
+    llm_hedge_min_samples: int = 20
+    llm_hedge_window: int = 256
     
     class Config:
         env_file = ".env"
@@ -14,5 +63,52 @@ class Settings(BaseSettings):
 def get_settings():
     return Settings(
         google_api_key=os.getenv("GOOGLE_API_KEY", ""),
-        port=int(os.getenv("PORT", "5000"))
+        port=int(os.getenv("PORT", "5000")),
+        gemini_model=os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp"),
+        llm_max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+        llm_warmup=os.getenv("LLM_WARMUP", "true").lower() in ("1", "true", "yes"),
+        fast_intent_threshold=float(os.getenv("FAST_INTENT_THRESHOLD", "0.8")),
+        speculative_execution=os.getenv("SPECULATIVE_EXECUTION", "false").lower() in ("1", "true", "yes"),
+        speculative_max_calls=int(os.getenv("SPECULATIVE_MAX_CALLS", "1")),
+        answer_cache_max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+        answer_cache_max_bytes=int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+        answer_cache_ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400")),
+        answer_cache_dir=os.getenv("ANSWER_CACHE_DIR", ""),
+        history_max_conversations=int(os.getenv("HISTORY_MAX_CONVERSATIONS", "10000")),
+        history_max_bytes=int(os.getenv("HISTORY_MAX_BYTES", str(64 * 1024 * 1024))),
+        history_idle_ttl_seconds=float(os.getenv("HISTORY_IDLE_TTL_SECONDS", str(6 * 3600))),
+        storage_backend=os.getenv("STORAGE_BACKEND", "memory").lower(),
+        sqlite_path=os.getenv("SQLITE_PATH", "cp_assistant.db"),
+        history_retention_seconds=float(os.getenv("HISTORY_RETENTION_SECONDS", str(7 * 86400))),
+        hint_ladder_max_problems=int(os.getenv("HINT_LADDER_MAX_PROBLEMS", "2000")),
+        history_summary=os.getenv("HISTORY_SUMMARY", "true").lower() in ("1", "true", "yes"),
+        history_verbatim_messages=int(os.getenv("HISTORY_VERBATIM_MESSAGES", "4")),
+        prompt_budget=os.getenv("PROMPT_BUDGET", "true").lower() in ("1", "true", "yes"),
+        problem_registry_max_entries=int(os.getenv("PROBLEM_REGISTRY_MAX_ENTRIES", "5000")),
+        problem_registry_max_bytes=int(os.getenv("PROBLEM_REGISTRY_MAX_BYTES", str(64 * 1024 * 1024))),
+        problem_registry_ttl_seconds=float(os.getenv("PROBLEM_REGISTRY_TTL_SECONDS", str(24 * 3600))),
+        problem_digest_llm=os.getenv("PROBLEM_DIGEST_LLM", "false").lower() in ("1", "true", "yes"),
+        prefetch_enabled=os.getenv("PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes"),
+        prefetch_concurrency=int(os.getenv("PREFETCH_CONCURRENCY", "2")),
+        prefetch_ttl_seconds=float(os.getenv("PREFETCH_TTL_SECONDS", "120")),
+        disconnect_poll_seconds=float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5")),
+        stream_buffer_max_streams=int(os.getenv("STREAM_BUFFER_MAX_STREAMS", "1000")),
+        stream_buffer_max_bytes=int(os.getenv("STREAM_BUFFER_MAX_BYTES", str(32 * 1024 * 1024))),
+        stream_buffer_ttl_seconds=float(os.getenv("STREAM_BUFFER_TTL_SECONDS", "120")),
+        stream_resume_grace_seconds=float(os.getenv("STREAM_RESUME_GRACE_SECONDS", "15")),
+        sse_coalesce_ms=float(os.getenv("SSE_COALESCE_MS", "40")),
+        sse_coalesce_bytes=int(os.getenv("SSE_COALESCE_BYTES", "2048")),
+        sse_gzip=os.getenv("SSE_GZIP", "false").lower() in ("1", "true", "yes"),
+        capture_enabled=os.getenv("CAPTURE_ENABLED", "false").lower() in ("1", "true", "yes"),
+        capture_path=os.getenv("CAPTURE_PATH", "captures/requests.jsonl"),
+        capture_max_bytes=int(os.getenv("CAPTURE_MAX_BYTES", str(64 * 1024 * 1024))),
+        capture_backups=int(os.getenv("CAPTURE_BACKUPS", "5")),
+        capture_max_field_chars=int(os.getenv("CAPTURE_MAX_FIELD_CHARS", "20000")),
+        llm_providers=os.getenv("LLM_PROVIDERS", "gemini"),
+        llm_hedge_enabled=os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes"),
+        llm_hedge_quantile=float(os.getenv("LLM_HEDGE_QUANTILE", "0.95")),
+        llm_hedge_min_seconds=float(os.getenv("LLM_HEDGE_MIN_SECONDS", "0.5")),
+        llm_hedge_default_seconds=float(os.getenv("LLM_HEDGE_DEFAULT_SECONDS", "3.0")),
+        llm_hedge_min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+        llm_hedge_window=int(os.getenv("LLM_HEDGE_WINDOW", "256"))
     )
@@ -0,0 +1,91 @@
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+import asyncio
+from .prompt_budget import estimate_tokens
+
+T = TypeVar("T")
+
+# Output tokens assumed for an answer until real answers have been measured.
+DEFAULT_ANSWER_TOKENS = 800
+# Weight of the newest answer in the running average of answer length.
+AVERAGE_WEIGHT = 0.1
+
+class ClientDisconnected(Exception):
+    """The client went away before the stream finished."""
+
+async def cancel_on_disconnect(
+    source: AsyncIterator[T],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_seconds: float
+) -> AsyncIterator[T]:
+    """
+    Relay `source` until it ends or the client disconnects. On disconnect the task
+    consuming `source` is cancelled and ClientDisconnected is raised to the caller.
+    Whether that stops the model call depends on `source`: a StreamBuffer follower only
+    detaches, and the buffered generation keeps running for the resume grace period
+    (STREAM_RESUME_GRACE_SECONDS) so a reconnect can pick it up, then is cancelled.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    end = object()
+    disconnected = object()
+
+    async def pump() -> None:
+        try:
+            async for item in source:
+                queue.put_nowait((item, None))
+        except Exception as e:
+            queue.put_nowait((end, e))
+            return
+        queue.put_nowait((end, None))
+
+    pump_task = asyncio.create_task(pump())
+
+    async def watch() -> None:
+        while not await is_disconnected():
+            await asyncio.sleep(poll_seconds)
+        pump_task.cancel()
+        queue.put_nowait((disconnected, None))
+
+    watch_task = asyncio.create_task(watch())
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is disconnected:
+                raise ClientDisconnected()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        pump_task.cancel()
+        watch_task.cancel()
+        await asyncio.gather(pump_task, watch_task, return_exceptions=True)
+
+class CancellationStats:
+    """
+    Counts streamed generations abandoned by their client. Tokens saved are estimated as
+    the running average answer length minus what had already been streamed.
+    """
+    def __init__(self):
+        self.completed = 0
+        self.cancelled = 0
+        self.tokens_saved = 0
+        self.average_answer_tokens = float(DEFAULT_ANSWER_TOKENS)
+
+    def record_completed(self, answer: str) -> None:
+        self.completed += 1
+        self.average_answer_tokens += AVERAGE_WEIGHT * (estimate_tokens(answer) - self.average_answer_tokens)
+
+    def record_cancelled(self, streamed: str) -> None:
+        self.cancelled += 1
+        self.tokens_saved += max(0, round(self.average_answer_tokens) - estimate_tokens(streamed))
+
+    def snapshot(self) -> dict:
+        return {
+            "completed_generations": self.completed,
+            "cancelled_generations": self.cancelled,
+            "tokens_saved": self.tokens_saved,
+            "average_answer_tokens": round(self.average_answer_tokens)
+        }
+
+cancellation_stats = CancellationStats()
@@ -1,11 +1,161 @@
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+import asyncio
+import threading
+import time
+from google.ai.generativelanguage_v1beta.types import Content, Part
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_google_genai._genai_extension import build_generative_async_service
 from .config import get_settings
+from .metrics import model_first_chunk_seconds, model_seconds
 
-def get_gemini_model(temperature: float = 0.7):
-    settings = get_settings()
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash-exp",
-        api_key=settings.google_api_key,
-        temperature=temperature,
-        max_tokens=2048
-    )
+class PooledChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+    """
+    ChatGoogleGenerativeAI handle that shares one transport per event loop with every
+    other handle from the registry and respects the registry's concurrency limit.
+    """
+    @property
+    def async_client(self):
+        return gemini_registry.async_client()
+
+    def _generate(self, *args: Any, **kwargs: Any):
+        with gemini_registry.sync_slot():
+            return super()._generate(*args, **kwargs)
+
+    def _stream(self, *args: Any, **kwargs: Any) -> Iterator:
+        with gemini_registry.sync_slot():
+            yield from super()._stream(*args, **kwargs)
+
+    async def _agenerate(self, *args: Any, **kwargs: Any):
+        async with gemini_registry.async_slot():
+            with model_seconds.time(model=self.model, mode="generate"):
+                return await super()._agenerate(*args, **kwargs)
+
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator:
+        async with gemini_registry.async_slot():
+            started = time.perf_counter()
+            first = True
+            try:
+                async for chunk in super()._astream(*args, **kwargs):
+                    if first:
+                        first = False
+                        model_first_chunk_seconds.observe(time.perf_counter() - started, model=self.model)
+                    yield chunk
+            finally:
+                model_seconds.observe(time.perf_counter() - started, model=self.model, mode="stream")
+
+class _LoopResources:
+    """Async client and concurrency semaphore bound to one event loop."""
+    def __init__(self, loop: asyncio.AbstractEventLoop, client: Any, max_concurrency: int):
+        self.loop = loop
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+class GeminiClientRegistry:
+    """
+    Hands out shared model handles keyed by (model, temperature, max_tokens).
+
+    All handles share one sync gRPC client and one async client per event loop, so every
+    agent multiplexes its calls over the same HTTP/2 connection instead of opening its own.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handles: Dict[Tuple[str, float, int], PooledChatGoogleGenerativeAI] = {}
+        self._base: Optional[PooledChatGoogleGenerativeAI] = None
+        self._loop_resources: Optional[_LoopResources] = None
+        self._sync_semaphore: Optional[threading.BoundedSemaphore] = None
+        self._model_factory: Optional[Callable[[str, float, int], Any]] = None
+
+    def set_model_factory(self, factory: Optional[Callable[[str, float, int], Any]]) -> None:
+        """
+        Build handles with factory(model, temperature, max_tokens) instead of Gemini, e.g. a
+        local stub for offline benchmarks. Must be set before the agents are created.
+        """
+        with self._lock:
+            self._model_factory = factory
+            self._handles.clear()
+
+    def get(self, model: str, temperature: float, max_tokens: int) -> PooledChatGoogleGenerativeAI:
+        key = (model, temperature, max_tokens)
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None:
+                return handle
+
+            if self._model_factory is not None:
+                handle = self._model_factory(model, temperature, max_tokens)
+                self._handles[key] = handle
+                return handle
+
+            if self._base is None:
+                settings = get_settings()
+                self._base = PooledChatGoogleGenerativeAI(
+                    model=model,
+                    api_key=settings.google_api_key,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+                self._sync_semaphore = threading.BoundedSemaphore(settings.llm_max_concurrency)
+                handle = self._base
+            else:
+                # model_copy skips validation, so the copy reuses the base's sync client.
+                handle = self._base.model_copy(update={
+                    "model": model if model.startswith("models/") else f"models/{model}",
+                    "temperature": temperature,
+                    "max_output_tokens": max_tokens
+                })
+            self._handles[key] = handle
+            return handle
+
+    def _resources(self) -> _LoopResources:
+        loop = asyncio.get_running_loop()
+        resources = self._loop_resources
+        if resources is None or resources.loop is not loop:
+            settings = get_settings()
+            client = build_generative_async_service(
+                credentials=None,
+                api_key=settings.google_api_key
+            )
+            resources = _LoopResources(loop, client, settings.llm_max_concurrency)
+            self._loop_resources = resources
+        return resources
+
+    def async_client(self) -> Any:
+        return self._resources().client
+
+    def async_slot(self) -> asyncio.Semaphore:
+        return self._resources().semaphore
+
+    def sync_slot(self) -> threading.BoundedSemaphore:
+        if self._sync_semaphore is None:
+            self._sync_semaphore = threading.BoundedSemaphore(get_settings().llm_max_concurrency)
+        return self._sync_semaphore
+
+    async def warm_up(self, timeout: float = 10.0) -> bool:
+        """
+        Open the shared connection with a cheap count_tokens call so the first user
+        request does not pay TLS and HTTP/2 setup. Returns False if warm-up failed.
+        """
+        if self._base is None:
+            return False
+        try:
+            await asyncio.wait_for(
+                self.async_client().count_tokens(
+                    model=self._base.model,
+                    contents=[Content(parts=[Part(text="ping")])]
+                ),
+                timeout=timeout
+            )
+            return True
+        except Exception:
+            return False
+
+    def snapshot(self) -> dict:
+        return {
+            "handles": len(self._handles),
+            "max_concurrency": get_settings().llm_max_concurrency
+        }
+
+gemini_registry = GeminiClientRegistry()
+
+def get_gemini_model(temperature: float = 0.7, max_tokens: int = 2048, model: Optional[str] = None):
+    return gemini_registry.get(model or get_settings().gemini_model, temperature, max_tokens)
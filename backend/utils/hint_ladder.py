@@ -0,0 +1,144 @@
+from typing import AsyncIterator, Callable, Dict, Optional
+import asyncio
+import re
+from .bounded_store import BoundedStore
+from .answer_cache import statement_hash
+from .stream_fanout import ReplayableStream
+from .config import get_settings
+
+HINT_HEADING = re.compile(r"^#{1,4}\s*Hint\s*#?\s*(\d+)\b.*$", re.IGNORECASE | re.MULTILINE)
+# The line the prompt asks every hint to end with. The last section of a ladder only counts
+# as complete with it, since a ladder cut off by the token limit still ends "normally".
+HINT_CLOSING = re.compile(r"ask for another hint\W*$", re.IGNORECASE)
+
+# Characters held back while a section is still streaming, so a partially received
+# "## Hint #N" heading for the next section is never emitted as part of this one.
+HEADING_HOLDBACK_CHARS = 16
+
+def split_ladder(text: str) -> Dict[int, str]:
+    """Split ladder text into {hint_number: section}, each section including its heading."""
+    matches = list(HINT_HEADING.finditer(text))
+    sections = {}
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        number = int(match.group(1))
+        if number not in sections:
+            sections[number] = text[match.start():end].strip()
+    return sections
+
+class HintLadder:
+    """All hints for one problem, generated by a single streaming call."""
+    def __init__(self, stream: ReplayableStream, cache: Optional["HintLadderCache"] = None):
+        self.stream = stream
+        self.cache = cache
+
+    @property
+    def failed(self) -> bool:
+        return self.stream.finished and self.stream.error is not None
+
+    def can_serve(self, hint_number: int) -> bool:
+        if self.failed:
+            return False
+        if not self.stream.finished:
+            return True
+        return self._section_progress(hint_number)[1]
+
+    def _section_progress(self, hint_number: int) -> tuple:
+        """
+        Return (section text so far, whether the section is complete). A section is complete
+        once a later heading follows it, or when it ends the finished ladder with its closing line.
+        """
+        text = self.stream.text
+        sections = split_ladder(text)
+        section = sections.get(hint_number, "")
+        complete = any(n > hint_number for n in sections) or (
+            self.stream.finished and self.stream.error is None and bool(HINT_CLOSING.search(section))
+        )
+        if not complete and section:
+            # A finished ladder will not complete it any more, so nothing more of it is served.
+            section = "" if self.stream.finished else section[:max(0, len(section) - HEADING_HOLDBACK_CHARS)]
+        return section, complete
+
+    async def section_chunks(self, hint_number: int,
+                             fallback: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Stream one hint out of the ladder as soon as its text arrives, ending when the next
+        heading appears. Falls back to a single-hint generation if the ladder fails or ends
+        without completing the hint (e.g. cut off by the token limit).
+        """
+        emitted = 0
+        failed = False
+        try:
+            async for _ in self.stream.subscribe():
+                section, complete = self._section_progress(hint_number)
+                if len(section) > emitted:
+                    yield section[emitted:]
+                    emitted = len(section)
+                if complete:
+                    break
+        except asyncio.CancelledError:
+            # The ladder was cancelled under us (not this request): serve the hint another way.
+            if asyncio.current_task().cancelling():
+                raise
+            failed = True
+        except Exception:
+            failed = True
+
+        section, complete = self._section_progress(hint_number)
+        if complete:
+            if len(section) > emitted:
+                yield section[emitted:]
+            return
+
+        if self.cache is not None:
+            self.cache.record_fallback(failed)
+        if emitted:
+            # Part of the hint was already streamed; the complete one follows it.
+            yield "\n\n"
+        async for chunk in fallback():
+            yield chunk
+
+class HintLadderCache:
+    """Per-problem ladder cache shared by every user on the same problem."""
+    def __init__(self, max_problems: int, max_bytes: int = 16 * 1024 * 1024, ttl_seconds: float = 86400):
+        self._store = BoundedStore(max_problems, max_bytes, ttl_seconds)
+        self.started = 0
+        self.served = 0
+        self.fallbacks = 0
+        self.failures = 0
+
+    def _key(self, site: str, title: str, statement: str) -> str:
+        return f"{site}:{title}:{statement_hash(statement)}"
+
+    def get(self, site: str, title: str, statement: str) -> Optional[HintLadder]:
+        ladder = self._store.get(self._key(site, title, statement))
+        if ladder is not None and ladder.failed:
+            self._store.pop(self._key(site, title, statement))
+            return None
+        return ladder
+
+    def start(self, site: str, title: str, statement: str, chunks: AsyncIterator[str]) -> HintLadder:
+        """Start generating a ladder in the background and cache it immediately."""
+        key = self._key(site, title, statement)
+        ladder = self._store.get_or_create(key, lambda: HintLadder(ReplayableStream(chunks), self))
+        ladder.stream.add_done_callback(lambda stream: self._store.resize(key, len(stream.text.encode())))
+        self.started += 1
+        return ladder
+
+    def record_fallback(self, failed: bool) -> None:
+        """A hint the ladder could not deliver in full went to a single-hint call instead."""
+        self.fallbacks += 1
+        if failed:
+            self.failures += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "ladders": len(self._store),
+            "bytes": self._store.bytes,
+            "ladders_started": self.started,
+            "hints_served": self.served,
+            "fallbacks": self.fallbacks,
+            "ladder_failures": self.failures
+        }
+
+hint_ladders = HintLadderCache(max_problems=get_settings().hint_ladder_max_problems)
@@ -0,0 +1,100 @@
+from typing import AsyncIterator, Dict, Optional, Tuple
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+import asyncio
+from .hint_storage import HintHistoryStorage, hint_storage
+from .stream_fanout import ReplayableStream
+
+@dataclass
+class PendingHint:
+    """A reserved hint number whose text is still being generated."""
+    hint_number: int
+    stream: Optional[ReplayableStream]
+
+class HintLedger:
+    """
+    Reserve-then-commit allocation of hint numbers.
+
+    A hint number is reserved atomically before the LLM call and committed once the
+    generation finishes (or released if it fails). While a hint is pending, further
+    requests for the same problem join its generation instead of reserving another number.
+    """
+    def __init__(self, storage: HintHistoryStorage):
+        self.storage = storage
+        self._pending: Dict[Tuple[str, str], PendingHint] = {}
+        # Per-problem lock and the number of requests holding or waiting for it.
+        self._locks: Dict[Tuple[str, str], Tuple[asyncio.Lock, int]] = {}
+        self.started = 0
+        self.joined = 0
+
+    @asynccontextmanager
+    async def allocating(self, site: str, problem_title: str):
+        """
+        Hold while checking `pending` and reserving and starting a hint. Reserving awaits
+        the backend, so without it two concurrent requests could both find nothing pending
+        and each reserve a number of its own.
+        """
+        key = (site, problem_title)
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    def pending(self, site: str, problem_title: str) -> Optional[PendingHint]:
+        pending = self._pending.get((site, problem_title))
+        if pending is not None:
+            self.joined += 1
+        return pending
+
+    async def reserve(self, site: str, problem_title: str) -> int:
+        return await self.storage.areserve_hint_number(site, problem_title)
+
+    def release(self, site: str, problem_title: str, hint_number: int) -> None:
+        self.storage.release_hint(site, problem_title, hint_number)
+
+    def start(self, site: str, problem_title: str, hint_number: int, chunks: AsyncIterator[str]) -> PendingHint:
+        """Generate a reserved hint in the background; it is committed before the stream completes."""
+        key = (site, problem_title)
+        pending = PendingHint(hint_number=hint_number, stream=None)
+        # Cancelled (and the number released) once every requester has disconnected.
+        pending.stream = ReplayableStream(self._generate(key, pending, chunks), cancel_when_abandoned=True)
+        self._pending[key] = pending
+        self.started += 1
+        return pending
+
+    async def _generate(self, key: Tuple[str, str], pending: PendingHint, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        site, problem_title = key
+        parts = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+            text = "".join(parts)
+            if text:
+                await self.storage.acommit_hint(site, problem_title, pending.hint_number, text)
+            else:
+                self.storage.release_hint(site, problem_title, pending.hint_number)
+        except BaseException:
+            self.storage.release_hint(site, problem_title, pending.hint_number)
+            raise
+        finally:
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+
+    def snapshot(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "started": self.started,
+            "joined": self.joined
+        }
+
+hint_ledger = HintLedger(hint_storage)
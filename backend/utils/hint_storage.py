@@ -1,18 +1,13 @@
-from typing import List, Dict
+from typing import List
 import hashlib
-from dataclasses import dataclass
-from datetime import datetime
-
-@dataclass
-class HintEntry:
-    """Stores a single hint with metadata."""
-    hint_number: int
-    hint_text: str
-    timestamp: str
+import time
+from .history_records import HintEntry
+from .history_backends import HintBackend, MemoryHintBackend, call_backend
+from .config import get_settings
 
 class HintHistoryStorage:
-    def __init__(self):
-        self._storage: Dict[str, List[HintEntry]] = {}
+    def __init__(self, backend: HintBackend):
+        self.backend = backend
     
     def _generate_key(self, site: str, problem_title: str) -> str:
         """Generate a unique key for a problem based on site and title."""
@@ -22,30 +17,54 @@ class HintHistoryStorage:
     def get_hint_history(self, site: str, problem_title: str) -> List[HintEntry]:
         """Get the list of hints already given for this problem."""
         key = self._generate_key(site, problem_title)
-        return self._storage.get(key, [])
+        return self.backend.get_hints(key)
+    
+    async def aget_hint_history(self, site: str, problem_title: str) -> List[HintEntry]:
+        """Like get_hint_history, without blocking the event loop on a shared backend."""
+        key = self._generate_key(site, problem_title)
+        return await call_backend(self.backend.executor, self.backend.get_hints, key)
     
     def add_hint(self, site: str, problem_title: str, hint_number: int, hint_text: str) -> None:
         """Record a hint that has been given for this problem."""
         key = self._generate_key(site, problem_title)
-        if key not in self._storage:
-            self._storage[key] = []
-        
         entry = HintEntry(
             hint_number=hint_number,
             hint_text=hint_text,
-            timestamp=datetime.utcnow().isoformat()
+            timestamp=time.time()
+        )
+        self.backend.add_hint(key, entry)
+    
+    async def areserve_hint_number(self, site: str, problem_title: str) -> int:
+        """Atomically allocate the next hint number for this problem."""
+        key = self._generate_key(site, problem_title)
+        return await call_backend(self.backend.executor, self.backend.reserve_hint_number, key)
+    
+    async def acommit_hint(self, site: str, problem_title: str, hint_number: int, hint_text: str) -> None:
+        """Store the text of a previously reserved hint number."""
+        key = self._generate_key(site, problem_title)
+        entry = HintEntry(
+            hint_number=hint_number,
+            hint_text=hint_text,
+            timestamp=time.time()
         )
-        
-        existing_numbers = [h.hint_number for h in self._storage[key]]
-        if hint_number not in existing_numbers:
-            self._storage[key].append(entry)
-            self._storage[key].sort(key=lambda x: x.hint_number)
+        await call_backend(self.backend.executor, self.backend.commit_hint, key, entry)
+    
+    def release_hint(self, site: str, problem_title: str, hint_number: int) -> None:
+        """
+        Give back a reserved hint number whose generation failed. On a shared backend this
+        is queued without waiting, so it is safe on cancellation paths; it still runs
+        before any reservation requested after it.
+        """
+        key = self._generate_key(site, problem_title)
+        if self.backend.executor is None:
+            self.backend.release_hint(key, hint_number)
+        else:
+            self.backend.executor.submit(self.backend.release_hint, key, hint_number)
     
     def reset_history(self, site: str, problem_title: str) -> None:
         """Clear hint history for a specific problem."""
         key = self._generate_key(site, problem_title)
-        if key in self._storage:
-            del self._storage[key]
+        self.backend.clear(key)
     
     def get_next_hint_number(self, site: str, problem_title: str) -> int:
         """Get the next hint number to give (1-indexed)."""
@@ -53,5 +72,23 @@ class HintHistoryStorage:
         if not history:
             return 1
         return max(h.hint_number for h in history) + 1
+    
+    def snapshot(self) -> dict:
+        """Live gauges for resident conversations and bytes."""
+        return self.backend.snapshot()
+    
+    def close(self) -> None:
+        self.backend.close()
+
+def _create_backend() -> HintBackend:
+    settings = get_settings()
+    if settings.storage_backend == "sqlite":
+        from .sqlite_history import SQLiteHintBackend, get_database
+        return SQLiteHintBackend(get_database(settings.sqlite_path, settings.history_retention_seconds))
+    return MemoryHintBackend(
+        max_conversations=settings.history_max_conversations,
+        max_bytes=settings.history_max_bytes,
+        idle_ttl_seconds=settings.history_idle_ttl_seconds
+    )
 
-hint_storage = HintHistoryStorage()
+hint_storage = HintHistoryStorage(_create_backend())
@@ -0,0 +1,160 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional
+from collections import deque
+import asyncio
+import time
+from .bounded_store import BoundedStore
+from .history_records import ChatMessage, HintEntry
+
+# A reservation older than this is treated as abandoned (e.g. the worker died mid-generation).
+RESERVATION_TIMEOUT_SECONDS = 120
+
+async def call_backend(executor: Optional[Executor], fn: Callable[..., Any], *args: Any) -> Any:
+    """Call a backend method from the event loop, on the engine's executor if it can block."""
+    if executor is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+class ChatBackend(ABC):
+    """Storage engine behind ChatHistoryStorage. Keys are opaque problem keys."""
+    # Engines whose calls can block (file locks, busy timeouts) run them on this executor.
+    executor: Optional[Executor] = None
+
+    @abstractmethod
+    def get_messages(self, key: str) -> List[ChatMessage]:
+        ...
+
+    @abstractmethod
+    def append_message(self, key: str, message: ChatMessage) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self, key: str) -> None:
+        ...
+
+    def version(self, key: str) -> Any:
+        """
+        A value that changes whenever another process changes the key's messages, so
+        per-process caches can be validated. None for engines only this process writes.
+        """
+        return None
+
+    def snapshot(self) -> dict:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+class HintBackend(ABC):
+    """Storage engine behind HintHistoryStorage. Keys are opaque problem keys."""
+    executor: Optional[Executor] = None
+
+    @abstractmethod
+    def get_hints(self, key: str) -> List[HintEntry]:
+        """Committed hints for the key, ordered by hint number."""
+        ...
+
+    @abstractmethod
+    def add_hint(self, key: str, entry: HintEntry) -> bool:
+        """Store a hint unless that number already exists. Returns True if it was stored."""
+        ...
+
+    @abstractmethod
+    def reserve_hint_number(self, key: str) -> int:
+        """Atomically allocate the next hint number and mark it pending."""
+        ...
+
+    @abstractmethod
+    def commit_hint(self, key: str, entry: HintEntry) -> None:
+        """Fill in the text of a reserved hint number."""
+        ...
+
+    @abstractmethod
+    def release_hint(self, key: str, hint_number: int) -> None:
+        """Give back a reservation whose generation failed."""
+        ...
+
+    @abstractmethod
+    def clear(self, key: str) -> None:
+        ...
+
+    def snapshot(self) -> dict:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+class MemoryChatBackend(ChatBackend):
+    """Per-process chat history bounded by a BoundedStore."""
+    def __init__(self, max_messages: int, max_conversations: int, max_bytes: int, idle_ttl_seconds: float):
+        self.max_messages = max_messages
+        self._store = BoundedStore(max_conversations, max_bytes, idle_ttl_seconds)
+
+    def get_messages(self, key: str) -> List[ChatMessage]:
+        messages = self._store.get(key)
+        return list(messages) if messages is not None else []
+
+    def append_message(self, key: str, message: ChatMessage) -> None:
+        messages = self._store.get_or_create(key, lambda: deque(maxlen=self.max_messages))
+        delta = message.size_bytes()
+        if len(messages) == self.max_messages:
+            delta -= messages[0].size_bytes()
+        messages.append(message)
+        self._store.resize(key, delta)
+
+    def clear(self, key: str) -> None:
+        self._store.pop(key)
+
+    def snapshot(self) -> dict:
+        return {"backend": "memory", **self._store.snapshot()}
+
+class MemoryHintBackend(HintBackend):
+    """Per-process hint history bounded by a BoundedStore, keyed by hint number within a problem."""
+    def __init__(self, max_conversations: int, max_bytes: int, idle_ttl_seconds: float):
+        self._store = BoundedStore(max_conversations, max_bytes, idle_ttl_seconds)
+        self._reservations: dict = {}
+
+    def get_hints(self, key: str) -> List[HintEntry]:
+        hints = self._store.get(key)
+        if not hints:
+            return []
+        return [hints[number] for number in sorted(hints)]
+
+    def add_hint(self, key: str, entry: HintEntry) -> bool:
+        hints = self._store.get_or_create(key, dict)
+        if entry.hint_number in hints:
+            return False
+        hints[entry.hint_number] = entry
+        self._store.resize(key, entry.size_bytes())
+        return True
+
+    def reserve_hint_number(self, key: str) -> int:
+        now = time.time()
+        pending = self._reservations.setdefault(key, {})
+        for number, reserved_at in list(pending.items()):
+            if now - reserved_at > RESERVATION_TIMEOUT_SECONDS:
+                del pending[number]
+        hints = self._store.get(key) or {}
+        number = max(max(hints, default=0), max(pending, default=0)) + 1
+        pending[number] = now
+        return number
+
+    def commit_hint(self, key: str, entry: HintEntry) -> None:
+        self.release_hint(key, entry.hint_number)
+        self.add_hint(key, entry)
+
+    def release_hint(self, key: str, hint_number: int) -> None:
+        pending = self._reservations.get(key)
+        if pending is None:
+            return
+        pending.pop(hint_number, None)
+        if not pending:
+            del self._reservations[key]
+
+    def clear(self, key: str) -> None:
+        self._store.pop(key)
+        self._reservations.pop(key, None)
+
+    def snapshot(self) -> dict:
+        return {"backend": "memory", **self._store.snapshot()}
@@ -0,0 +1,114 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from dataclasses import dataclass
+import asyncio
+from .bounded_store import BoundedStore
+from .history_records import ChatMessage
+
+Summarizer = Callable[[str, str], Awaitable[str]]
+
+@dataclass(slots=True)
+class RollingSummary:
+    """Summary of every message up to and including `through` (a message timestamp)."""
+    text: str
+    through: float
+
+def format_messages(messages: List[ChatMessage]) -> str:
+    formatted = []
+    for msg in messages:
+        if msg.role == "user":
+            formatted.append(f"User: {msg.content}")
+        else:
+            agent_info = f" (via {msg.agent_used})" if msg.agent_used else ""
+            formatted.append(f"Assistant{agent_info}: {msg.content}")
+    return "\n\n".join(formatted)
+
+class HistoryCompactor:
+    """
+    Keeps the last few messages verbatim and folds older ones into a running summary.
+
+    Folding happens in a background task once per new message, never on the request path.
+    Until a message is folded it stays in the prompt verbatim. The formatted prompt segment
+    is cached per conversation together with the backend's version of it, and dropped when
+    a message is appended here, when a fold lands, or when the version shows that another
+    worker changed the conversation.
+    """
+    def __init__(self, verbatim_messages: int, max_conversations: int, max_bytes: int, idle_ttl_seconds: float):
+        self.verbatim_messages = verbatim_messages
+        self.summarize: Optional[Summarizer] = None
+        self._summaries = BoundedStore(max_conversations, max_bytes, idle_ttl_seconds)
+        self._prompts = BoundedStore(max_conversations, max_bytes, idle_ttl_seconds)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.prompt_hits = 0
+        self.prompt_misses = 0
+        self.folds = 0
+        self.fold_errors = 0
+
+    def cached_prompt(self, key: str, version: Any = None) -> Optional[str]:
+        cached = self._prompts.get(key)
+        if cached is None or cached[0] != version:
+            self.prompt_misses += 1
+            return None
+        self.prompt_hits += 1
+        return cached[1]
+
+    def build_prompt(self, key: str, messages: List[ChatMessage], version: Any = None) -> str:
+        """Format the summary plus unfolded messages and cache the result."""
+        summary = self._summaries.get(key)
+        if summary is not None:
+            messages = [msg for msg in messages if msg.timestamp > summary.through]
+
+        parts = []
+        if summary is not None:
+            parts.append(f"Summary of earlier conversation:\n{summary.text}")
+        if messages:
+            parts.append(format_messages(messages))
+        prompt = "\n\n".join(parts) if parts else "No previous conversation."
+
+        self._prompts.pop(key)
+        self._prompts.get_or_create(key, lambda: (version, prompt))
+        self._prompts.resize(key, len(prompt.encode()))
+        return prompt
+
+    def invalidate(self, key: str) -> None:
+        self._prompts.pop(key)
+
+    def clear(self, key: str) -> None:
+        self._prompts.pop(key)
+        self._summaries.pop(key)
+
+    def schedule(self, key: str, messages: List[ChatMessage]) -> None:
+        """Fold messages that left the verbatim window into the summary, in the background."""
+        if self.summarize is None or key in self._tasks:
+            return
+        summary = self._summaries.get(key)
+        older = messages[:-self.verbatim_messages] if self.verbatim_messages else list(messages)
+        if summary is not None:
+            older = [msg for msg in older if msg.timestamp > summary.through]
+        if not older:
+            return
+        task = asyncio.get_running_loop().create_task(self._fold(key, summary, older))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+    async def _fold(self, key: str, summary: Optional[RollingSummary], messages: List[ChatMessage]) -> None:
+        try:
+            text = await self.summarize(summary.text if summary else "", format_messages(messages))
+        except Exception:
+            self.fold_errors += 1
+            return
+        folded = RollingSummary(text=text.strip(), through=messages[-1].timestamp)
+        self._summaries.pop(key)
+        self._summaries.get_or_create(key, lambda: folded)
+        self._summaries.resize(key, len(folded.text.encode()))
+        self._prompts.pop(key)
+        self.folds += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "summaries": len(self._summaries),
+            "prompt_cache_hits": self.prompt_hits,
+            "prompt_cache_misses": self.prompt_misses,
+            "folds": self.folds,
+            "fold_errors": self.fold_errors,
+            "folds_running": len(self._tasks)
+        }
@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+
+# Approximate per-record overhead of the slotted records and their container slots.
+MESSAGE_OVERHEAD_BYTES = 96
+HINT_OVERHEAD_BYTES = 72
+
+@dataclass(slots=True)
+class ChatMessage:
+    """Stores a single message with metadata."""
+    role: str  # 'user' or 'assistant'
+    content: str
+    agent_used: str
+    timestamp: float  # unix seconds
+
+    def size_bytes(self) -> int:
+        return len(self.content.encode()) + len(self.agent_used) + MESSAGE_OVERHEAD_BYTES
+
+@dataclass(slots=True)
+class HintEntry:
+    """Stores a single hint with metadata."""
+    hint_number: int
+    hint_text: str
+    timestamp: float  # unix seconds
+
+    def size_bytes(self) -> int:
+        return len(self.hint_text.encode()) + HINT_OVERHEAD_BYTES
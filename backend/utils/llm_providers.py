@@ -0,0 +1,277 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import deque
+from contextvars import ContextVar
+import asyncio
+import time
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from .config import get_settings
+from .gemini_client import gemini_registry
+from .metrics import llm_calls_total, llm_hedges_total
+
+# Builds a chat model for factory(model, temperature, max_tokens).
+ProviderFactory = Callable[[str, float, int], Any]
+
+# Providers that answered within the current request, in call order.
+_served_by: ContextVar[Optional[List[str]]] = ContextVar("llm_served_by", default=None)
+
+def _record_served(name: str) -> None:
+    served = _served_by.get()
+    if served is not None and name not in served:
+        served.append(name)
+
+def collect_served(served: List[str]) -> None:
+    """Record the providers that answer from here on (and in tasks spawned from here) into `served`."""
+    _served_by.set(served)
+
+def record_served(names: Iterable[str]) -> None:
+    """Note providers that answered a call shared with other requests, e.g. a coalesced one."""
+    for name in names:
+        _record_served(name)
+
+class ProviderStats:
+    """
+    Recent time-to-first-chunk samples of one provider and call mode. A call cancelled
+    because a hedge won is recorded with the time it had already taken, so slow calls
+    still count towards the tail instead of disappearing from it.
+    """
+    def __init__(self, window: int):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.served = 0
+        self.errors = 0
+        self.hedges_won = 0
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class ProviderRegistry:
+    """
+    Named LLM backends, configured as an ordered list in LLM_PROVIDERS ("name" or
+    "name:model", e.g. "gemini,gemini:gemini-1.5-flash"). The first entry is the
+    primary; the others are used to hedge slow calls and to fail over on errors, so with
+    a single entry (the default) calls are neither hedged nor retried.
+    """
+    def __init__(self, specs: List[str], hedge_enabled: bool, hedge_quantile: float,
+                 hedge_min_seconds: float, hedge_default_seconds: float, hedge_min_samples: int, window: int):
+        self.specs = specs
+        self.hedge_enabled = hedge_enabled
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedge_default_seconds = hedge_default_seconds
+        self.hedge_min_samples = hedge_min_samples
+        self.window = window
+        self.hedges = 0
+        self.failovers = 0
+        self._factories: Dict[str, ProviderFactory] = {"gemini": gemini_registry.get}
+        self._stats: Dict[Tuple[str, str], ProviderStats] = {}
+
+    def begin_request(self) -> List[str]:
+        """Start recording which providers answer the current request (and tasks spawned from it)."""
+        served: List[str] = []
+        collect_served(served)
+        return served
+
+    def register(self, name: str, factory: ProviderFactory) -> None:
+        """Add a backend that LLM_PROVIDERS can name. Must be called before the agents are created."""
+        self._factories[name] = factory
+
+    def get(self, model: str, temperature: float, max_tokens: int) -> "HedgedChatModel":
+        providers = []
+        for spec in self.specs:
+            name, _, override = spec.partition(":")
+            factory = self._factories.get(name)
+            if factory is None:
+                raise ValueError(f"Unknown LLM provider '{name}' in LLM_PROVIDERS")
+            providers.append((spec, factory(override or model, temperature, max_tokens)))
+        return HedgedChatModel(providers=providers, registry=self, model=model)
+
+    def stats(self, provider: str, mode: str) -> ProviderStats:
+        stats = self._stats.get((provider, mode))
+        if stats is None:
+            stats = self._stats[(provider, mode)] = ProviderStats(self.window)
+        return stats
+
+    def hedge_delay(self, provider: str, mode: str) -> Optional[float]:
+        """Seconds to wait for the first chunk before hedging, or None to never hedge."""
+        if not self.hedge_enabled:
+            return None
+        stats = self.stats(provider, mode)
+        if len(stats.samples) < self.hedge_min_samples:
+            return self.hedge_default_seconds
+        return max(self.hedge_min_seconds, stats.quantile(self.hedge_quantile))
+
+    def snapshot(self) -> dict:
+        providers = {}
+        for (provider, mode), stats in self._stats.items():
+            p50 = stats.quantile(0.5)
+            providers[f"{provider}/{mode}"] = {
+                "served": stats.served,
+                "errors": stats.errors,
+                "hedges_won": stats.hedges_won,
+                "first_chunk_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "hedge_delay_ms": round(self.hedge_delay(provider, mode) * 1000, 1) if self.hedge_enabled else None
+            }
+        return {
+            "order": self.specs,
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+            "providers": providers
+        }
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Chat model that sends each call to the primary provider and, if no first chunk has
+    arrived within that provider's hedge delay, also to the next one; whichever answers
+    first is used and the other call is cancelled. A provider that fails before its first
+    chunk is replaced by the next one in order. Errors after the first chunk are raised,
+    since part of the answer has already been streamed.
+    """
+    providers: List[Tuple[str, Any]]
+    registry: Any
+    model: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged"
+
+    async def _race(self, mode: str, start: Callable[[Any], Tuple[Awaitable, Any]]) -> Tuple[str, Any, Any]:
+        """
+        Run `start(handle)` -> (first result awaitable, iterator or None) across providers
+        as described above. Returns the winning provider, its first result and iterator.
+        """
+        pending = list(self.providers)
+        racing: Dict[asyncio.Future, Tuple[str, Any, float]] = {}
+        hedged = False
+        error: Optional[BaseException] = None
+
+        def launch() -> None:
+            name, handle = pending.pop(0)
+            first, iterator = start(handle)
+            racing[asyncio.ensure_future(first)] = (name, iterator, time.perf_counter())
+
+        launch()
+        try:
+            while racing:
+                timeout = None
+                if not hedged and pending and len(racing) == 1:
+                    (name, _, launched), = racing.values()
+                    delay = self.registry.hedge_delay(name, mode)
+                    if delay is not None:
+                        timeout = max(0.0, launched + delay - time.perf_counter())
+                done, _ = await asyncio.wait(racing, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.registry.hedges += 1
+                    llm_hedges_total.inc(provider=name, mode=mode)
+                    launch()
+                    continue
+
+                for task in done:
+                    name, iterator, launched = racing.pop(task)
+                    stats = self.registry.stats(name, mode)
+                    try:
+                        result = task.result()
+                    except StopAsyncIteration:
+                        result = None
+                    except Exception as exc:
+                        error = exc
+                        stats.errors += 1
+                        llm_calls_total.inc(provider=name, mode=mode, outcome="error")
+                        continue
+                    stats.samples.append(time.perf_counter() - launched)
+                    stats.served += 1
+                    if hedged:
+                        stats.hedges_won += 1
+                    llm_calls_total.inc(provider=name, mode=mode, outcome="served")
+                    _record_served(name)
+                    return name, result, iterator
+
+                if not racing and pending:
+                    self.registry.failovers += 1
+                    launch()
+            raise error
+        finally:
+            for task, (name, iterator, launched) in racing.items():
+                self.registry.stats(name, mode).samples.append(time.perf_counter() - launched)
+                llm_calls_total.inc(provider=name, mode=mode, outcome="cancelled")
+                task.cancel()
+                if iterator is not None:
+                    task.add_done_callback(lambda _, iterator=iterator: asyncio.ensure_future(iterator.aclose()))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        _, result, _ = await self._race(
+            "generate", lambda handle: (handle._agenerate(messages, stop=stop, **kwargs), None)
+        )
+        return result
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        def start(handle: Any) -> Tuple[Awaitable, Any]:
+            iterator = handle._astream(messages, stop=stop, **kwargs).__aiter__()
+            return iterator.__anext__(), iterator
+
+        _, first, iterator = await self._race("stream", start)
+        if first is None:
+            return
+        try:
+            yield first
+            async for chunk in iterator:
+                yield chunk
+        finally:
+            await iterator.aclose()
+
+    def _failover(self, mode: str, call: Callable[[Any], Any]) -> Any:
+        """Synchronous calls are not hedged, only retried on the next provider."""
+        error: Optional[BaseException] = None
+        for index, (name, handle) in enumerate(self.providers):
+            if index:
+                self.registry.failovers += 1
+            try:
+                result = call(handle)
+            except Exception as exc:
+                error = exc
+                self.registry.stats(name, mode).errors += 1
+                llm_calls_total.inc(provider=name, mode=mode, outcome="error")
+                continue
+            self.registry.stats(name, mode).served += 1
+            llm_calls_total.inc(provider=name, mode=mode, outcome="served")
+            _record_served(name)
+            return result
+        raise error
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return self._failover("generate", lambda handle: handle._generate(messages, stop=stop, **kwargs))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        def first_chunk(handle: Any) -> Tuple[Any, Optional[ChatGenerationChunk]]:
+            iterator = iter(handle._stream(messages, stop=stop, **kwargs))
+            return iterator, next(iterator, None)
+
+        iterator, first = self._failover("stream", first_chunk)
+        if first is not None:
+            yield first
+            yield from iterator
+
+def _create_registry() -> ProviderRegistry:
+    settings = get_settings()
+    return ProviderRegistry(
+        specs=[spec.strip() for spec in settings.llm_providers.split(",") if spec.strip()] or ["gemini"],
+        hedge_enabled=settings.llm_hedge_enabled,
+        hedge_quantile=settings.llm_hedge_quantile,
+        hedge_min_seconds=settings.llm_hedge_min_seconds,
+        hedge_default_seconds=settings.llm_hedge_default_seconds,
+        hedge_min_samples=settings.llm_hedge_min_samples,
+        window=settings.llm_hedge_window
+    )
+
+provider_registry = _create_registry()
+
+def get_chat_model(temperature: float = 0.7, max_tokens: int = 2048, model: Optional[str] = None) -> HedgedChatModel:
+    return provider_registry.get(model or get_settings().gemini_model, temperature, max_tokens)
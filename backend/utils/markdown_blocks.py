@@ -0,0 +1,109 @@
+from typing import List, Optional
+import re
+
+FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+HEADING = re.compile(r"^#{1,6}(?:\s|$)")
+
+class MarkdownBlockSplitter:
+    """
+    Incrementally splits streamed markdown into finished top-level blocks and a tail.
+
+    A block is finished once it can no longer change how it renders: a code fence when
+    its closing line arrives, a heading when its line ends, and anything else when a blank
+    line is followed by a new unindented line (an indented line may still continue a list
+    item). Everything not yet finished is the tail.
+    """
+    def __init__(self):
+        self._partial = ""
+        self._lines: List[str] = []
+        self._fence = ""
+        self._fence_indented = False
+        self._after_blank = False
+        self._sent_tail = ""
+
+    @property
+    def tail(self) -> str:
+        lines = self._lines + ([self._partial] if self._partial else [])
+        return "\n".join(lines).strip("\n")
+
+    def tail_update(self) -> Optional[dict]:
+        """
+        The tail change since the last call, as an event payload: {"token": appended text}
+        when the tail only grew, {"tail": whole tail} when it was rewritten, or None when it
+        is unchanged. Clients start a new tail after every finished block, and so does this.
+        """
+        tail = self.tail
+        if tail == self._sent_tail:
+            return None
+        sent, self._sent_tail = self._sent_tail, tail
+        if tail.startswith(sent):
+            return {"token": tail[len(sent):]}
+        return {"tail": tail}
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; return the blocks it finished."""
+        finished: List[str] = []
+        *complete, self._partial = (self._partial + text).split("\n")
+        for line in complete:
+            self._add_line(line, finished)
+        return finished
+
+    def finish(self) -> List[str]:
+        """End of stream: everything left over becomes the last block(s)."""
+        finished: List[str] = []
+        if self._partial:
+            self._add_line(self._partial, finished)
+            self._partial = ""
+        self._flush(finished)
+        self._fence = ""
+        return finished
+
+    def _add_line(self, line: str, finished: List[str]) -> None:
+        if self._fence:
+            self._lines.append(line)
+            closing = FENCE.match(line)
+            if closing and closing.group(1)[0] == self._fence[0] and len(closing.group(1)) >= len(self._fence) \
+                    and not line.strip().lstrip(self._fence[0]):
+                self._fence = ""
+                if not self._fence_indented:
+                    self._flush(finished)
+            return
+
+        if not line.strip():
+            self._after_blank = bool(self._lines)
+            if self._lines:
+                self._lines.append(line)
+            return
+
+        indented = line[:1] in (" ", "\t")
+        if self._after_blank and not indented:
+            self._flush(finished)
+        self._after_blank = False
+
+        opening = FENCE.match(line)
+        if opening:
+            if not indented:
+                self._flush(finished)
+            self._fence = opening.group(1)
+            self._fence_indented = indented
+            self._lines.append(line)
+            return
+        if HEADING.match(line):
+            self._flush(finished)
+            self._lines.append(line)
+            self._flush(finished)
+            return
+        self._lines.append(line)
+
+    def _flush(self, finished: List[str]) -> None:
+        block = "\n".join(self._lines).strip("\n")
+        self._lines = []
+        self._after_blank = False
+        self._sent_tail = ""
+        if block.strip():
+            finished.append(block)
+
+def split_blocks(text: str) -> List[str]:
+    """All blocks of a complete markdown answer."""
+    splitter = MarkdownBlockSplitter()
+    return splitter.feed(text) + splitter.finish()
@@ -0,0 +1,210 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import asyncio
+import heapq
+import itertools
+import time
+from .answer_cache import normalize_question
+from .config import get_settings
+
+# Canonical questions that prefetched answers are stored under.
+PREFETCH_QUESTIONS = {
+    "explain": "Explain this problem"
+}
+
+# Words that carry no information beyond "explain the problem"; a question made only of
+# these is answered from the prefetched explanation.
+GENERIC_WORDS = {
+    "explain", "explanation", "the", "this", "that", "problem", "question", "statement", "task",
+    "please", "pls", "plz", "can", "could", "would", "you", "me", "help", "understand", "what",
+    "does", "do", "is", "it", "ask", "asking", "asks", "mean", "means", "describe", "i", "dont",
+    "not", "a", "an", "to", "about", "simple", "simply", "terms", "in", "words", "again"
+}
+
+def is_generic_question(question: str) -> bool:
+    words = normalize_question(question).split()
+    return bool(words) and all(word in GENERIC_WORDS for word in words)
+
+@dataclass(order=True)
+class PrefetchJob:
+    """One unit of background warm-up work. Lower priority values run first."""
+    priority: int
+    seq: int
+    key: str = field(compare=False)
+    problem: str = field(compare=False)
+    run: Callable[[], Awaitable[None]] = field(compare=False)
+    expires_at: float = field(compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+class PrefetchQueue:
+    """
+    Low-priority background work queue.
+
+    Jobs are deduplicated by key across users and only start while no interactive
+    request is in flight, so prefetching never competes with a user waiting on an answer.
+    Jobs that wait longer than their TTL are dropped, and a problem's jobs are cancelled
+    once every client that asked for them has withdrawn its interest.
+    """
+    def __init__(self, concurrency: int, ttl_seconds: float):
+        self.concurrency = concurrency
+        self.ttl_seconds = ttl_seconds
+        self._heap: List[PrefetchJob] = []
+        self._seq = itertools.count()
+        self._queued: Dict[str, PrefetchJob] = {}
+        self._running: Dict[str, Tuple[asyncio.Task, str]] = {}
+        self._interest: Dict[str, int] = {}
+        self._interactive = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._wakeup = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+        self.queued = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self.cancelled = 0
+
+    @contextmanager
+    def interactive(self):
+        """Mark an interactive request in flight; prefetch jobs wait until none are."""
+        self._interactive += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._interactive -= 1
+            if self._interactive == 0:
+                self._idle.set()
+
+    def submit(self, key: str, problem: str, priority: int, run: Callable[[], Awaitable[None]]) -> bool:
+        """Queue a job unless one with the same key is already queued or running."""
+        if key in self._queued or key in self._running:
+            self.deduplicated += 1
+            return False
+        job = PrefetchJob(
+            priority=priority,
+            seq=next(self._seq),
+            key=key,
+            problem=problem,
+            run=run,
+            expires_at=time.time() + self.ttl_seconds
+        )
+        heapq.heappush(self._heap, job)
+        self._queued[key] = job
+        self.queued += 1
+        self._wakeup.set()
+        return True
+
+    def add_interest(self, problem: str) -> bool:
+        """
+        Count one more client waiting on the problem's jobs. Call after submitting them:
+        a problem with nothing queued or running is not tracked, so its entry cannot leak.
+        """
+        if not self._busy(problem):
+            return False
+        self._interest[problem] = self._interest.get(problem, 0) + 1
+        return True
+
+    def cancel(self, problem: str) -> int:
+        """Withdraw one client's interest; cancel the problem's jobs once nobody wants them."""
+        if problem not in self._interest:
+            return 0
+        remaining = self._interest[problem] - 1
+        if remaining > 0:
+            self._interest[problem] = remaining
+            return 0
+        self._interest.pop(problem, None)
+
+        cancelled = 0
+        for key, job in list(self._queued.items()):
+            if job.problem == problem:
+                job.cancelled = True
+                del self._queued[key]
+                cancelled += 1
+        for task, job_problem in list(self._running.values()):
+            if job_problem == problem:
+                task.cancel()
+                cancelled += 1
+        self.cancelled += cancelled
+        return cancelled
+
+    def _busy(self, problem: str) -> bool:
+        return any(job.problem == problem for job in self._queued.values()) or \
+            any(job_problem == problem for _, job_problem in self._running.values())
+
+    def _forget_if_idle(self, problem: str) -> None:
+        if not self._busy(problem):
+            self._interest.pop(problem, None)
+
+    def _next_job(self) -> Optional[PrefetchJob]:
+        now = time.time()
+        while self._heap:
+            job = heapq.heappop(self._heap)
+            if job.cancelled:
+                continue
+            self._queued.pop(job.key, None)
+            if job.expires_at < now:
+                self.expired += 1
+                continue
+            return job
+        return None
+
+    async def _worker(self) -> None:
+        while True:
+            await self._idle.wait()
+            job = self._next_job()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            task = asyncio.create_task(job.run())
+            self._running[job.key] = (task, job.problem)
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self._running.pop(job.key, None)
+                self._forget_if_idle(job.problem)
+            if task.cancelled():
+                continue
+            if task.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def snapshot(self) -> dict:
+        return {
+            "queued_now": len(self._queued),
+            "running": len(self._running),
+            "interactive_in_flight": self._interactive,
+            "queued": self.queued,
+            "deduplicated": self.deduplicated,
+            "completed": self.completed,
+            "failed": self.failed,
+            "expired": self.expired,
+            "cancelled": self.cancelled
+        }
+
+def _create_queue() -> PrefetchQueue:
+    settings = get_settings()
+    return PrefetchQueue(
+        concurrency=settings.prefetch_concurrency,
+        ttl_seconds=settings.prefetch_ttl_seconds
+    )
+
+prefetch_queue = _create_queue()
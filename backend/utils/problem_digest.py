@@ -0,0 +1,234 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+from dataclasses import dataclass, field, replace
+import asyncio
+import contextvars
+import re
+from .bounded_store import BoundedStore
+from .answer_cache import statement_hash
+from .config import get_settings
+
+# Lines that state a bound, e.g. "1 <= n <= 2 * 10^5" or "1 ≤ |s| ≤ 10^6".
+CONSTRAINT_LINE = re.compile(r"(<=|≤|⩽|<|10\s*\^|10\s*\*\*|\d\s*e\s*\d)", re.IGNORECASE)
+BOUND_VALUE = r"(?P<bound>(?:\d+(?:\.\d+)?\s*[*×x·⋅]\s*)?10\s*(?:\^|\*\*)\s*\d+|\d+(?:\.\d+)?\s*e\s*\d+|\d[\d,]*)"
+BOUND = re.compile(
+    r"(?P<var>[\w.\[\]|()]+(?:\.length)?|\|\w+\|)\s*(?:<=|≤|⩽)\s*" + BOUND_VALUE,
+    re.IGNORECASE
+)
+# "The sum of n over all test cases does not exceed 2 * 10^5": the real input size
+# when a statement has many test cases.
+SUM_BOUND = re.compile(
+    r"sum of (?:all )?(?:the )?(?:values of )?(?:n|m|\|\w+\||lengths?)\b[^.\n]*?"
+    r"(?:<=|≤|⩽|does not exceed|doesn't exceed|not exceed|at most|is not greater than)\s*" + BOUND_VALUE,
+    re.IGNORECASE
+)
+# Input sizes, in order of preference: lengths and n/m first, then counts such as the
+# number of queries, vertices or edges. Value ranges (k, a_i, x) and the number of test
+# cases (t) are not sizes.
+SIZE_VARIABLE = re.compile(r"^(?:n|m|\|\w+\|)$|length|len|size", re.IGNORECASE)
+COUNT_VARIABLE = re.compile(r"^(?:q|v|e)$|count", re.IGNORECASE)
+
+# Largest input size that each complexity class comfortably handles in ~1-2s.
+COMPLEXITY_TABLE = [
+    (11, "O(n! · n)"),
+    (25, "O(2^n · n)"),
+    (100, "O(n^4)"),
+    (500, "O(n^3)"),
+    (5000, "O(n^2)"),
+    (10 ** 6, "O(n log n)"),
+    (10 ** 8, "O(n)"),
+]
+
+TAG_KEYWORDS = [
+    (r"shortest path|dijkstra|weighted (?:edge|graph)", "shortest paths"),
+    (r"\btree\b|rooted|ancestor|subtree", "trees"),
+    (r"\bgraph\b|edges?\b|vertices|vertex|nodes? connected", "graphs"),
+    (r"\bgrid\b|matrix|cells?\b", "grids / BFS"),
+    (r"subarray|contiguous|window", "prefix sums / sliding window"),
+    (r"substring|palindrome|string", "strings"),
+    (r"modulo|10\s*\^\s*9\s*\+\s*7|1e9\s*\+\s*7|number of ways", "dynamic programming / combinatorics"),
+    (r"minimum number of|maximum number of|minimi[sz]e|maximi[sz]e", "greedy / dp"),
+    (r"sorted|binary search|k-th|kth smallest", "binary search"),
+    (r"queries|update", "data structures"),
+    (r"prime|gcd|lcm|divisor|divisible", "number theory"),
+    (r"permutation|subsequence", "combinatorics"),
+    (r"interval|segment|meeting", "sorting / sweep line"),
+    (r"\bxor\b|bitwise|\bbits?\b", "bit manipulation"),
+    (r"parenthes|bracket|stack", "stack"),
+]
+
+@dataclass
+class ProblemDigest:
+    """Compact, reusable facts about one problem statement."""
+    constraints: List[str] = field(default_factory=list)
+    max_n: Optional[int] = None
+    target_complexity: str = ""
+    tags: List[str] = field(default_factory=list)
+    restatement: str = ""
+    source: str = "local"  # 'local' (regex only) or 'llm' (refined by DigestAgent)
+
+    def format_for_prompt(self) -> str:
+        lines = []
+        if self.restatement:
+            lines.append(f"- Task: {self.restatement}")
+        if self.constraints:
+            lines.append(f"- Constraints: {'; '.join(self.constraints)}")
+        if self.target_complexity:
+            lines.append(f"- Target complexity: {self.target_complexity}")
+        if self.tags:
+            lines.append(f"- Likely topics: {', '.join(self.tags)}")
+        if not lines:
+            return ""
+        return "Problem Digest:\n" + "\n".join(lines)
+
+    def size_bytes(self) -> int:
+        return len(self.format_for_prompt().encode()) + 128
+
+def parse_bound(text: str) -> Optional[int]:
+    text = text.replace(",", "").replace(" ", "").lower()
+    match = re.fullmatch(r"(?:(\d+(?:\.\d+)?)[*×x·⋅])?10(?:\^|\*\*)(\d+)", text)
+    if match:
+        return int(float(match.group(1) or 1) * 10 ** int(match.group(2)))
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)e(\d+)", text)
+    if match:
+        return int(float(match.group(1)) * 10 ** int(match.group(2)))
+    return int(text) if text.isdigit() else None
+
+def target_complexity_for(max_n: Optional[int]) -> str:
+    if max_n is None:
+        return ""
+    for limit, complexity in COMPLEXITY_TABLE:
+        if max_n <= limit:
+            return complexity
+    return "O(log n) or O(1) per input"
+
+def local_digest(statement: str) -> ProblemDigest:
+    """Regex-only digest; cheap enough to run on the request path."""
+    constraints = []
+    sizes = []
+    counts = []
+    totals = []
+    for line in statement.splitlines():
+        line = line.strip()
+        if not line or len(line) > 160:
+            continue
+        total = SUM_BOUND.search(line)
+        if total is not None and parse_bound(total.group("bound")) is not None:
+            totals.append(parse_bound(total.group("bound")))
+            constraints.append(line)
+            continue
+        if not CONSTRAINT_LINE.search(line):
+            continue
+        bounds = list(BOUND.finditer(line))
+        if not bounds:
+            continue
+        constraints.append(line)
+        for match in bounds:
+            value = parse_bound(match.group("bound"))
+            if value is None:
+                continue
+            if SIZE_VARIABLE.search(match.group("var")):
+                sizes.append(value)
+            elif COUNT_VARIABLE.search(match.group("var")):
+                counts.append(value)
+
+    # Across all test cases the work is bounded by the total, not by one test's n.
+    candidates = totals or sizes or counts
+    max_n = max(candidates) if candidates else None
+    lowered = statement.lower()
+    tags = [tag for pattern, tag in TAG_KEYWORDS if re.search(pattern, lowered)]
+    return ProblemDigest(
+        constraints=constraints[:8],
+        max_n=max_n,
+        target_complexity=target_complexity_for(max_n),
+        tags=list(dict.fromkeys(tags))[:5]
+    )
+
+Refiner = Callable[[str, str, ProblemDigest], Awaitable[dict]]
+
+class ProblemDigestCache:
+    """
+    One digest per unique statement hash, shared by every agent and request.
+
+    The local digest is computed on first sight. If a refiner is attached, a single
+    background LLM call per statement fills in tags, a restatement and the target
+    complexity; later requests pick up the refined digest.
+    """
+    def __init__(self, max_entries: int, max_bytes: int, idle_ttl_seconds: float):
+        self._store = BoundedStore(max_entries, max_bytes, idle_ttl_seconds)
+        self.refine: Optional[Refiner] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.computed = 0
+        self.refined = 0
+        self.refine_errors = 0
+
+    def get(self, title: str, statement: str, digest: str = "") -> Optional[ProblemDigest]:
+        """Return the digest for a statement, computing (and scheduling refinement of) it on first use."""
+        if not statement:
+            return None
+        key = digest or statement_hash(statement)
+        cached = self._store.get(key)
+        if cached is not None:
+            return cached
+
+        result = local_digest(statement)
+        self._put(key, result)
+        self.computed += 1
+        self._schedule_refine(key, title, statement, result)
+        return result
+
+    def contains(self, digest: str) -> bool:
+        return self._store.get(digest) is not None
+
+    def _put(self, key: str, digest: ProblemDigest) -> None:
+        self._store.pop(key)
+        self._store.get_or_create(key, lambda: digest)
+        self._store.resize(key, digest.size_bytes())
+
+    def _schedule_refine(self, key: str, title: str, statement: str, base: ProblemDigest) -> None:
+        if self.refine is None or key in self._tasks:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # A fresh context: the refine call belongs to no request, so it must not count
+        # towards the triggering request's prompt budget report or served providers.
+        task = loop.create_task(self._refine(key, title, statement, base), context=contextvars.Context())
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+    async def _refine(self, key: str, title: str, statement: str, base: ProblemDigest) -> None:
+        try:
+            fields = await self.refine(title, statement, base)
+        except Exception:
+            self.refine_errors += 1
+            return
+        tags = fields.get("tags")
+        refined = replace(
+            base,
+            tags=[str(tag) for tag in tags][:6] if isinstance(tags, list) and tags else base.tags,
+            restatement=str(fields.get("restatement") or base.restatement),
+            target_complexity=str(fields.get("target_complexity") or base.target_complexity),
+            source="llm"
+        )
+        self._put(key, refined)
+        self.refined += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "digests": len(self._store),
+            "computed": self.computed,
+            "refined": self.refined,
+            "refine_errors": self.refine_errors,
+            "refining": len(self._tasks)
+        }
+
+def _create_cache() -> ProblemDigestCache:
+    settings = get_settings()
+    return ProblemDigestCache(
+        max_entries=settings.problem_registry_max_entries,
+        max_bytes=settings.problem_registry_max_bytes // 4,
+        idle_ttl_seconds=settings.problem_registry_ttl_seconds
+    )
+
+problem_digests = _create_cache()
@@ -0,0 +1,54 @@
+from typing import Optional
+from .bounded_store import BoundedStore
+from .answer_cache import statement_hash
+from .config import get_settings
+
+class ProblemRegistry:
+    """
+    Content-addressed store of problem statements.
+
+    Clients upload a statement once and then send its hash with each question. The hash
+    is the same whitespace-insensitive digest the answer cache keys on, so a resolved
+    request never needs to re-hash the statement.
+    """
+    def __init__(self, max_entries: int, max_bytes: int, idle_ttl_seconds: float):
+        self._store = BoundedStore(max_entries, max_bytes, idle_ttl_seconds)
+        self.registered = 0
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, statement: str) -> str:
+        problem_hash = statement_hash(statement)
+        if self._store.get(problem_hash) is None:
+            self._store.get_or_create(problem_hash, lambda: statement)
+            self._store.resize(problem_hash, len(statement.encode()))
+            self.registered += 1
+        return problem_hash
+
+    def get(self, problem_hash: str) -> Optional[str]:
+        statement = self._store.get(problem_hash)
+        if statement is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return statement
+
+    def snapshot(self) -> dict:
+        return {
+            "problems": len(self._store),
+            "bytes": self._store.bytes,
+            "registered": self.registered,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self._store.evictions_lru + self._store.evictions_ttl + self._store.evictions_bytes
+        }
+
+def _create_registry() -> ProblemRegistry:
+    settings = get_settings()
+    return ProblemRegistry(
+        max_entries=settings.problem_registry_max_entries,
+        max_bytes=settings.problem_registry_max_bytes,
+        idle_ttl_seconds=settings.problem_registry_ttl_seconds
+    )
+
+problem_registry = _create_registry()
@@ -0,0 +1,285 @@
+from typing import Dict, List, Optional, Set
+from contextvars import ContextVar
+from dataclasses import dataclass
+import re
+from .config import get_settings
+
+# Rough BPE approximation: every punctuation mark and every 4-character run of a word
+# counts as one token. Slightly pessimistic for prose, close for code.
+TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Per-intent token budgets for each prompt field. Fields that are not listed are left alone.
+BUDGETS: Dict[str, Dict[str, int]] = {
+    "explain": {"problem": 3500, "question": 500},
+    "debug": {"problem": 1500, "code": 5000, "question": 800},
+    "debug_followup": {"problem": 1000, "diff": 3000, "previous_findings": 1500, "question": 800},
+    "suggest": {"problem": 3000, "question": 500},
+    "solve": {"problem": 3500, "question": 500},
+    "hint": {"problem": 3000, "previous_hints": 2000, "question": 500},
+    "query": {"problem": 1500, "chat_history": 3000, "question": 800},
+    "classify": {"question": 500},
+    "summary": {"summary": 600, "messages": 3000},
+    "digest": {"problem": 3000}
+}
+
+# When the prompt already carries a problem digest, the raw statement gets this share of its budget.
+DIGEST_STATEMENT_SHARE = 0.5
+
+# How each field is normalized and cut when over budget.
+#   head_tail: keep the beginning and the end, drop the middle (statements, code)
+#   tail: keep the most recent text (history, hints)
+#   head: keep the beginning (questions)
+FIELD_STRATEGIES = {
+    "problem": "head_tail",
+    "code": "head_tail",
+    "diff": "head_tail",
+    "previous_findings": "head",
+    "chat_history": "tail",
+    "previous_hints": "tail",
+    "messages": "tail",
+    "summary": "tail",
+    "question": "head"
+}
+
+# Whole lines that scraped statements (innerText of the problem page) carry but that say
+# nothing about the problem itself.
+PAGE_CHROME_LINE = re.compile(
+    r"^\s*(?:"
+    r"companies|related topics|discussion.*|seen this question in a real interview before\??|"
+    r"acceptance rate|copyright.*|all rights reserved.*|difficulty rating.*|standard input|standard output"
+    r")\s*$",
+    re.IGNORECASE
+)
+# Short labels and counters from the same page chrome. On their own they can just as well be
+# sample input or output, so they are only dropped next to a PAGE_CHROME_LINE.
+CHROME_WORD_LINE = re.compile(
+    r"^\s*(?:"
+    r"topics|hint\s*\d*|accepted|submissions|solved|attempted|easy|medium|hard|premium|"
+    r"like|dislike|share|submit|run|expand|"
+    r"\d+(?:\.\d+)?[km]\+?|\d+(?:\.\d+)?%"
+    r")\s*$",
+    re.IGNORECASE
+)
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate, no tokenizer round trip."""
+    return len(TOKEN_PATTERN.findall(text)) if text else 0
+
+def _page_chrome(lines: List[str]) -> Set[int]:
+    """Indices of chrome lines: every PAGE_CHROME_LINE, plus CHROME_WORD_LINEs in a run with one."""
+    chrome: Set[int] = set()
+    run: List[int] = []
+    labelled = False
+    for index, line in enumerate(lines):
+        if not line:
+            continue
+        if PAGE_CHROME_LINE.match(line):
+            run.append(index)
+            labelled = True
+            continue
+        if CHROME_WORD_LINE.match(line):
+            run.append(index)
+            continue
+        if labelled:
+            chrome.update(run)
+        run, labelled = [], False
+    if labelled:
+        chrome.update(run)
+    return chrome
+
+def normalize_text(text: str) -> str:
+    """Collapse runs of spaces and blank lines, and drop page chrome from scraped statements."""
+    raw = [re.sub(r"[ \t ]+", " ", line).strip() for line in text.splitlines()]
+    chrome = _page_chrome(raw)
+    lines = []
+    blank = False
+    for index, line in enumerate(raw):
+        if not line:
+            blank = bool(lines)
+            continue
+        if index in chrome:
+            continue
+        if blank:
+            lines.append("")
+            blank = False
+        lines.append(line)
+    return "\n".join(lines)
+
+def normalize_code(code: str) -> str:
+    """Strip trailing whitespace and collapse blank runs; indentation is preserved (code, history, hints)."""
+    code = re.sub(r"[ \t]+$", "", code, flags=re.MULTILINE)
+    return re.sub(r"\n{3,}", "\n\n", code).strip("\n")
+
+# Marks where a line that did not fit on its own was cut.
+CUT_MARK = "[...]"
+
+def _cut_line(line: str, budget: int, from_end: bool = False) -> str:
+    """The longest start (or end) of a single line that fits in `budget` tokens."""
+    low, high = 0, len(line)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(line[-mid:] if from_end else line[:mid]) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    if not low:
+        return ""
+    return line[-low:] if from_end else line[:low]
+
+def _fit_head(text: str, budget: int) -> str:
+    lines = text.splitlines()
+    kept, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    if not kept:
+        # A first line over the whole budget is cut rather than dropped.
+        kept.append(f"{_cut_line(lines[0], budget - 2)} {CUT_MARK}")
+    omitted = len(lines) - len(kept)
+    return "\n".join(kept) + (f"\n[... {omitted} more lines omitted ...]" if omitted else "")
+
+def _fit_tail(text: str, budget: int) -> str:
+    lines = text.splitlines()
+    kept, used = [], 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    if not kept:
+        kept.append(f"{CUT_MARK} {_cut_line(lines[-1], budget - 2, from_end=True)}")
+    omitted = len(lines) - len(kept)
+    return (f"[... {omitted} earlier lines omitted ...]\n" if omitted else "") + "\n".join(reversed(kept))
+
+def _fit_head_tail(text: str, budget: int) -> str:
+    lines = text.splitlines()
+    head_budget = budget * 3 // 5
+    tail_budget = budget - head_budget
+    if len(lines) == 1:
+        line = lines[0]
+        return f"{_cut_line(line, head_budget - 1)} {CUT_MARK} {_cut_line(line, tail_budget - 1, from_end=True)}"
+    head, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > head_budget:
+            break
+        head.append(line)
+        used += cost
+    if not head:
+        head.append(f"{_cut_line(lines[0], head_budget - 2)} {CUT_MARK}")
+    tail, used = [], 0
+    for line in reversed(lines[len(head):]):
+        cost = estimate_tokens(line) + 1
+        if used + cost > tail_budget:
+            break
+        tail.append(line)
+        used += cost
+    if not tail and len(lines) > len(head):
+        tail.append(f"{CUT_MARK} {_cut_line(lines[-1], tail_budget - 2, from_end=True)}")
+    omitted = len(lines) - len(head) - len(tail)
+    return "\n".join(head) + f"\n[... {omitted} lines omitted ...]\n" + "\n".join(reversed(tail))
+
+def fit_text(text: str, budget: int, strategy: str) -> str:
+    """Cut text to roughly `budget` tokens at line boundaries using the field's strategy."""
+    if estimate_tokens(text) <= budget:
+        return text
+    if strategy == "tail":
+        return _fit_tail(text, budget)
+    if strategy == "head":
+        return _fit_head(text, budget)
+    return _fit_head_tail(text, budget)
+
+def fit_items(items: List[str], budget: int) -> List[str]:
+    """Keep the most recent items that fit in the budget (at least the newest one)."""
+    kept, used = [], 0
+    for item in reversed(items):
+        cost = estimate_tokens(item)
+        if kept and used + cost > budget:
+            break
+        kept.append(item)
+        used += cost
+    return list(reversed(kept))
+
+@dataclass
+class BudgetReport:
+    """Prompt tokens before and after budgeting, summed over every LLM call of one request."""
+    tokens_in: int = 0
+    tokens_out: int = 0
+    fields_truncated: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+_current_report: ContextVar[Optional[BudgetReport]] = ContextVar("prompt_budget_report", default=None)
+
+class PromptBudget:
+    """Normalizes and truncates prompt fields to per-intent token budgets."""
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.calls = 0
+        self.tokens_in = 0
+        self.tokens_saved = 0
+        self.fields_truncated = 0
+
+    def begin_request(self) -> BudgetReport:
+        """Start collecting savings for the current request (and tasks spawned from it)."""
+        report = BudgetReport()
+        _current_report.set(report)
+        return report
+
+    def budget_for(self, intent: str, field: str) -> Optional[int]:
+        return BUDGETS.get(intent, {}).get(field)
+
+    def fit(self, intent: str, inputs: dict, already_saved: int = 0) -> dict:
+        """
+        Return a copy of the prompt inputs with every budgeted field normalized and truncated.
+        `already_saved` is added for trimming the caller did itself (e.g. dropping old hints).
+        """
+        if not self.enabled:
+            return inputs
+
+        fitted = dict(inputs)
+        tokens_in = already_saved
+        tokens_out = 0
+        truncated = 0
+        for field, budget in BUDGETS.get(intent, {}).items():
+            value = inputs.get(field)
+            if not isinstance(value, str) or not value:
+                continue
+            if field == "problem" and inputs.get("digest"):
+                budget = int(budget * DIGEST_STATEMENT_SHARE)
+            before = estimate_tokens(value)
+            value = normalize_text(value) if field == "problem" else normalize_code(value)
+            cut = fit_text(value, budget, FIELD_STRATEGIES.get(field, "head_tail"))
+            if cut is not value:
+                truncated += 1
+            fitted[field] = cut
+            tokens_in += before
+            tokens_out += estimate_tokens(cut)
+
+        self.calls += 1
+        self.tokens_in += tokens_in
+        self.tokens_saved += tokens_in - tokens_out
+        self.fields_truncated += truncated
+        report = _current_report.get()
+        if report is not None:
+            report.tokens_in += tokens_in
+            report.tokens_out += tokens_out
+            report.fields_truncated += truncated
+        return fitted
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "tokens_in": self.tokens_in,
+            "tokens_saved": self.tokens_saved,
+            "fields_truncated": self.fields_truncated
+        }
+
+prompt_budget = PromptBudget(enabled=get_settings().prompt_budget)
@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, TypeVar
+from .llm_providers import collect_served, record_served
+from .stream_fanout import ReplayableStream
+
+T = TypeVar("T")
+
+def flight_key(namespace: str, inputs: Dict[str, Any]) -> str:
+    """Key identifying an upstream call by its caller and its exact prompt inputs."""
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(f"{namespace}:{payload}".encode()).hexdigest()
+
+class _Flight:
+    """One shared call, the providers that served it and the number of callers still waiting for it."""
+    def __init__(self, fn: Callable[[], Awaitable[Any]]):
+        self.served: List[str] = []
+        self.task = asyncio.ensure_future(self._run(fn))
+        self.waiters = 0
+
+    async def _run(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        collect_served(self.served)
+        return await fn()
+
+class _SharedStream(ReplayableStream):
+    """One shared token stream and the providers that served it."""
+    def __init__(self, factory: Callable[[], AsyncIterator[str]]):
+        self.served: List[str] = []
+        super().__init__(self._run(factory), cancel_when_abandoned=True)
+
+    async def _run(self, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        collect_served(self.served)
+        async for chunk in factory():
+            yield chunk
+
+class SingleFlight:
+    """
+    Collapses concurrent identical upstream calls into one.
+
+    While a call for a key is in flight, later callers with the same key await the
+    shared result (or subscribe to the shared token stream) instead of starting their own.
+    Either is cancelled once every caller has given up, and a call that is being cancelled
+    is never handed to a new caller. Every caller is credited with the providers that
+    served the shared call.
+    """
+    def __init__(self):
+        self._calls: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._calls.get(key)
+        if flight is None or flight.task.cancelling():
+            self.leaders += 1
+            flight = _Flight(fn)
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(self._calls, key, flight))
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            # Shield so one caller giving up does not cancel the call for the others.
+            result = await asyncio.shield(flight.task)
+            record_served(flight.served)
+            return result
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(self._calls, key, flight)
+
+    def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        run = self._streams.get(key)
+        if run is None or run.finished or run.cancelled:
+            self.leaders += 1
+            run = _SharedStream(factory)
+            self._streams[key] = run
+            run.add_done_callback(lambda finished: self._forget(self._streams, key, finished))
+        else:
+            self.coalesced += 1
+        return self._follow(run)
+
+    async def _follow(self, run: _SharedStream) -> AsyncIterator[str]:
+        chunks = run.subscribe()
+        try:
+            async for chunk in chunks:
+                record_served(run.served)
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    def _forget(self, registry: Dict[str, Any], key: str, value: Any) -> None:
+        if registry.get(key) is value:
+            del registry[key]
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight_calls": len(self._calls),
+            "in_flight_streams": len(self._streams),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced
+        }
+
+single_flight = SingleFlight()
@@ -0,0 +1,309 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import lru_cache
+import queue
+import sqlite3
+import threading
+import time
+from .history_backends import ChatBackend, HintBackend, RESERVATION_TIMEOUT_SECONDS
+from .history_records import ChatMessage, HintEntry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    problem_key TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    agent_used TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_problem ON chat_messages (problem_key, id);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_timestamp ON chat_messages (timestamp);
+
+CREATE TABLE IF NOT EXISTS hints (
+    problem_key TEXT NOT NULL,
+    hint_number INTEGER NOT NULL,
+    hint_text TEXT,
+    timestamp REAL NOT NULL,
+    PRIMARY KEY (problem_key, hint_number)
+);
+"""
+
+_STOP = object()
+
+# How stale the conversation counts reported by /stats and /metrics may get.
+STATS_REFRESH_SECONDS = 5.0
+
+class SQLiteDatabase:
+    """
+    WAL-mode SQLite database shared by every worker process on the host.
+
+    Reads use a per-thread connection. Chat writes are queued and committed in batches
+    by a background thread so they stay off the request path. Calls that can wait on a
+    lock held by another worker run on `executor`, one at a time and in submission order,
+    so the event loop never waits on the file lock.
+    """
+    def __init__(self, path: str, retention_seconds: float, flush_interval: float = 0.05, batch_size: int = 256):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.commit_lock = threading.Lock()
+        self._local = threading.local()
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._last_purge = 0.0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-history")
+        # COUNT query -> (last result, monotonic time of that result, refresh in flight).
+        self._counts: Dict[str, Tuple[int, float, bool]] = {}
+
+        self.connection().executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-history-writer", daemon=True)
+        self._writer.start()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, op: Callable[[sqlite3.Connection], None], on_commit: Optional[Callable[[], None]] = None) -> None:
+        """Queue a write to be committed by the background writer."""
+        self._queue.put((op, on_commit))
+
+    def cached_count(self, sql: str) -> int:
+        """
+        Last known result of a COUNT query, refreshed on the executor once it is older than
+        STATS_REFRESH_SECONDS. Stats and metric scrapes call this from the event loop.
+        """
+        value, refreshed, running = self._counts.get(sql, (0, 0.0, False))
+        if not running and not self._closed and time.monotonic() - refreshed >= STATS_REFRESH_SECONDS:
+            self._counts[sql] = (value, refreshed, True)
+            self.executor.submit(self._refresh_count, sql, value)
+        return value
+
+    def _refresh_count(self, sql: str, previous: int) -> None:
+        try:
+            value = self.connection().execute(sql).fetchone()[0]
+        except sqlite3.Error:
+            value = previous
+        self._counts[sql] = (value, time.monotonic(), False)
+
+    @property
+    def pending_writes(self) -> int:
+        return self._queue.qsize()
+
+    def _next_batch(self) -> Optional[list]:
+        item = self._queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _write_loop(self) -> None:
+        conn = self.connection()
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            with self.commit_lock:
+                try:
+                    conn.execute("BEGIN")
+                    for op, _ in batch:
+                        op(conn)
+                    conn.execute("COMMIT")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                for _, on_commit in batch:
+                    if on_commit is not None:
+                        on_commit()
+            self._maybe_purge(conn)
+
+    def _maybe_purge(self, conn: sqlite3.Connection) -> None:
+        """Drop conversations idle for longer than the retention window, at most once a minute."""
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        cutoff = now - self.retention_seconds
+        try:
+            conn.execute("DELETE FROM chat_messages WHERE timestamp < ?", (cutoff,))
+            conn.execute("DELETE FROM hints WHERE timestamp < ?", (cutoff,))
+        except sqlite3.Error:
+            pass
+
+    def close(self) -> None:
+        """Flush queued writes and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self.executor.shutdown(wait=True)
+        self._queue.put(_STOP)
+        self._writer.join(timeout=10)
+
+@lru_cache()
+def get_database(path: str, retention_seconds: float) -> SQLiteDatabase:
+    return SQLiteDatabase(path, retention_seconds)
+
+class SQLiteChatBackend(ChatBackend):
+    """Chat history in SQLite; appends are batched and merged into reads until committed."""
+    def __init__(self, db: SQLiteDatabase, max_messages: int):
+        self.db = db
+        self.max_messages = max_messages
+        self._pending: Dict[str, List[ChatMessage]] = {}
+        # Guards _pending only and is never held across I/O, so the event loop can take it.
+        self._pending_lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        return self.db.executor
+
+    def get_messages(self, key: str) -> List[ChatMessage]:
+        with self.db.commit_lock:
+            rows = self.db.connection().execute(
+                "SELECT role, content, agent_used, timestamp FROM chat_messages "
+                "WHERE problem_key = ? ORDER BY id DESC LIMIT ?",
+                (key, self.max_messages)
+            ).fetchall()
+            messages = [ChatMessage(*row) for row in reversed(rows)]
+            with self._pending_lock:
+                messages.extend(self._pending.get(key, []))
+        return messages[-self.max_messages:]
+
+    def append_message(self, key: str, message: ChatMessage) -> None:
+        # No commit_lock here: this runs on the event loop. A reader holding the lock sees
+        # the message either in _pending or, once the writer has removed it, in the table.
+        with self._pending_lock:
+            self._pending.setdefault(key, []).append(message)
+        max_messages = self.max_messages
+
+        def insert(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT INTO chat_messages (problem_key, role, content, agent_used, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (key, message.role, message.content, message.agent_used, message.timestamp)
+            )
+            conn.execute(
+                "DELETE FROM chat_messages WHERE problem_key = ? AND id <= ("
+                "SELECT id FROM chat_messages WHERE problem_key = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (key, key, max_messages)
+            )
+
+        def committed() -> None:
+            with self._pending_lock:
+                pending = self._pending.get(key)
+                if pending and message in pending:
+                    pending.remove(message)
+                    if not pending:
+                        del self._pending[key]
+
+        self.db.submit(insert, committed)
+
+    def version(self, key: str) -> tuple:
+        # Other workers' appends raise the max id; their clears and trims lower the count.
+        return tuple(self.db.connection().execute(
+            "SELECT MAX(id), COUNT(*) FROM chat_messages WHERE problem_key = ?", (key,)
+        ).fetchone())
+
+    def clear(self, key: str) -> None:
+        # Queued behind earlier appends, so messages still pending are deleted as well.
+        with self._pending_lock:
+            self._pending.pop(key, None)
+        self.db.submit(lambda conn: conn.execute("DELETE FROM chat_messages WHERE problem_key = ?", (key,)))
+
+    def snapshot(self) -> dict:
+        conversations = self.db.cached_count("SELECT COUNT(DISTINCT problem_key) FROM chat_messages")
+        return {
+            "backend": "sqlite",
+            "conversations": conversations,
+            "pending_writes": self.db.pending_writes
+        }
+
+    def close(self) -> None:
+        self.db.close()
+
+class SQLiteHintBackend(HintBackend):
+    """Hint history in SQLite. Writes are synchronous so allocation is atomic across workers."""
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    @property
+    def executor(self) -> Executor:
+        return self.db.executor
+
+    def get_hints(self, key: str) -> List[HintEntry]:
+        rows = self.db.connection().execute(
+            "SELECT hint_number, hint_text, timestamp FROM hints "
+            "WHERE problem_key = ? AND hint_text IS NOT NULL ORDER BY hint_number",
+            (key,)
+        ).fetchall()
+        return [HintEntry(*row) for row in rows]
+
+    def add_hint(self, key: str, entry: HintEntry) -> bool:
+        cursor = self.db.connection().execute(
+            "INSERT OR IGNORE INTO hints (problem_key, hint_number, hint_text, timestamp) VALUES (?, ?, ?, ?)",
+            (key, entry.hint_number, entry.hint_text, entry.timestamp)
+        )
+        return cursor.rowcount == 1
+
+    def reserve_hint_number(self, key: str) -> int:
+        conn = self.db.connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM hints WHERE problem_key = ? AND hint_text IS NULL AND timestamp < ?",
+                (key, now - RESERVATION_TIMEOUT_SECONDS)
+            )
+            number = conn.execute(
+                "SELECT COALESCE(MAX(hint_number), 0) + 1 FROM hints WHERE problem_key = ?",
+                (key,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO hints (problem_key, hint_number, hint_text, timestamp) VALUES (?, ?, NULL, ?)",
+                (key, number, now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return number
+
+    def commit_hint(self, key: str, entry: HintEntry) -> None:
+        cursor = self.db.connection().execute(
+            "UPDATE hints SET hint_text = ?, timestamp = ? WHERE problem_key = ? AND hint_number = ?",
+            (entry.hint_text, entry.timestamp, key, entry.hint_number)
+        )
+        if cursor.rowcount == 0:
+            self.add_hint(key, entry)
+
+    def release_hint(self, key: str, hint_number: int) -> None:
+        self.db.connection().execute(
+            "DELETE FROM hints WHERE problem_key = ? AND hint_number = ? AND hint_text IS NULL",
+            (key, hint_number)
+        )
+
+    def clear(self, key: str) -> None:
+        self.db.connection().execute("DELETE FROM hints WHERE problem_key = ?", (key,))
+
+    def snapshot(self) -> dict:
+        conversations = self.db.cached_count("SELECT COUNT(DISTINCT problem_key) FROM hints")
+        return {"backend": "sqlite", "conversations": conversations}
+
+    def close(self) -> None:
+        self.db.close()
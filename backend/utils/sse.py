@@ -0,0 +1,118 @@
+from typing import Any, AsyncIterator, Optional, Tuple
+import asyncio
+import json
+import time
+import zlib
+
+Event = Tuple[str, Any]
+
+def format_event(data: dict) -> str:
+    """One SSE frame with compact JSON (no spaces after separators)."""
+    return f"data: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+async def coalesce_tokens(events: AsyncIterator[Event], window_seconds: float, max_bytes: int) -> AsyncIterator[Event]:
+    """
+    Merge consecutive ("token", text) events so a stream of single words becomes a few
+    frames per second. The first token is passed through at once; after that, buffered
+    text is flushed once it is `window_seconds` old or `max_bytes` long, and before any
+    other event. With a zero window every token is forwarded as is.
+
+    `events` is read by a single pump task, so it is always stepped from the same task,
+    and it is closed when the consumer stops early (e.g. the client disconnected).
+    """
+    if window_seconds <= 0:
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await _aclose(events)
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    end = object()
+
+    async def pump() -> None:
+        try:
+            async for event in events:
+                queue.put_nowait((event, None))
+        except Exception as e:
+            queue.put_nowait((end, e))
+            return
+        queue.put_nowait((end, None))
+
+    pump_task = asyncio.create_task(pump())
+    buffer = []
+    size = 0
+    deadline = 0.0
+    first = True
+    try:
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if buffer else None
+            try:
+                item, error = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield "token", "".join(buffer)
+                buffer, size = [], 0
+                continue
+
+            if item is end:
+                if buffer:
+                    yield "token", "".join(buffer)
+                if error is not None:
+                    raise error
+                return
+
+            kind, payload = item
+            if kind != "token":
+                if buffer:
+                    yield "token", "".join(buffer)
+                    buffer, size = [], 0
+                yield kind, payload
+                continue
+            if first:
+                first = False
+                yield kind, payload
+                continue
+            if not buffer:
+                deadline = time.monotonic() + window_seconds
+            buffer.append(payload)
+            size += len(payload)
+            if size >= max_bytes:
+                yield "token", "".join(buffer)
+                buffer, size = [], 0
+    finally:
+        pump_task.cancel()
+        await asyncio.gather(pump_task, return_exceptions=True)
+        await _aclose(events)
+
+async def _aclose(events: AsyncIterator[Event]) -> None:
+    aclose = getattr(events, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+class GzipStream:
+    """Incremental gzip for a streamed body; every frame is sync-flushed so it is not held back."""
+    def __init__(self, level: int = 6):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, frame: str) -> bytes:
+        return self._compressor.compress(frame.encode()) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether Accept-Encoding lists gzip with a non-zero quality ("q=0", "q=0.0" refuse it)."""
+    for part in (accept_encoding or "").lower().split(","):
+        coding, *params = part.split(";")
+        if coding.strip() != "gzip":
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
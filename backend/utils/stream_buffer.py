@@ -0,0 +1,102 @@
+from typing import AsyncIterator, Optional, Tuple
+import asyncio
+import uuid
+from .bounded_store import BoundedStore
+from .stream_fanout import ReplayableStream
+from .config import get_settings
+
+class BufferedStream:
+    """The SSE frames of one answer, kept so a dropped connection can resume where it stopped."""
+    def __init__(self, stream_id: str, source: AsyncIterator[str]):
+        self.stream_id = stream_id
+        self.frames = ReplayableStream(source)
+        self.abandon_timer: Optional[asyncio.TimerHandle] = None
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.stream_id}:{seq}"
+
+    def size_bytes(self) -> int:
+        return sum(len(frame) for frame in self.frames.chunks) + 128
+
+def parse_last_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Split a Last-Event-ID of the form '<stream_id>:<seq>'; None if it is not one of ours."""
+    if not value:
+        return None
+    stream_id, _, seq = value.strip().rpartition(":")
+    if not stream_id or not seq.isdigit():
+        return None
+    return stream_id, int(seq)
+
+class StreamBuffer:
+    """
+    Recent answer streams by ID, bounded by count, bytes and idle TTL.
+
+    Generation runs in the background independent of any one connection. Every frame
+    gets a sequence number, so a reconnect with Last-Event-ID replays only what the client
+    missed and then follows the live generation. A stream nobody is reading is cancelled
+    after a short grace period, leaving time for the client to reconnect.
+    """
+    def __init__(self, max_streams: int, max_bytes: int, ttl_seconds: float, grace_seconds: float):
+        self._store = BoundedStore(max_streams, max_bytes, ttl_seconds)
+        self.grace_seconds = grace_seconds
+        self.started = 0
+        self.resumed = 0
+        self.abandoned = 0
+
+    def start(self, source: AsyncIterator[str]) -> BufferedStream:
+        stream_id = uuid.uuid4().hex
+        stream = self._store.get_or_create(stream_id, lambda: BufferedStream(stream_id, source))
+        stream.frames.add_done_callback(lambda _: self._store.resize(stream_id, stream.size_bytes()))
+        self.started += 1
+        return stream
+
+    def get(self, stream_id: str) -> Optional[BufferedStream]:
+        return self._store.get(stream_id)
+
+    async def follow(self, stream: BufferedStream, start: int = 0) -> AsyncIterator[str]:
+        """Yield the stream's frames from sequence number `start` on, each tagged with its event ID."""
+        if start > 0:
+            self.resumed += 1
+        if stream.abandon_timer is not None:
+            stream.abandon_timer.cancel()
+            stream.abandon_timer = None
+
+        frames = stream.frames.subscribe(start)
+        seq = start
+        try:
+            async for frame in frames:
+                yield f"id: {stream.event_id(seq)}\n{frame}"
+                seq += 1
+        finally:
+            await frames.aclose()
+            if stream.frames.subscribers == 0 and not stream.frames.finished:
+                stream.abandon_timer = asyncio.get_running_loop().call_later(
+                    self.grace_seconds, self._abandon, stream
+                )
+
+    def _abandon(self, stream: BufferedStream) -> None:
+        stream.abandon_timer = None
+        if stream.frames.subscribers == 0 and not stream.frames.finished:
+            stream.frames.cancel()
+            self._store.pop(stream.stream_id)
+            self.abandoned += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "streams": len(self._store),
+            "bytes": self._store.bytes,
+            "started": self.started,
+            "resumed": self.resumed,
+            "abandoned": self.abandoned
+        }
+
+def _create_buffer() -> StreamBuffer:
+    settings = get_settings()
+    return StreamBuffer(
+        max_streams=settings.stream_buffer_max_streams,
+        max_bytes=settings.stream_buffer_max_bytes,
+        ttl_seconds=settings.stream_buffer_ttl_seconds,
+        grace_seconds=settings.stream_resume_grace_seconds
+    )
+
+stream_buffer = _create_buffer()
@@ -0,0 +1,80 @@
+import asyncio
+from typing import AsyncIterator, Callable, List, Optional
+
+class ReplayableStream:
+    """
+    Runs an async chunk source in a background task and buffers every chunk,
+    so any number of readers can replay it from any offset while it is still running.
+
+    With cancel_when_abandoned, the source is cancelled once every reader has left
+    before the stream finished.
+    """
+    def __init__(self, source: AsyncIterator[str], cancel_when_abandoned: bool = False):
+        self.chunks: List[str] = []
+        self.error: Optional[BaseException] = None
+        self.finished = False
+        self.cancel_when_abandoned = cancel_when_abandoned
+        self.subscribers = 0
+        self._signal = asyncio.Event()
+        self._task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in source:
+                if chunk:
+                    self.chunks.append(chunk)
+                    self._notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+            self._notify()
+
+    def _notify(self) -> None:
+        signal, self._signal = self._signal, asyncio.Event()
+        signal.set()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def add_done_callback(self, callback: Callable[["ReplayableStream"], None]) -> None:
+        self._task.add_done_callback(lambda _: callback(self))
+
+    @property
+    def cancelled(self) -> bool:
+        """Cancellation was requested; the source may still be winding down."""
+        return self._task.cancelled() or self._task.cancelling() > 0
+
+    def cancel(self) -> None:
+        """Cancel the upstream source if it is still running."""
+        if not self._task.done():
+            self._task.cancel()
+
+    async def subscribe(self, start: int = 0) -> AsyncIterator[str]:
+        """Yield buffered chunks from `start`, then follow live chunks until the source ends."""
+        index = start
+        self.subscribers += 1
+        try:
+            while True:
+                while index < len(self.chunks):
+                    yield self.chunks[index]
+                    index += 1
+                if self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._signal.wait()
+        finally:
+            self.subscribers -= 1
+            if self.cancel_when_abandoned and self.subscribers == 0 and not self.finished:
+                self.cancel()
+
+    async def result(self) -> str:
+        """Wait for the source to finish and return the full text."""
+        async for _ in self.subscribe(len(self.chunks)):
+            pass
+        return self.text
@@ -0,0 +1,245 @@
+from typing import Any, Dict, List, Optional
+import json
+import os
+import queue
+import re
+import threading
+import time
+from .answer_cache import statement_hash
+from .config import get_settings
+
+# Request fields worth replaying; anything else a client sends is dropped.
+CAPTURED_FIELDS = (
+    "site", "problem_title", "problem_statement", "problem_hash", "user_code",
+    "language", "question", "bypass_cache", "stream_mode"
+)
+# Statements are hashed by the problem registry, so they are kept byte for byte; code is
+# redacted but, like statements, never shortened.
+VERBATIM_FIELDS = ("problem_statement",)
+UNCAPPED_FIELDS = ("problem_statement", "user_code")
+CAPTURED_PATHS = {"/ask": "ask", "/ask/stream": "stream", "/problems": "problems"}
+
+EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+# Long opaque tokens (API keys, session cookies) pasted into questions or code.
+SECRET = re.compile(r"\b(?:AIza[\w-]{30,}|sk-[\w-]{20,}|gh[pousr]_\w{30,}|eyJ[\w-]{20,}\.[\w-]+\.[\w-]+)")
+
+_STOP = object()
+
+def sanitize_request(payload: Any, max_field_chars: int) -> Optional[Dict[str, Any]]:
+    """
+    Keep only replayable QueryRequest fields, redact emails and secrets, and cap the length
+    of free-text fields. Statements are kept verbatim and code is never shortened.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("question"), str):
+        return None
+    clean: Dict[str, Any] = {}
+    for name in CAPTURED_FIELDS:
+        value = payload.get(name)
+        if value is None:
+            continue
+        if isinstance(value, str):
+            if name not in VERBATIM_FIELDS:
+                value = SECRET.sub("[redacted]", EMAIL.sub("[email]", value))
+            if name not in UNCAPPED_FIELDS:
+                value = value[:max_field_chars]
+        elif not isinstance(value, (bool, int, float)):
+            continue
+        clean[name] = value
+    return clean
+
+class CaptureWriter:
+    """
+    Appends JSON lines from a background thread in batches, rotating the file once it
+    exceeds max_bytes (path -> path.1 -> ... -> path.<backups>).
+    """
+    def __init__(self, path: str, max_bytes: int, backups: int, flush_interval: float = 0.5, batch_size: int = 512):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.written = 0
+        self.rotations = 0
+        self.errors = 0
+        self._queue: queue.Queue = queue.Queue()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._write_loop, name="traffic-capture-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict[str, Any]) -> None:
+        self._queue.put(record)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        item = self._queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in batch).encode()
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, "ab") as f:
+                    f.write(data)
+                self.written += len(batch)
+            except OSError:
+                self.errors += 1
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+
+    def close(self) -> None:
+        """Write everything still queued and stop the writer thread."""
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+
+    def snapshot(self) -> dict:
+        return {
+            "path": self.path,
+            "written": self.written,
+            "pending": self.pending,
+            "rotations": self.rotations,
+            "errors": self.errors
+        }
+
+class TrafficCaptureMiddleware:
+    """
+    ASGI middleware that records every /ask and /ask/stream request as one JSON line:
+    arrival time, the sanitized payload, status, time to first byte, total duration and
+    the intent, agent and LLM providers that answered. Handlers report those through the
+    mutable `scope["capture"]` dict; a stream resumed with Last-Event-ID sets "resumed"
+    and is not recorded again.
+
+    /problems uploads are recorded too, so a capture can be replayed against a backend
+    that has never seen its problems. A question that sent only a problem hash whose
+    statement is not in the current file yet gets a "resolved" problems record (from
+    `scope["capture"]["problem_statement"]`) written ahead of it.
+    """
+    def __init__(self, app, writer: CaptureWriter, max_field_chars: int):
+        self.app = app
+        self.writer = writer
+        self.max_field_chars = max_field_chars
+        self._statements_written: set = set()
+        self._rotations = writer.rotations
+
+    async def __call__(self, scope, receive, send):
+        endpoint = CAPTURED_PATHS.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if endpoint is None or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.time()
+        started = time.perf_counter()
+        body = bytearray()
+        status = 0
+        first_byte: Optional[float] = None
+        capture: Dict[str, Any] = {"intent": "", "agent": "", "providers": []}
+        scope["capture"] = capture
+
+        async def capture_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                body.extend(message.get("body", b""))
+            return message
+
+        async def capture_send(message):
+            nonlocal status, first_byte
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and first_byte is None and message.get("body"):
+                first_byte = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            if not capture.get("resumed"):
+                self._record(endpoint, arrived, started, bytes(body), status, first_byte, capture)
+
+    def _record_statement(self, arrived: float, statement: str, resolved: bool) -> None:
+        if self.writer.rotations != self._rotations or len(self._statements_written) > 100000:
+            # Every capture file carries the statements its questions need.
+            self._rotations = self.writer.rotations
+            self._statements_written.clear()
+        problem_hash = statement_hash(statement)
+        if resolved and problem_hash in self._statements_written:
+            return
+        self._statements_written.add(problem_hash)
+        record = {"ts": round(arrived, 3), "endpoint": "problems", "request": {"problem_statement": statement}}
+        if resolved:
+            record["resolved"] = True
+        self.writer.submit(record)
+
+    def _record(self, endpoint: str, arrived: float, started: float, body: bytes, status: int,
+                first_byte: Optional[float], capture: Dict[str, Any]) -> None:
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError:
+            return
+        if endpoint == "problems":
+            statement = payload.get("problem_statement") if isinstance(payload, dict) else None
+            if status == 200 and isinstance(statement, str):
+                self._record_statement(arrived, statement, resolved=False)
+            return
+
+        request = sanitize_request(payload, self.max_field_chars)
+        if request is None:
+            return
+        if isinstance(capture.get("problem_statement"), str):
+            self._record_statement(arrived, capture["problem_statement"], resolved=True)
+        self.writer.submit({
+            "ts": round(arrived, 3),
+            "endpoint": endpoint,
+            "status": status,
+            "ttfb_ms": round(first_byte * 1000, 1) if first_byte is not None else None,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "intent": capture.get("intent", ""),
+            "agent": capture.get("agent", ""),
+            "providers": capture.get("providers", []),
+            "request": request
+        })
+
+def _create_writer() -> Optional[CaptureWriter]:
+    settings = get_settings()
+    if not settings.capture_enabled:
+        return None
+    return CaptureWriter(
+        path=settings.capture_path,
+        max_bytes=settings.capture_max_bytes,
+        backups=settings.capture_backups
+    )
+
+capture_writer = _create_writer()
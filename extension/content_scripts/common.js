@@ -0,0 +1,532 @@
+// Shared by every site script: the chat modal, the streaming client and problem prefetch.
+// Each site script only extracts the page context and calls startAssistant.
+
+const API_URL = 'https://codingassistant-q24x.onrender.com';
+
+// Set by startAssistant: returns { site, problem_title, problem_statement, user_code, language } for the page.
+let extractContext = null;
+
+// Statements are uploaded once per page; questions then carry only the content hash.
+const problemHashes = new Map();
+
+async function registerProblem(statement) {
+  const response = await fetch(`${API_URL}/problems`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ problem_statement: statement })
+  });
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  const data = await response.json();
+  problemHashes.set(statement, data.problem_hash);
+  return data.problem_hash;
+}
+
+async function askStream(context, question) {
+  const { problem_statement, ...rest } = context;
+  if (!problem_statement) {
+    return fetch(`${API_URL}/ask/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ...context, question: question, stream_mode: 'blocks' })
+    });
+  }
+
+  const send = (problemHash) => fetch(`${API_URL}/ask/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ...rest, problem_hash: problemHash, question: question, stream_mode: 'blocks' })
+  });
+
+  const problemHash = problemHashes.get(problem_statement) || await registerProblem(problem_statement);
+  const response = await send(problemHash);
+  if (response.status !== 404) {
+    return response;
+  }
+  const error = await response.json().catch(() => ({}));
+  if (!error.detail || error.detail.error !== 'problem_not_found') {
+    return response;
+  }
+  // The server evicted the statement; upload it again and retry once.
+  return send(await registerProblem(problem_statement));
+}
+
+// Reads one SSE response, passing each parsed event to onData. Returns the ID of the
+// last event received and whether the final (done) event arrived before the connection ended.
+async function readEvents(response, onData) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let lastEventId = null;
+  let finished = false;
+
+  const handleLine = (line) => {
+    if (line.startsWith('id: ')) {
+      lastEventId = line.slice(4);
+    } else if (line.startsWith('data: ')) {
+      try {
+        const data = JSON.parse(line.slice(6));
+        if (data.done) finished = true;
+        onData(data);
+      } catch (e) {
+        console.error('Error parsing SSE data:', e);
+      }
+    }
+  };
+
+  try {
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop() || '';
+      lines.forEach(handleLine);
+    }
+    if (buffer) handleLine(buffer);
+  } catch (error) {
+    console.error('Stream interrupted:', error);
+  }
+  return { lastEventId, finished };
+}
+
+const MAX_RESUME_ATTEMPTS = 3;
+
+// Streams an answer. If the connection drops, it reconnects with Last-Event-ID and the
+// server replays only the missed events, so the question is never generated twice.
+async function streamAnswer(context, question, onData) {
+  let response = await askStream(context, question);
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  let streamId = response.headers.get('X-Stream-Id');
+  let lastEventId = null;
+
+  for (let attempt = 1; ; attempt++) {
+    const result = await readEvents(response, onData);
+    if (result.finished) return;
+    if (result.lastEventId) {
+      lastEventId = result.lastEventId;
+      streamId = lastEventId.slice(0, lastEventId.lastIndexOf(':'));
+    }
+    if (!streamId || attempt > MAX_RESUME_ATTEMPTS) {
+      throw new Error('Connection lost');
+    }
+
+    await new Promise((resolve) => setTimeout(resolve, 500 * attempt));
+    response = await fetch(`${API_URL}/ask/stream/${streamId}`, {
+      headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {}
+    });
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+  }
+}
+
+// Warm the backend caches for this problem as soon as the page is open, so the first
+// question does not pay the cold latency. The work is dropped again when the page closes.
+async function prefetchProblem() {
+  const context = extractContext();
+  if (!context.problem_statement) return;
+  try {
+    const response = await fetch(`${API_URL}/prefetch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        site: context.site,
+        problem_title: context.problem_title,
+        problem_statement: context.problem_statement
+      })
+    });
+    if (!response.ok) return;
+    const data = await response.json();
+    problemHashes.set(context.problem_statement, data.problem_hash);
+    window.addEventListener('pagehide', () => {
+      fetch(`${API_URL}/prefetch/cancel`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ problem_hash: data.problem_hash }),
+        keepalive: true
+      });
+    }, { once: true });
+  } catch (error) {
+    console.error('Prefetch failed:', error);
+  }
+}
+
+async function createChatModal() {
+  
+  if (document.getElementById('cp-assistant-modal')) {
+    document.getElementById('cp-assistant-modal').style.display = 'flex';
+    return;
+  }
+
+  const modal = document.createElement('div');
+  modal.id = 'cp-assistant-modal';
+  modal.innerHTML = `
+    <div class="cp-modal-overlay">
+      <div class="cp-modal-content">
+        <div class="cp-modal-header">
+          <span>💬 CP Assistant</span>
+          <button class="cp-close-btn">&times;</button>
+        </div>
+        <div class="cp-modal-messages" id="cp-messages"></div>
+        <div class="cp-modal-input">
+          <input type="text" id="cp-input" placeholder="Ask me anything..." />
+          <button id="cp-send-btn">Send</button>
+        </div>
+      </div>
+    </div>
+  `;
+
+  const styles = document.createElement('style');
+  styles.textContent = `
+    #cp-assistant-modal {
+      position: fixed;
+      top: 0;
+      left: 0;
+      width: 100%;
+      height: 100%;
+      z-index: 999999;
+      display: flex;
+      align-items: center;
+      justify-content: center;
+    }
+    .cp-modal-overlay {
+      position: absolute;
+      top: 0;
+      left: 0;
+      width: 100%;
+      height: 100%;
+      background: rgba(0, 0, 0, 0.5);
+      display: flex;
+      align-items: center;
+      justify-content: center;
+    }
+    .cp-modal-content {
+      background: white;
+      width: 500px;
+      height: 600px;
+      border-radius: 12px;
+      display: flex;
+      flex-direction: column;
+      box-shadow: 0 10px 40px rgba(0, 0, 0, 0.3);
+    }
+    .cp-modal-header {
+      background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+      color: white;
+      padding: 16px;
+      border-radius: 12px 12px 0 0;
+      display: flex;
+      justify-content: space-between;
+      align-items: center;
+      font-weight: 600;
+    }
+    .cp-close-btn {
+      background: none;
+      border: none;
+      color: white;
+      font-size: 28px;
+      cursor: pointer;
+      line-height: 1;
+      padding: 0;
+      width: 30px;
+      height: 30px;
+    }
+    .cp-modal-messages {
+      flex: 1;
+      overflow-y: auto;
+      padding: 16px;
+      background: #f7fafc;
+    }
+    .cp-message {
+      margin-bottom: 12px;
+      padding: 12px;
+      border-radius: 8px;
+      max-width: 85%;
+    }
+    .cp-message.user {
+      background: #667eea;
+      color: white;
+      margin-left: auto;
+    }
+    .cp-message.assistant {
+      background: white;
+      color: #2d3748;
+      border: 1px solid #e2e8f0;
+    }
+    .cp-message.loading {
+      background: white;
+      color: #718096;
+      font-style: italic;
+      border: 1px solid #e2e8f0;
+    }
+    .cp-modal-input {
+      padding: 16px;
+      background: white;
+      border-top: 1px solid #e2e8f0;
+      display: flex;
+      gap: 8px;
+      border-radius: 0 0 12px 12px;
+    }
+    .cp-modal-input input {
+      flex: 1;
+      padding: 10px 12px;
+      border: 1px solid #cbd5e0;
+      border-radius: 6px;
+      font-size: 14px;
+      font-family: inherit;
+    }
+    .cp-modal-input input:focus {
+      outline: none;
+      border-color: #667eea;
+    }
+    .cp-modal-input button {
+      padding: 10px 20px;
+      background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+      color: white;
+      border: none;
+      border-radius: 6px;
+      cursor: pointer;
+      font-weight: 600;
+    }
+    .cp-agent-badge {
+      font-size: 11px;
+      background: #edf2f7;
+      color: #4a5568;
+      padding: 2px 8px;
+      border-radius: 4px;
+      margin-top: 8px;
+      display: inline-block;
+    }
+    .message-content h1, .message-content h2, .message-content h3 {
+      margin-top: 16px;
+      margin-bottom: 8px;
+      color: #2d3748;
+      font-weight: 600;
+    }
+    .message-content h1 { font-size: 1.4em; }
+    .message-content h2 { font-size: 1.2em; }
+    .message-content h3 { font-size: 1.1em; }
+    .message-content p {
+      margin: 8px 0;
+      line-height: 1.6;
+    }
+    .message-content ul, .message-content ol {
+      margin: 8px 0;
+      padding-left: 24px;
+    }
+    .message-content li {
+      margin: 4px 0;
+      line-height: 1.5;
+    }
+    .message-content code {
+      background: #f7fafc;
+      padding: 2px 6px;
+      border-radius: 3px;
+      font-family: 'Courier New', monospace;
+      font-size: 0.9em;
+      color: #c7254e;
+    }
+    .message-content pre {
+      background: #f7fafc;
+      padding: 12px;
+      border-radius: 6px;
+      overflow-x: auto;
+      margin: 8px 0;
+    }
+    .message-content pre code {
+      background: none;
+      padding: 0;
+      color: #2d3748;
+    }
+    .message-content strong {
+      font-weight: 600;
+      color: #2d3748;
+    }
+    .message-content em {
+      font-style: italic;
+    }
+    .message-content blockquote {
+      border-left: 3px solid #667eea;
+      padding-left: 12px;
+      margin: 8px 0;
+      color: #4a5568;
+      font-style: italic;
+    }
+  `;
+
+  document.head.appendChild(styles);
+  document.body.appendChild(modal);
+
+  const context = extractContext();
+
+  const messagesDiv = document.getElementById('cp-messages');
+  const welcomeMsg = document.createElement('div');
+  welcomeMsg.className = 'cp-message assistant';
+  const welcomeContent = document.createElement('div');
+  welcomeContent.className = 'message-content';
+  const welcomeHtml = marked.parse(`👋 **Welcome to CP Assistant!**
+
+I'm here to help you with:
+- 📖 **Explaining** problems in simple terms
+- 🐛 **Debugging** your code
+- 💡 **Hints** when you're stuck
+- 💻 **Solutions** with detailed explanations
+- 🔍 **Similar problems** for practice
+
+Just ask me anything about the problem!`);
+  welcomeContent.innerHTML = DOMPurify.sanitize(welcomeHtml);
+  welcomeMsg.appendChild(welcomeContent);
+  messagesDiv.appendChild(welcomeMsg);
+
+  document.querySelector('.cp-close-btn').addEventListener('click', () => {
+    modal.style.display = 'none';
+  });
+
+  document.querySelector('.cp-modal-overlay').addEventListener('click', (e) => {
+    if (e.target.classList.contains('cp-modal-overlay')) {
+      modal.style.display = 'none';
+    }
+  });
+
+  const sendMessage = async () => {
+    const input = document.getElementById('cp-input');
+    const question = input.value.trim();
+    if (!question) return;
+
+    const messagesDiv = document.getElementById('cp-messages');
+    
+    const userMsg = document.createElement('div');
+    userMsg.className = 'cp-message user';
+    userMsg.textContent = question;
+    messagesDiv.appendChild(userMsg);
+
+    const assistantMsg = document.createElement('div');
+    assistantMsg.className = 'cp-message assistant';
+    const contentWrapper = document.createElement('div');
+    contentWrapper.className = 'message-content';
+    assistantMsg.appendChild(contentWrapper);
+    messagesDiv.appendChild(assistantMsg);
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+
+    input.value = '';
+
+    try {
+      let agentUsed = '';
+      let tail = '';
+      let renderQueued = false;
+      const tailDiv = document.createElement('div');
+      contentWrapper.appendChild(tailDiv);
+
+      const renderMarkdown = (markdown) => DOMPurify.sanitize(marked.parse(markdown));
+
+      // Finished blocks are rendered once; only the tail still being written is re-rendered,
+      // at most once per animation frame. Token events extend the tail; a tail event replaces it.
+      const render = () => {
+        renderQueued = false;
+        tailDiv.innerHTML = renderMarkdown(tail);
+        messagesDiv.scrollTop = messagesDiv.scrollHeight;
+      };
+      const scheduleRender = () => {
+        if (!renderQueued) {
+          renderQueued = true;
+          requestAnimationFrame(render);
+        }
+      };
+
+      await streamAnswer(context, question, (data) => {
+        if (data.block !== undefined) {
+          const blockDiv = document.createElement('div');
+          blockDiv.innerHTML = renderMarkdown(data.block);
+          contentWrapper.insertBefore(blockDiv, tailDiv);
+          tail = '';
+          scheduleRender();
+        }
+        if (data.tail !== undefined) {
+          tail = data.tail;
+          scheduleRender();
+        }
+        if (data.token) {
+          tail += data.token;
+          scheduleRender();
+        }
+        if (data.done) {
+          agentUsed = data.agent_used;
+        }
+      });
+
+      if (agentUsed) {
+        const badge = document.createElement('div');
+        badge.className = 'cp-agent-badge';
+        badge.textContent = agentUsed;
+        assistantMsg.appendChild(badge);
+      }
+
+    } catch (error) {
+      contentWrapper.textContent = `Error: ${error.message}. Make sure the backend is running.`;
+    }
+  };
+
+  document.getElementById('cp-send-btn').addEventListener('click', sendMessage);
+  document.getElementById('cp-input').addEventListener('keypress', (e) => {
+    if (e.key === 'Enter') sendMessage();
+  });
+}
+
+function injectChatButton() {
+  if (document.getElementById('cp-assistant-btn')) return;
+
+  const button = document.createElement('button');
+  button.id = 'cp-assistant-btn';
+  button.innerHTML = '💬 CP Assistant';
+  button.style.cssText = `
+    position: fixed;
+    bottom: 20px;
+    right: 20px;
+    z-index: 10000;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white;
+    border: none;
+    padding: 12px 24px;
+    border-radius: 25px;
+    cursor: pointer;
+    font-size: 14px;
+    font-weight: 600;
+    box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);
+    transition: all 0.3s ease;
+  `;
+
+  button.addEventListener('mouseenter', () => {
+    button.style.transform = 'translateY(-2px)';
+    button.style.boxShadow = '0 6px 20px rgba(102, 126, 234, 0.6)';
+  });
+
+  button.addEventListener('mouseleave', () => {
+    button.style.transform = 'translateY(0)';
+    button.style.boxShadow = '0 4px 15px rgba(102, 126, 234, 0.4)';
+  });
+
+  button.addEventListener('click', createChatModal);
+
+  document.body.appendChild(button);
+}
+
+function startAssistant(extractor) {
+  extractContext = extractor;
+
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', injectChatButton);
+  } else {
+    injectChatButton();
+  }
+
+  const schedulePrefetch = () => setTimeout(prefetchProblem, 1000);
+  if (document.readyState === 'complete') {
+    schedulePrefetch();
+  } else {
+    window.addEventListener('load', schedulePrefetch);
+  }
+}
@@ -1,5 +1,124 @@
 const API_URL = CONFIG.API_URL;
 
+// Statements are uploaded once per page; questions then carry only the content hash.
+const problemHashes = new Map();
+
+async function registerProblem(statement) {
+  const response = await fetch(`${API_URL}/problems`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ problem_statement: statement })
+  });
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  const data = await response.json();
+  problemHashes.set(statement, data.problem_hash);
+  return data.problem_hash;
+}
+
+async function askStream(context, question) {
+  const { problem_statement, ...rest } = context;
+  if (!problem_statement) {
+    return fetch(`${API_URL}/ask/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ...context, question: question, stream_mode: 'blocks' })
+    });
+  }
+
+  const send = (problemHash) => fetch(`${API_URL}/ask/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ...rest, problem_hash: problemHash, question: question, stream_mode: 'blocks' })
+  });
+
+  const problemHash = problemHashes.get(problem_statement) || await registerProblem(problem_statement);
+  const response = await send(problemHash);
+  if (response.status !== 404) {
+    return response;
+  }
+  const error = await response.json().catch(() => ({}));
+  if (!error.detail || error.detail.error !== 'problem_not_found') {
+    return response;
+  }
+  // The server evicted the statement; upload it again and retry once.
+  return send(await registerProblem(problem_statement));
+}
+
+// Reads one SSE response, passing each parsed event to onData. Returns the ID of the
+// last event received and whether the final (done) event arrived before the connection ended.
+async function readEvents(response, onData) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let lastEventId = null;
+  let finished = false;
+
+  const handleLine = (line) => {
+    if (line.startsWith('id: ')) {
+      lastEventId = line.slice(4);
+    } else if (line.startsWith('data: ')) {
+      try {
+        const data = JSON.parse(line.slice(6));
+        if (data.done) finished = true;
+        onData(data);
+      } catch (e) {
+        console.error('Error parsing SSE data:', e);
+      }
+    }
+  };
+
+  try {
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop() || '';
+      lines.forEach(handleLine);
+    }
+    if (buffer) handleLine(buffer);
+  } catch (error) {
+    console.error('Stream interrupted:', error);
+  }
+  return { lastEventId, finished };
+}
+
+const MAX_RESUME_ATTEMPTS = 3;
+
+// Streams an answer. If the connection drops, it reconnects with Last-Event-ID and the
+// server replays only the missed events, so the question is never generated twice.
+async function streamAnswer(context, question, onData) {
+  let response = await askStream(context, question);
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  let streamId = response.headers.get('X-Stream-Id');
+  let lastEventId = null;
+
+  for (let attempt = 1; ; attempt++) {
+    const result = await readEvents(response, onData);
+    if (result.finished) return;
+    if (result.lastEventId) {
+      lastEventId = result.lastEventId;
+      streamId = lastEventId.slice(0, lastEventId.lastIndexOf(':'));
+    }
+    if (!streamId || attempt > MAX_RESUME_ATTEMPTS) {
+      throw new Error('Connection lost');
+    }
+
+    await new Promise((resolve) => setTimeout(resolve, 500 * attempt));
+    response = await fetch(`${API_URL}/ask/stream/${streamId}`, {
+      headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {}
+    });
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+  }
+}
+
 let currentContext = null;
 let chatHistory = [];
 
@@ -48,74 +167,52 @@ async function sendMessage(question) {
   messagesContainer.appendChild(messageDiv);
 
   try {
-    const response = await fetch(`${API_URL}/ask/stream`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
-        ...currentContext,
-        question: question
-      })
-    });
-
-    if (!response.ok) {
-      throw new Error(`HTTP error! status: ${response.status}`);
-    }
-
-    const reader = response.body.getReader();
-    const decoder = new TextDecoder();
     let accumulatedText = '';
     let agentUsed = '';
-    let buffer = '';
+    const blocks = [];
+    let tail = '';
+    let renderQueued = false;
+    const tailDiv = document.createElement('div');
+    contentWrapper.appendChild(tailDiv);
 
-    while (true) {
-      const { done, value } = await reader.read();
-      if (done) break;
-
-      buffer += decoder.decode(value, { stream: true });
-      const lines = buffer.split('\n');
-      
-      buffer = lines.pop() || '';
+    const renderMarkdown = (markdown) => DOMPurify.sanitize(marked.parse(markdown));
 
-      for (const line of lines) {
-        if (line.startsWith('data: ')) {
-          try {
-            const data = JSON.parse(line.slice(6));
-            if (data.token) {
-              accumulatedText += data.token;
-              const rawHtml = marked.parse(accumulatedText);
-              const sanitizedHtml = DOMPurify.sanitize(rawHtml);
-              contentWrapper.innerHTML = sanitizedHtml;
-              messagesContainer.scrollTop = messagesContainer.scrollHeight;
-            }
-            if (data.done) {
-              agentUsed = data.agent_used;
-            }
-          } catch (e) {
-            console.error('Error parsing SSE data:', e);
-          }
-        }
+    // Finished blocks are rendered once; only the tail still being written is re-rendered,
+    // at most once per animation frame. Token events extend the tail; a tail event replaces it.
+    const render = () => {
+      renderQueued = false;
+      tailDiv.innerHTML = renderMarkdown(tail);
+      messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    };
+    const scheduleRender = () => {
+      if (!renderQueued) {
+        renderQueued = true;
+        requestAnimationFrame(render);
       }
-    }
+    };
 
-    if (buffer && buffer.startsWith('data: ')) {
-      try {
-        const data = JSON.parse(buffer.slice(6));
-        if (data.token) {
-          accumulatedText += data.token;
-          const rawHtml = marked.parse(accumulatedText);
-          const sanitizedHtml = DOMPurify.sanitize(rawHtml);
-          contentWrapper.innerHTML = sanitizedHtml;
-          messagesContainer.scrollTop = messagesContainer.scrollHeight;
-        }
-        if (data.done) {
-          agentUsed = data.agent_used;
-        }
-      } catch (e) {
-        console.error('Error parsing final SSE data:', e);
+    await streamAnswer(currentContext, question, (data) => {
+      if (data.block !== undefined) {
+        const blockDiv = document.createElement('div');
+        blockDiv.innerHTML = renderMarkdown(data.block);
+        contentWrapper.insertBefore(blockDiv, tailDiv);
+        blocks.push(data.block);
+        tail = '';
+        scheduleRender();
       }
-    }
+      if (data.tail !== undefined) {
+        tail = data.tail;
+        scheduleRender();
+      }
+      if (data.token) {
+        tail += data.token;
+        scheduleRender();
+      }
+      if (data.done) {
+        agentUsed = data.agent_used;
+      }
+    });
+    accumulatedText = [...blocks, tail].filter(Boolean).join('\n\n');
 
     if (agentUsed) {
       const badge = createElement('div', 'agent-badge', agentUsed);